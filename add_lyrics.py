@@ -13,52 +13,15 @@ import argparse
 import tempfile
 import shutil
 from check_ffmpeg import check_ffmpeg
+from lrc_parser import parse_lrc_file, format_srt_time
 
 def convert_lrc_to_srt(lrc_file, output_file):
     """
     将LRC格式歌词文件转换为SRT格式
     """
     try:
-        # 读取LRC文件
-        with open(lrc_file, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
-        
-        # 解析时间标记 [mm:ss.xx]
-        import re
-        time_pattern = re.compile(r'\[(\d+):(\d+)\.(\d+)\]')
-        
-        # 存储解析后的歌词
-        lyrics = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            matches = time_pattern.findall(line)
-            if not matches:
-                continue
-            
-            # 提取歌词文本
-            text = time_pattern.sub('', line).strip()
-            if not text:
-                continue
-            
-            # 处理每个时间标记
-            for match in matches:
-                try:
-                    minutes = int(match[0])
-                    seconds = int(match[1])
-                    milliseconds = int(match[2]) * 10  # LRC通常是xx格式，转为xxx毫秒格式
-                    
-                    # 计算毫秒时间戳
-                    time_ms = minutes * 60 * 1000 + seconds * 1000 + milliseconds
-                    lyrics.append((time_ms, text))
-                except:
-                    continue
-        
-        # 按时间戳排序
-        lyrics.sort(key=lambda x: x[0])
+        # 解析LRC文件（自动识别编码，支持多时间标签和[offset:]）
+        lyrics = parse_lrc_file(lrc_file)
         
         # 写入SRT文件
         with open(output_file, 'w', encoding='utf-8') as f:
@@ -84,19 +47,6 @@ def convert_lrc_to_srt(lrc_file, output_file):
         print(f"转换LRC文件出错: {str(e)}")
         return False
 
-def format_srt_time(ms):
-    """
-    将毫秒转换为SRT时间格式 (HH:MM:SS,mmm)
-    """
-    hours = ms // (3600 * 1000)
-    ms %= 3600 * 1000
-    minutes = ms // (60 * 1000)
-    ms %= 60 * 1000
-    seconds = ms // 1000
-    ms %= 1000
-    
-    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
-
 def add_lyrics_to_audio(audio_file, lyrics_file, output_file=None):
     """
     向音频文件添加歌词
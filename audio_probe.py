@@ -0,0 +1,187 @@
+import re
+import json
+import time
+import subprocess
+
+# 导入mutagen库用于读取音频文件头
+try:
+    import mutagen
+    MUTAGEN_AVAILABLE = True
+except ImportError:
+    MUTAGEN_AVAILABLE = False
+
+# 探测方式：从快到慢依次尝试
+PROBE_MUTAGEN = "mutagen"
+PROBE_FFPROBE = "ffprobe"
+PROBE_DECODE = "decode"
+
+# 完整解码探测超过该时间（秒）时输出警告
+SLOW_PROBE_SECONDS = 1.0
+
+
+def probe_with_mutagen(audio_file):
+    """
+    使用mutagen通用接口读取文件头，返回元数据字典，无法识别时返回None
+    """
+    if not MUTAGEN_AVAILABLE:
+        return None
+
+    try:
+        audio = mutagen.File(audio_file, easy=True)
+    except Exception:
+        return None
+
+    if audio is None or not getattr(audio, 'info', None):
+        return None
+
+    duration = getattr(audio.info, 'length', 0) or 0
+    if duration <= 0:
+        return None
+
+    title = ""
+    artist = ""
+    if audio.tags:
+        try:
+            title = (audio.tags.get('title') or [""])[0]
+            artist = (audio.tags.get('artist') or [""])[0]
+        except Exception:
+            pass
+
+    return {
+        'title': str(title),
+        'artist': str(artist),
+        'duration': duration,
+        'codec': getattr(audio.info, 'codec', '') or type(audio).__name__.lower(),
+        'sample_rate': getattr(audio.info, 'sample_rate', 0) or 0,
+        'channels': getattr(audio.info, 'channels', 0) or 0
+    }
+
+
+def probe_with_ffprobe(audio_file):
+    """
+    使用ffprobe的JSON输出读取容器头，返回元数据字典，容器中没有时长时返回None
+    """
+    command = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 'a:0',
+        '-show_entries', 'format=duration:format_tags=title,artist:stream=codec_name,sample_rate,channels,duration',
+        '-of', 'json',
+        audio_file
+    ]
+
+    try:
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        stdout, _ = process.communicate()
+    except OSError:
+        # 系统中没有ffprobe
+        return None
+
+    if process.returncode != 0:
+        return None
+
+    try:
+        data = json.loads(stdout.decode('utf-8', errors='ignore'))
+    except ValueError:
+        return None
+
+    format_info = data.get('format', {})
+    streams = data.get('streams', [])
+    stream = streams[0] if streams else {}
+
+    duration = 0
+    for value in (format_info.get('duration'), stream.get('duration')):
+        try:
+            duration = float(value)
+            break
+        except (TypeError, ValueError):
+            continue
+
+    if duration <= 0:
+        return None
+
+    tags = dict((key.lower(), value) for key, value in format_info.get('tags', {}).items())
+
+    try:
+        sample_rate = int(stream.get('sample_rate', 0))
+    except (TypeError, ValueError):
+        sample_rate = 0
+
+    return {
+        'title': tags.get('title', ""),
+        'artist': tags.get('artist', ""),
+        'duration': duration,
+        'codec': stream.get('codec_name', ""),
+        'sample_rate': sample_rate,
+        'channels': stream.get('channels', 0) or 0
+    }
+
+
+def probe_with_decode(audio_file):
+    """
+    完整解码音频来获取时长，只在文件头中没有时长信息时使用
+    """
+    command = [
+        'ffmpeg',
+        '-i', audio_file,
+        '-f', 'null',
+        '-'
+    ]
+
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+
+    _, stderr = process.communicate()
+
+    # 优先使用解码结束时的时间，其次使用文件头中的Duration
+    duration = 0
+    time_matches = re.findall(r"time=(\d+):(\d+):(\d+)\.(\d+)", stderr)
+    duration_match = re.search(r"Duration: (\d+):(\d+):(\d+)\.(\d+)", stderr)
+    if time_matches:
+        hours, minutes, seconds, centiseconds = map(int, time_matches[-1])
+        duration = hours * 3600 + minutes * 60 + seconds + centiseconds / 100
+    elif duration_match:
+        hours, minutes, seconds, centiseconds = map(int, duration_match.groups())
+        duration = hours * 3600 + minutes * 60 + seconds + centiseconds / 100
+
+    return {
+        'title': "",
+        'artist': "",
+        'duration': duration,
+        'codec': "",
+        'sample_rate': 0,
+        'channels': 0
+    }
+
+
+def probe_audio(audio_file):
+    """
+    探测音频文件的元数据，依次尝试mutagen、ffprobe和完整解码
+
+    返回的字典中probe_method记录实际使用的探测方式，probe_seconds记录耗时
+    """
+    start = time.time()
+
+    for method, probe in ((PROBE_MUTAGEN, probe_with_mutagen), (PROBE_FFPROBE, probe_with_ffprobe)):
+        info = probe(audio_file)
+        if info:
+            info['probe_method'] = method
+            info['probe_seconds'] = time.time() - start
+            return info
+
+    info = probe_with_decode(audio_file)
+    info['probe_method'] = PROBE_DECODE
+    info['probe_seconds'] = time.time() - start
+
+    if info['probe_seconds'] > SLOW_PROBE_SECONDS:
+        print(f"警告: 文件头中没有时长信息，完整解码耗时 {info['probe_seconds']:.1f} 秒: {audio_file}")
+
+    return info
@@ -0,0 +1,119 @@
+import os
+import threading
+from PIL import ImageFont
+from metadata_cache import MetadataCache
+
+# 导入fontTools库用于读取字体名称
+try:
+    from fontTools.ttLib import TTFont
+    FONTTOOLS_AVAILABLE = True
+except ImportError:
+    FONTTOOLS_AVAILABLE = False
+
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc')
+
+
+def read_font_name(font_path):
+    """
+    读取字体文件中的完整字体名称（名称ID为4），只解析name表，没有找到时返回None
+    """
+    if not FONTTOOLS_AVAILABLE:
+        return None
+
+    # lazy模式只读取表目录，访问name表时才解析该表；字体集合只读取第一个字体
+    font = TTFont(font_path, lazy=True, fontNumber=0)
+    try:
+        name_table = font['name']
+
+        # 优先查找名称ID为4（完整字体名），平台为Windows（3），编码为Unicode（1）
+        for entry in name_table.names:
+            if entry.nameID == 4:
+                # Windows平台（Unicode编码）
+                if entry.platformID == 3 and entry.platEncID == 1:
+                    return entry.string.decode('utf-16be', errors='ignore')
+                # Mac平台或其他情况
+                elif entry.platformID == 1:
+                    return entry.string.decode('mac_roman', errors='ignore')
+
+        # 若未找到，返回第一个名称ID为4的条目
+        for entry in name_table.names:
+            if entry.nameID == 4:
+                return entry.string.decode(errors='ignore')
+
+        return None
+    finally:
+        font.close()
+
+
+class FontRegistry:
+    """
+    字体注册表
+
+    按(路径, 修改时间, 字号)缓存加载好的FreeTypeFont对象，大型中文字体在整个进程中只加载一次；
+    字体名称保存在以文件修改时间为键的持久化缓存中，选择或使用字体时不需要重新解析字体文件。
+    字体文件夹的字体名称索引只在文件夹修改后重新建立。
+    """
+    def __init__(self, db_path=None):
+        self.fonts = {}
+        self.lock = threading.Lock()
+        self.name_cache = MetadataCache(db_path, table="font_names")
+        self.directory_indexes = {}
+
+    def get_font(self, font_path, size):
+        """
+        获取指定字号的字体对象，同一字体文件和字号只加载一次，字体文件被替换后重新加载
+        """
+        font_path = os.path.abspath(font_path)
+        key = (font_path, os.stat(font_path).st_mtime_ns, size)
+        with self.lock:
+            font = self.fonts.get(key)
+        if font is not None:
+            return font
+
+        font = ImageFont.truetype(font_path, size)
+        with self.lock:
+            # 删除同一字体文件和字号的旧版本
+            for old_key in [old_key for old_key in self.fonts if old_key[0] == font_path and old_key[2] == size]:
+                if old_key != key:
+                    del self.fonts[old_key]
+            return self.fonts.setdefault(key, font)
+
+    def get_font_name(self, font_path):
+        """
+        获取字体文件的字体名称，没有找到时返回None，读取失败时抛出异常
+        """
+        cached = self.name_cache.get(font_path)
+        if cached is not None:
+            return cached['name']
+
+        name = read_font_name(font_path)
+        self.name_cache.put(font_path, {'name': name})
+        return name
+
+    def index_directory(self, folder):
+        """
+        建立字体文件夹中字体名称到字体文件的索引，文件夹没有变化时直接返回之前的索引
+        """
+        folder = os.path.abspath(folder)
+        folder_mtime = os.stat(folder).st_mtime_ns
+
+        with self.lock:
+            index = self.directory_indexes.get(folder)
+            if index and index[0] == folder_mtime:
+                return index[1]
+
+        names = {}
+        for entry in os.scandir(folder):
+            if not entry.is_file() or not entry.name.lower().endswith(FONT_EXTENSIONS):
+                continue
+            try:
+                name = self.get_font_name(entry.path)
+            except Exception as e:
+                print(f"读取字体名称时出错 {entry.name}: {str(e)}")
+                continue
+            if name:
+                names.setdefault(name, entry.path)
+
+        with self.lock:
+            self.directory_indexes[folder] = (folder_mtime, names)
+        return names
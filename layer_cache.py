@@ -0,0 +1,81 @@
+import os
+import threading
+import collections
+
+# 默认内存上限：256MB（约40张1080p的RGB图片）
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class LayerCache:
+    """
+    预处理图层的内存缓存
+
+    以源图片的路径、修改时间、文件大小和目标尺寸作为键，保存缩放并叠加好的图片，
+    每次绘制歌单时只需复制缓存的图层。超过内存上限时按最近使用时间淘汰。
+    """
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.layers = collections.OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def make_key(self, source_files, target_size):
+        """
+        根据源图片的状态和目标尺寸生成缓存键，未使用的源图片（None或空字符串）也参与组成键
+        """
+        states = []
+        for source_file in source_files:
+            if not source_file:
+                states.append(None)
+                continue
+            source_path = os.path.abspath(source_file)
+            stat = os.stat(source_path)
+            states.append((source_path, stat.st_mtime_ns, stat.st_size))
+        return tuple(states), tuple(target_size)
+
+    def image_bytes(self, image):
+        """
+        估算图片占用的内存
+        """
+        return image.size[0] * image.size[1] * len(image.getbands())
+
+    def get(self, key):
+        """
+        查找缓存的图层，返回的图片是共享的，调用者需要复制后再修改
+        """
+        with self.lock:
+            image = self.layers.get(key)
+            if image is not None:
+                self.layers.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        """
+        保存图层，超过内存上限时淘汰最久未使用的图层
+        """
+        size = self.image_bytes(image)
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            old_image = self.layers.pop(key, None)
+            if old_image is not None:
+                self.total_bytes -= self.image_bytes(old_image)
+
+            self.layers[key] = image
+            self.total_bytes += size
+
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.layers.popitem(last=False)
+                self.total_bytes -= self.image_bytes(evicted)
+
+    def load(self, source_files, target_size, create):
+        """
+        获取图层，没有缓存时调用create()生成并缓存
+        """
+        key = self.make_key(source_files, target_size)
+        image = self.get(key)
+        if image is None:
+            image = create()
+            self.put(key, image)
+        return image
@@ -1,5 +1,180 @@
 import re
 import os
+from operator import itemgetter
+
+# 时间标签：[mm:ss]、[mm:ss.xx]、[mm:ss.xxx]、[mm:ss:xx]，也兼容圆括号 (mm:ss)
+TIME_TAG_PATTERN = re.compile(r"\s*[\[(](\d+):(\d{1,2})(?:[.:](\d{1,3}))?[\])]")
+
+# 信息标签：[ti:xxx]、[ar:xxx]、[offset:+/-ms] 等
+INFO_TAG_PATTERN = re.compile(r"\s*\[([A-Za-z#]+):([^\]]*)\]")
+
+# 时间标签小数部分按位数换算为毫秒的倍数
+FRACTION_SCALE = (0, 100, 10, 1)
+
+# 读取歌词文件时依次尝试的编码
+FALLBACK_ENCODINGS = ('utf-8', 'gbk', 'big5')
+
+# 文件开头的字节顺序标记
+BOM_ENCODINGS = (
+    (b'\xef\xbb\xbf', 'utf-8-sig'),
+    (b'\xff\xfe', 'utf-16'),
+    (b'\xfe\xff', 'utf-16'),
+)
+
+# 判断内容是否为歌词：带时间标签的歌词行超过该数量，或者占全部行的比例超过该比例
+LYRICS_MIN_TIMED_LINES = 5
+LYRICS_MIN_TIMED_RATIO = 0.3
+
+# 少于该字符数的内容不是歌词
+LYRICS_MIN_CHARS = 10
+
+
+def decode_lrc_bytes(raw):
+    """
+    根据文件内容的字节识别编码并解码，返回(文本, 编码)
+
+    有字节顺序标记时直接使用对应编码，否则依次尝试常用编码，第一次解码成功的结果直接返回
+    """
+    for bom, encoding in BOM_ENCODINGS:
+        if raw.startswith(bom):
+            return raw.decode(encoding), encoding
+
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            return raw.decode(encoding), encoding
+        except UnicodeDecodeError:
+            continue
+
+    # latin1可以解码任意字节，作为最后的选择
+    return raw.decode('latin1'), 'latin1'
+
+
+def read_lrc_file(lrc_file):
+    """
+    读取歌词文件，自动识别编码，返回文本内容
+    """
+    with open(lrc_file, 'rb') as f:
+        raw = f.read()
+    return decode_lrc_bytes(raw)[0]
+
+
+def iter_lrc_lines(lines, tags=None):
+    """
+    逐行解析LRC歌词，按文件中的顺序生成(时间毫秒列表, 歌词文本)
+
+    每行从左到右只扫描一次开头的标签，一行中有多个时间标签时列表中有多个时间。
+    信息标签保存在tags字典中，[offset:]在读到之后对后面的歌词生效（通常写在文件开头）。
+    没有歌词文本的时间标签会被跳过。
+    """
+    if tags is None:
+        tags = {}
+    offset = 0
+    time_match = TIME_TAG_PATTERN.match
+
+    for line in lines:
+        match = time_match(line)
+        if match is None:
+            info = INFO_TAG_PATTERN.match(line)
+            if info:
+                tag = info.group(1).lower()
+                value = info.group(2).strip()
+                tags[tag] = value
+                if tag == 'offset':
+                    try:
+                        offset = int(value)
+                    except ValueError:
+                        pass
+            continue
+
+        times = []
+        while match is not None:
+            minutes, seconds, fraction = match.groups()
+            time_ms = (int(minutes) * 60 + int(seconds)) * 1000
+            if fraction:
+                # "5" -> 500，"50" -> 500，"500" -> 500
+                time_ms += int(fraction) * FRACTION_SCALE[len(fraction)]
+            # 正的offset表示歌词提前显示
+            times.append(max(0, time_ms - offset))
+            pos = match.end()
+            match = time_match(line, pos)
+
+        text = line[pos:].strip()
+        if text:
+            yield times, text
+
+
+def iter_lrc_entries(lines, tags=None):
+    """
+    逐行解析LRC歌词，生成(时间毫秒, 歌词文本)
+
+    一行中有多个时间标签时，每个时间都生成一条歌词，因此生成的顺序不一定按时间排序
+    """
+    for times, text in iter_lrc_lines(lines, tags):
+        for time_ms in times:
+            yield time_ms, text
+
+
+def looks_like_lyrics(lines, timed_lines):
+    """
+    判断内容是否为歌词：带时间标签的歌词行足够多，或者占全部行的比例足够大
+
+    避免把正文中偶尔出现"(03:20)"之类时间的说明文字当作歌词
+    """
+    if timed_lines > LYRICS_MIN_TIMED_LINES:
+        return True
+    if sum(len(line.strip()) for line in lines) < LYRICS_MIN_CHARS:  # 太短的内容可能不是歌词
+        return False
+    return timed_lines > 0 and timed_lines / len(lines) > LYRICS_MIN_TIMED_RATIO
+
+
+def parse_lrc(content, tags=None):
+    """
+    解析LRC歌词内容（文本或行的可迭代对象），返回按时间排序的[(时间毫秒, 歌词文本), ...]
+
+    内容看起来不是歌词时（见looks_like_lyrics）返回空列表
+    """
+    if isinstance(content, str):
+        content = content.splitlines()
+    else:
+        content = list(content)
+
+    lyrics = []
+    append = lyrics.append
+    timed_lines = 0
+    for times, text in iter_lrc_lines(content, tags):
+        timed_lines += 1
+        for time_ms in times:
+            append((time_ms, text))
+
+    if not looks_like_lyrics(content, timed_lines):
+        return []
+
+    # 排序是稳定的，同一时间的多行歌词保持原来的顺序
+    lyrics.sort(key=itemgetter(0))
+    return lyrics
+
+
+def parse_lrc_file(lrc_file, tags=None):
+    """
+    读取并解析歌词文件，返回按时间排序的[(时间毫秒, 歌词文本), ...]
+    """
+    return parse_lrc(read_lrc_file(lrc_file), tags)
+
+
+def format_srt_time(ms):
+    """
+    将毫秒转换为SRT时间格式 (HH:MM:SS,MMM)
+    """
+    ms = int(ms)
+    hours = ms // (3600 * 1000)
+    ms %= 3600 * 1000
+    minutes = ms // (60 * 1000)
+    ms %= 60 * 1000
+    seconds = ms // 1000
+    ms %= 1000
+
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
+
 
 class LRCParser:
     """
@@ -8,105 +183,62 @@ class LRCParser:
     def __init__(self, lrc_file=None):
         self.lyrics = []
         self.time_mapping = {}
-        
+        self.tags = {}
+
         if lrc_file and os.path.exists(lrc_file):
             self.parse_file(lrc_file)
-    
+
     def parse_file(self, lrc_file):
         """
         解析LRC文件并提取时间戳和歌词
         """
         try:
-            with open(lrc_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            # 如果读取失败，尝试不同的编码
-            if not lines:
-                with open(lrc_file, 'r', encoding='gbk') as f:
-                    lines = f.readlines()
-            
-            self.parse_lines(lines)
+            self.parse_lines(read_lrc_file(lrc_file).splitlines())
             return True
         except Exception as e:
             print(f"解析歌词文件时出错: {str(e)}")
             return False
-    
+
     def parse_lines(self, lines):
         """
         解析LRC格式的行
         """
-        # 正则表达式匹配时间标签 [mm:ss.xx]
-        time_pattern = re.compile(r'\[(\d+):(\d+)\.(\d+)\]')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # 查找所有时间标签
-            matches = time_pattern.findall(line)
-            if not matches:
-                continue
-            
-            # 提取歌词文本（删除所有时间标签）
-            lyric = time_pattern.sub('', line).strip()
-            
-            # 如果有歌词内容，将其存储在时间映射中
-            if lyric:
-                for match in matches:
-                    try:
-                        minutes = int(match[0])
-                        seconds = int(match[1])
-                        milliseconds = int(match[2])
-                        
-                        # 将时间转换为毫秒
-                        time_ms = minutes * 60 * 1000 + seconds * 1000 + milliseconds * 10
-                        
-                        self.time_mapping[time_ms] = lyric
-                        self.lyrics.append((time_ms, lyric))
-                    except:
-                        continue
-        
+        self.lyrics.extend(iter_lrc_entries(lines, self.tags))
+        self.time_mapping.update(self.lyrics)
+
         # 按时间戳排序
-        self.lyrics.sort(key=lambda x: x[0])
-    
+        self.lyrics.sort(key=itemgetter(0))
+
     def get_subtitle_file(self, output_file):
         """
         生成SRT字幕文件
         """
         if not self.lyrics:
             return None
-        
+
         try:
             with open(output_file, 'w', encoding='utf-8') as f:
                 for i, (time_ms, lyric) in enumerate(self.lyrics):
                     # SRT格式: 序号, 开始时间 --> 结束时间, 歌词文本
                     start_time = self._ms_to_srt_time(time_ms)
-                    
+
                     # 计算结束时间（下一句歌词的时间或当前时间+5秒）
                     if i < len(self.lyrics) - 1:
                         end_time = self._ms_to_srt_time(self.lyrics[i+1][0])
                     else:
                         end_time = self._ms_to_srt_time(time_ms + 5000)  # 最后一句显示5秒
-                    
+
                     f.write(f"{i+1}\n")
                     f.write(f"{start_time} --> {end_time}\n")
                     f.write(f"{lyric}\n\n")
-            
+
             return output_file
         except Exception as e:
             print(f"生成字幕文件时出错: {str(e)}")
             return None
-    
+
     def _ms_to_srt_time(self, ms):
         """
         将毫秒转换为SRT时间格式 (HH:MM:SS,MMM)
         """
-        hours = ms // (3600 * 1000)
-        ms %= 3600 * 1000
-        minutes = ms // (60 * 1000)
-        ms %= 60 * 1000
-        seconds = ms // 1000
-        ms %= 1000
-        
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}" 
\ No newline at end of file
+        return format_srt_time(ms)
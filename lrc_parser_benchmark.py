@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+LRC解析器性能测试
+将旧版逐行正则搜索的解析方式与lrc_parser中的编译后流式解析器进行对比
+"""
+
+import re
+import sys
+import time
+from operator import itemgetter
+from lrc_parser import read_lrc_file, parse_lrc
+
+
+def legacy_parse(content):
+    """
+    旧版解析方式（每行三次未编译的正则搜索），只用于性能对比
+    """
+    lyrics = []
+    for line in content.split('\n'):
+        match1 = re.search(r'\[(\d+):(\d+)\.(\d+)\](.*)', line)
+        match2 = re.search(r'\[(\d+):(\d+)\](.*)', line)
+        match3 = re.search(r'\((\d+):(\d+)\)(.*)', line)
+        if match1:
+            time_ms = (int(match1.group(1)) * 60 + int(match1.group(2))) * 1000 + int(match1.group(3)) * 10
+            text = match1.group(4).strip()
+        elif match2:
+            time_ms = (int(match2.group(1)) * 60 + int(match2.group(2))) * 1000
+            text = match2.group(3).strip()
+        elif match3:
+            time_ms = (int(match3.group(1)) * 60 + int(match3.group(2))) * 1000
+            text = match3.group(3).strip()
+        else:
+            continue
+        if text:
+            lyrics.append((time_ms, text))
+    return sorted(lyrics, key=itemgetter(0))
+
+
+def make_benchmark_corpus(file_count=50, line_count=5000):
+    """
+    生成用于性能测试的大型LRC文本，包含信息标签、多时间标签和2位/3位小数
+    """
+    corpus = []
+    for file_index in range(file_count):
+        lines = ["[ti:测试歌曲 %d]" % file_index, "[ar:测试歌手]", "[offset:+120]"]
+        for i in range(line_count):
+            seconds = i * 3
+            stamp = "[%02d:%02d.%02d]" % (seconds // 60, seconds % 60, i % 100)
+            if i % 5 == 0:
+                # 副歌重复：一行多个时间标签
+                repeat = seconds + 600
+                stamp += "[%02d:%02d.%03d]" % (repeat // 60, repeat % 60, i % 1000)
+            lines.append(stamp + "这是第%d句歌词 Lyric line number %d" % (i, i))
+        corpus.append("\n".join(lines))
+    return corpus
+
+
+def benchmark(lrc_files=None, repeat=3):
+    """
+    解析器性能测试：比较新旧解析方式解析整个语料的耗时
+    """
+    if lrc_files:
+        corpus = [read_lrc_file(lrc_file) for lrc_file in lrc_files]
+    else:
+        corpus = make_benchmark_corpus()
+
+    total_lines = sum(content.count('\n') + 1 for content in corpus)
+    total_bytes = sum(len(content.encode('utf-8')) for content in corpus)
+    print(f"语料: {len(corpus)} 个文件, {total_lines} 行, {total_bytes / 1024 / 1024:.1f} MB")
+
+    for name, parse in (("旧解析器", legacy_parse), ("新解析器", parse_lrc)):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for content in corpus:
+                parse(content)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name}: {best * 1000:.1f} ms, {total_lines / best / 1000:.0f} 千行/秒")
+
+
+if __name__ == "__main__":
+    # 用法: python lrc_parser_benchmark.py [歌词文件 ...]，不指定文件时使用生成的语料
+    benchmark(sys.argv[1:])
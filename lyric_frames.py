@@ -0,0 +1,145 @@
+import os
+from PIL import Image, ImageDraw
+from text_fit import get_text_fitter
+
+# 字幕区域左右留出的边距占画面宽度的比例
+LYRIC_SIDE_MARGIN = 0.05
+
+# 歌词最多显示的行数，超出部分省略
+MAX_LYRIC_LINES = 2
+
+
+def build_lyric_timeline(blocks, total_ms):
+    """
+    将多首歌的字幕合并为连续的时间线，返回[(开始毫秒, 结束毫秒, 歌词文本或None), ...]
+
+    blocks为[(歌曲开始时间毫秒, CueBlock), ...]。没有歌词的时间段文本为None（只显示背景），
+    相邻且文本相同的时间段会合并，每个时间段对应一张画面
+    """
+    timeline = []
+    position = 0
+
+    def append(start_ms, end_ms, text):
+        if end_ms <= start_ms:
+            return
+        if timeline and timeline[-1][2] == text and timeline[-1][1] == start_ms:
+            timeline[-1] = (timeline[-1][0], end_ms, text)
+        else:
+            timeline.append((start_ms, end_ms, text))
+
+    for offset_ms, block in blocks:
+        for start_ms, end_ms, text in zip(block.starts, block.ends, block.texts):
+            start_ms = max(start_ms + offset_ms, position)
+            end_ms = min(end_ms + offset_ms, total_ms)
+            if end_ms <= start_ms:
+                continue
+            append(position, start_ms, None)
+            append(start_ms, end_ms, text)
+            position = end_ms
+
+    append(position, total_ms, None)
+    return timeline
+
+
+def wrap_lyric_text(text, font, max_width):
+    """
+    将一句歌词按显示宽度折行，有空格时按单词折行，否则按字符折行，超出MAX_LYRIC_LINES行的部分省略
+    """
+    return get_text_fitter(font).wrap(text, max_width, MAX_LYRIC_LINES)
+
+
+def lyric_band_height(font, margin_bottom, stroke_width):
+    """
+    歌词图层的高度：最多MAX_LYRIC_LINES行文字加上描边和底部边距，图层放在画面底部
+    """
+    ascent, descent = font.getmetrics()
+    return (ascent + descent) * MAX_LYRIC_LINES + margin_bottom + 2 * stroke_width
+
+
+def render_lyric_overlay(text, font, size, output_path, margin_bottom, stroke_width):
+    """
+    绘制只包含歌词区域的透明图层（白色文字、黑色描边、底部居中）并保存为PNG
+
+    size为图层的(宽度, 高度)，宽度与画面相同；text为None时保存空白图层。
+    编码时由overlay滤镜叠加到歌单画面的底部，同一句歌词在所有页面上共用一个图层
+    """
+    img = Image.new('RGBA', size, (0, 0, 0, 0))
+    width, height = size
+
+    if text is not None:
+        draw = ImageDraw.Draw(img)
+        lines = wrap_lyric_text(text, font, width * (1 - 2 * LYRIC_SIDE_MARGIN))
+        ascent, descent = font.getmetrics()
+        line_height = ascent + descent
+
+        y_position = height - margin_bottom - line_height * len(lines)
+        for line in lines:
+            line_width = draw.textlength(line, font=font)
+            draw.text(((width - line_width) / 2, y_position), line, fill="white", font=font,
+                      stroke_width=stroke_width, stroke_fill="black")
+            y_position += line_height
+
+    # 低压缩级别：这些图片只在本次编码中使用，保存速度比文件大小更重要
+    img.save(output_path, compress_level=1)
+    return output_path
+
+
+def write_frame_concat_list(frames, list_file):
+    """
+    写入带每张画面显示时长的concat分离器文件列表，frames为[(图片路径, 时长秒), ...]
+    """
+    with open(list_file, 'w', encoding='utf-8') as f:
+        f.write("ffconcat version 1.0\n")
+        for frame_path, duration in frames:
+            f.write(f"file '{escape_concat_path(frame_path)}'\n")
+            f.write(f"duration {duration:.3f}\n")
+        # 最后一张画面需要再写一次，否则concat分离器会忽略它的时长
+        if frames:
+            f.write(f"file '{escape_concat_path(frames[-1][0])}'\n")
+
+
+def escape_concat_path(path):
+    """
+    转义concat文件列表中的路径
+    """
+    path = os.path.abspath(path)
+    if os.name == 'nt':  # Windows系统
+        path = path.replace('\\', '\\\\')
+    return path.replace("'", "'\\''")
+
+
+def split_timeline(timeline, max_ms):
+    """
+    在max_ms毫秒的整数倍处拆分时间段，保证每个间隔的开头都有一帧（用于插入关键帧）
+    """
+    if max_ms <= 0:
+        return list(timeline)
+
+    result = []
+    for start_ms, end_ms, text in timeline:
+        boundary = (start_ms // max_ms + 1) * max_ms
+        while boundary < end_ms:
+            result.append((start_ms, boundary, text))
+            start_ms = boundary
+            boundary += max_ms
+        result.append((start_ms, end_ms, text))
+    return result
+
+
+def split_timeline_at(timeline, boundaries):
+    """
+    在给定的时间点（毫秒，升序）拆分时间段，用于在歌单翻页时切换背景
+    """
+    result = []
+    boundaries = list(boundaries)
+    position = 0
+    for start_ms, end_ms, text in timeline:
+        while position < len(boundaries) and boundaries[position] <= start_ms:
+            position += 1
+        index = position
+        while index < len(boundaries) and boundaries[index] < end_ms:
+            result.append((start_ms, boundaries[index], text))
+            start_ms = boundaries[index]
+            index += 1
+        result.append((start_ms, end_ms, text))
+    return result
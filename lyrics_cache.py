@@ -0,0 +1,130 @@
+import os
+import json
+import sqlite3
+import threading
+import collections
+from lrc_parser import parse_lrc_file
+
+# 内存中最多保存的歌词文件数
+DEFAULT_MAX_ENTRIES = 1000
+
+
+class LyricsCache:
+    """
+    解析后的歌词缓存
+
+    以文件路径、大小和修改时间作为键，保存解析后的时间戳和歌词文本，
+    可选同时保存在SQLite数据库中。多次导出同一首歌时只读取和解析一次。
+    """
+    def __init__(self, db_path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.memory = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.connection = None
+
+        if self.db_path:
+            try:
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+                self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+                self.connection.execute(
+                    "CREATE TABLE IF NOT EXISTS parsed_lyrics ("
+                    "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, lyrics TEXT)"
+                )
+                self.connection.commit()
+            except sqlite3.Error as e:
+                print(f"打开歌词缓存数据库时出错: {str(e)}")
+                self.connection = None
+
+    def _file_state(self, path):
+        """
+        获取文件的绝对路径、大小和修改时间
+        """
+        abs_path = os.path.abspath(path)
+        stat = os.stat(abs_path)
+        return abs_path, stat.st_size, stat.st_mtime_ns
+
+    def _remember(self, abs_path, entry):
+        """
+        保存到内存中，超过上限时删除最久未使用的条目
+        """
+        self.memory[abs_path] = entry
+        self.memory.move_to_end(abs_path)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, path):
+        """
+        查找解析后的歌词，返回(歌词列表, 信息标签)，文件被修改过或没有缓存时返回None
+        """
+        try:
+            abs_path, size, mtime_ns = self._file_state(path)
+        except OSError:
+            return None
+
+        with self.lock:
+            entry = self.memory.get(abs_path)
+            if entry and entry[0] == size and entry[1] == mtime_ns:
+                self.memory.move_to_end(abs_path)
+                return entry[2], dict(entry[3])
+
+            if not self.connection:
+                return None
+
+            try:
+                row = self.connection.execute(
+                    "SELECT size, mtime_ns, lyrics FROM parsed_lyrics WHERE path = ?",
+                    (abs_path,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"读取歌词缓存时出错: {str(e)}")
+                return None
+
+            if not row or row[0] != size or row[1] != mtime_ns:
+                return None
+
+            data = json.loads(row[2])
+            lyrics = [tuple(item) for item in data['lyrics']]
+            self._remember(abs_path, (size, mtime_ns, lyrics, data['tags']))
+            return lyrics, dict(data['tags'])
+
+    def put(self, path, lyrics, tags):
+        """
+        保存解析后的歌词
+        """
+        try:
+            abs_path, size, mtime_ns = self._file_state(path)
+        except OSError:
+            return
+
+        lyrics = [tuple(item) for item in lyrics]
+        tags = dict(tags)
+        with self.lock:
+            self._remember(abs_path, (size, mtime_ns, lyrics, tags))
+
+            if not self.connection:
+                return
+
+            try:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO parsed_lyrics (path, size, mtime_ns, lyrics) VALUES (?, ?, ?, ?)",
+                    (abs_path, size, mtime_ns, json.dumps({'lyrics': lyrics, 'tags': tags}, ensure_ascii=False))
+                )
+                self.connection.commit()
+            except sqlite3.Error as e:
+                print(f"写入歌词缓存时出错: {str(e)}")
+
+    def load(self, path):
+        """
+        获取解析后的歌词，返回(歌词列表, 信息标签)，没有缓存时读取并解析文件
+
+        歌词列表为按时间排序的[(时间毫秒, 歌词文本), ...]，调用者不应修改
+        """
+        cached = self.get(path)
+        if cached is not None:
+            return cached
+
+        tags = {}
+        lyrics = parse_lrc_file(path, tags)
+        self.put(path, lyrics, tags)
+        return lyrics, tags
@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量检查歌词时间轴的工具
+在生成视频之前找出超出歌曲时长、时间倒序和空白过长的歌词，避免编码完成后才发现问题
+"""
+
+import os
+import sys
+import argparse
+import concurrent.futures
+from lrc_parser import read_lrc_file, iter_lrc_lines
+from metadata_cache import MetadataCache
+from lyrics_index import LyricsResolver
+from audio_probe import probe_audio
+
+# 问题类型
+ISSUE_EMPTY = "empty"
+ISSUE_PAST_DURATION = "past_duration"
+ISSUE_NON_MONOTONIC = "non_monotonic"
+ISSUE_GAP = "gap"
+
+# 两句歌词之间超过该时间（毫秒）视为可疑的空白
+SUSPICIOUS_GAP_MS = 30000
+
+# 建议偏移时，最后一句歌词距离歌曲结束至少保留的时间（毫秒）
+OFFSET_TAIL_MS = 1000
+
+# 检查规则的版本，修改规则后旧的缓存结果会失效
+CHECK_VERSION = 1
+
+AUDIO_EXTENSIONS = ('.mp3', '.flac', '.wav', '.m4a', '.aac', '.wma')
+
+
+def format_lrc_time(ms):
+    """
+    将毫秒格式化为LRC时间格式 (mm:ss.xx)
+    """
+    ms = int(ms)
+    return f"{ms // 60000:02d}:{ms // 1000 % 60:02d}.{ms // 10 % 100:02d}"
+
+
+def check_lyrics(lrc_file, duration=0):
+    """
+    检查一个歌词文件的时间轴，duration为歌曲时长（秒，0表示未知）
+
+    返回的字典包含歌词句数、问题列表和建议的[offset:]值（毫秒，0表示不需要调整）
+    """
+    duration_ms = int(round(duration * 1000)) if duration else 0
+    result = {
+        'path': os.path.abspath(lrc_file),
+        'duration_ms': duration_ms,
+        'version': CHECK_VERSION,
+        'cue_count': 0,
+        'issues': [],
+        'suggested_offset_ms': 0
+    }
+    issues = result['issues']
+
+    try:
+        content = read_lrc_file(lrc_file)
+    except OSError as e:
+        result['error'] = str(e)
+        return result
+
+    # 1. 按文件中的顺序检查时间是否递增（一行多个时间标签时只比较第一个）
+    starts = []
+    previous = None
+    for times, text in iter_lrc_lines(content.splitlines()):
+        if previous is not None and times[0] < previous[0]:
+            issues.append({
+                'type': ISSUE_NON_MONOTONIC,
+                'time_ms': times[0],
+                'message': f"[{format_lrc_time(times[0])}] 早于上一句 [{format_lrc_time(previous[0])}] {previous[1]}"
+            })
+        previous = (times[0], text)
+        starts.extend(times)
+
+    starts.sort()
+    result['cue_count'] = len(starts)
+    if not starts:
+        issues.append({'type': ISSUE_EMPTY, 'time_ms': 0, 'message': "没有带时间标签的歌词"})
+        return result
+
+    # 2. 检查是否有歌词在歌曲结束之后
+    if duration_ms:
+        past = [time_ms for time_ms in starts if time_ms >= duration_ms]
+        if past:
+            issues.append({
+                'type': ISSUE_PAST_DURATION,
+                'time_ms': past[0],
+                'message': f"{len(past)} 句歌词在歌曲结束 [{format_lrc_time(duration_ms)}] 之后，最晚 [{format_lrc_time(past[-1])}]"
+            })
+
+            # 整体提前后第一句歌词不会早于0时，建议使用[offset:]调整
+            offset_ms = starts[-1] - (duration_ms - OFFSET_TAIL_MS)
+            if 0 < offset_ms <= starts[0]:
+                result['suggested_offset_ms'] = offset_ms
+
+    # 3. 检查歌曲中间是否有过长的空白
+    for previous_ms, time_ms in zip(starts, starts[1:]):
+        if duration_ms and previous_ms >= duration_ms:
+            break
+        if time_ms - previous_ms > SUSPICIOUS_GAP_MS:
+            issues.append({
+                'type': ISSUE_GAP,
+                'time_ms': previous_ms,
+                'message': f"[{format_lrc_time(previous_ms)}] 到 [{format_lrc_time(time_ms)}] 之间没有歌词"
+            })
+
+    return result
+
+
+def audio_state(audio_file):
+    """
+    音频文件的路径、大小和修改时间，用于判断缓存的检查结果是否仍然有效
+    """
+    audio_path = os.path.abspath(audio_file)
+    stat = os.stat(audio_path)
+    return [audio_path, stat.st_size, stat.st_mtime_ns]
+
+
+def check_audio_lyrics(lrc_file, audio_file):
+    """
+    探测音频文件的时长后检查歌词（在工作线程或进程中执行），结果中记录音频文件的状态
+    """
+    try:
+        duration = probe_audio(audio_file)['duration']
+        state = audio_state(audio_file)
+    except Exception as e:
+        return {'path': os.path.abspath(lrc_file), 'issues': [], 'error': f"读取音频文件出错: {str(e)}"}
+
+    result = check_lyrics(lrc_file, duration)
+    result['audio'] = state
+    return result
+
+
+def check_lyrics_files(items, cache=None, workers=None, use_processes=False):
+    """
+    批量检查歌词文件，按完成顺序生成检查结果
+
+    items为[(歌词路径, 歌曲时长秒), ...]；歌曲时长未知时可以用(歌词路径, None, 音频路径)，
+    由工作线程（进程）探测音频时长。歌词文件和歌曲时长（或音频文件）都没有变化时直接使用
+    缓存中的结果，其余文件由多个工作线程（use_processes为True时为工作进程）并行检查
+    """
+    pending = []
+    for item in items:
+        lrc_file, duration = item[0], item[1]
+        audio_file = item[2] if len(item) > 2 else None
+        if cache:
+            cached = cache.get(lrc_file)
+            if cached and cached.get('version') == CHECK_VERSION:
+                if duration is None:
+                    try:
+                        valid = cached.get('audio') == audio_state(audio_file)
+                    except OSError:
+                        valid = False
+                else:
+                    valid = cached.get('duration_ms') == (int(round(duration * 1000)) if duration else 0)
+                if valid:
+                    yield cached
+                    continue
+        pending.append((lrc_file, duration, audio_file))
+
+    if not pending:
+        return
+
+    executor_class = concurrent.futures.ProcessPoolExecutor if use_processes else concurrent.futures.ThreadPoolExecutor
+    max_workers = max(1, min(len(pending), workers or os.cpu_count() or 1))
+    with executor_class(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(check_audio_lyrics, lrc_file, audio_file) if duration is None
+            else executor.submit(check_lyrics, lrc_file, duration)
+            for lrc_file, duration, audio_file in pending
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            # 缓存只在当前线程中写入
+            if cache and 'error' not in result:
+                cache.put(result['path'], result)
+            yield result
+
+
+def format_report(results):
+    """
+    将检查结果整理为文本报告，只列出有问题的文件
+    """
+    lines = []
+    checked = 0
+    problem_files = 0
+    for result in sorted(results, key=lambda item: item['path']):
+        checked += 1
+        if 'error' in result:
+            problem_files += 1
+            lines.append(f"{result['path']}\n  读取失败: {result['error']}")
+            continue
+        if not result['issues']:
+            continue
+
+        problem_files += 1
+        lines.append(f"{result['path']} ({result['cue_count']} 句)")
+        for issue in result['issues']:
+            lines.append(f"  - {issue['message']}")
+        if result['suggested_offset_ms']:
+            lines.append(f"  建议在文件开头添加 [offset:{result['suggested_offset_ms']}]")
+
+    lines.append(f"\n共检查 {checked} 个歌词文件，{problem_files} 个有问题")
+    return "\n".join(lines)
+
+
+def collect_items(paths, lyrics_folder=None):
+    """
+    根据命令行参数收集需要检查的(歌词路径, 歌曲时长秒)，返回(检查项列表, 没有找到歌词的音频文件列表)
+
+    音频文件使用对应的歌词，时长在检查时由工作进程探测；单独的歌词文件不知道歌曲时长，
+    不检查是否超出时长。文件名精确匹配失败时按文件名中的歌曲名和艺术家模糊匹配
+    （与界面中的查找相同，但不读取音频标签）
+    """
+    resolver = LyricsResolver()
+    audio_files = []
+    lrc_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in os.scandir(path):
+                if entry.is_file():
+                    (audio_files if entry.name.lower().endswith(AUDIO_EXTENSIONS) else lrc_files).append(entry.path)
+        else:
+            (audio_files if path.lower().endswith(AUDIO_EXTENSIONS) else lrc_files).append(path)
+
+    items = []
+    missing = []
+    covered = set()
+    for audio_file in audio_files:
+        lrc_file = resolver.resolve(audio_file, lyrics_folder) or resolver.resolve_fuzzy(audio_file, lyrics_folder)
+        if lrc_file:
+            items.append((lrc_file, None, audio_file))
+            covered.add(os.path.abspath(lrc_file))
+        else:
+            missing.append(audio_file)
+
+    for lrc_file in lrc_files:
+        if lrc_file.lower().endswith('.lrc') and os.path.abspath(lrc_file) not in covered:
+            items.append((lrc_file, 0))
+
+    return items, missing
+
+
+def main():
+    # 解析命令行参数
+    parser = argparse.ArgumentParser(description='批量检查歌词时间轴')
+    parser.add_argument('paths', nargs='+', help='音频文件、歌词文件或文件夹')
+    parser.add_argument('-l', '--lyrics-folder', help='歌词文件夹路径（可选）')
+    parser.add_argument('-j', '--jobs', type=int, default=0, help='并行检查的进程数（默认为CPU核心数）')
+    parser.add_argument('--cache', default=os.path.join(os.getcwd(), "cache", "lyrics_check.db"),
+                        help='检查结果缓存数据库路径')
+
+    args = parser.parse_args()
+
+    items, missing = collect_items(args.paths, args.lyrics_folder)
+    if missing:
+        print(f"{len(missing)} 个音频文件没有找到歌词（只按文件名匹配，不读取音频标签）:")
+        for audio_file in missing:
+            print(f"  {audio_file}")
+    if not items:
+        print("没有找到需要检查的歌词文件")
+        return 1
+
+    cache = MetadataCache(args.cache, table="lyrics_check")
+    results = list(check_lyrics_files(items, cache, args.jobs, use_processes=True))
+    print(format_report(results))
+
+    if any(result.get('issues') or 'error' in result for result in results):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+import os
+import re
+import time
+import heapq
+import collections
+import threading
+import unicodedata
+
+LYRICS_EXTENSIONS = ('.lrc',)
+
+# 名称中视为分隔符的字符（NFKC规范化后全角字符已转换为半角）
+SEPARATOR_PATTERN = re.compile(r"[\s\-_–—―·・.~]+")
+
+# 标题中不影响匹配的附加信息，如"(Live)"、"【伴奏】"、"feat. xxx"
+EXTRA_INFO_PATTERN = re.compile(r"\([^)]*\)|\[[^\]]*\]|【[^】]*】|「[^」]*」|\s(?:feat|ft)\.?\s.*$")
+
+# 标题末尾用短横线分隔的版本信息，如" - Live"、" - Remastered 2011"、" - Taylor's Version"
+VERSION_SUFFIX_PATTERN = re.compile(
+    r"\s[-–—]\s[^-–—]*\b(?:version|ver|live|remaster(?:ed)?|(?:re)?mix|edit)\b[^-–—]*$",
+    re.IGNORECASE
+)
+
+# LRC文件头中的标题和艺术家标签
+HEADER_TAG_PATTERN = re.compile(r"\[(ti|ar):([^\]]*)\]", re.IGNORECASE)
+
+# 读取LRC文件头时只读取开头的部分
+HEADER_READ_BYTES = 4096
+
+# 模糊匹配的最低得分 (0-1)
+FUZZY_THRESHOLD = 0.75
+
+# 模糊匹配时按共有三元组数量选取的最多候选文件数
+FUZZY_MAX_CANDIDATES = 64
+
+
+def normalize_name(name):
+    """
+    规范化文件名用于匹配：统一全角半角和大小写，合并分隔符和空白
+    """
+    name = unicodedata.normalize('NFKC', name).casefold()
+    return SEPARATOR_PATTERN.sub(' ', name).strip()
+
+
+def clean_title(name):
+    """
+    去掉标题中的附加信息后规范化，用于模糊匹配
+    """
+    name = unicodedata.normalize('NFKC', name)
+    cleaned = EXTRA_INFO_PATTERN.sub(' ', name).strip()
+    # 可能有多段版本信息，如" - Live - Remastered"
+    while True:
+        stripped = VERSION_SUFFIX_PATTERN.sub('', cleaned).strip()
+        if stripped == cleaned:
+            break
+        cleaned = stripped
+    # 整个标题都在括号中时保留原标题
+    return normalize_name(cleaned) or normalize_name(name)
+
+
+def make_grams(key, n=2):
+    """
+    生成去掉空格后的字符n元组集合，中文和英文标题都适用
+
+    二元组用于计算相似度，更有区分度的三元组用于在索引中选取候选文件
+    """
+    compact = key.replace(' ', '')
+    if len(compact) < n:
+        return {compact} if compact else set()
+    return set(compact[i:i + n] for i in range(len(compact) - n + 1))
+
+
+def similarity(grams_a, grams_b):
+    """
+    计算两个n-gram集合的Dice系数
+    """
+    if not grams_a or not grams_b:
+        return 0.0
+    return 2.0 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+def split_artist_title(name):
+    """
+    将"艺术家 - 歌曲名"格式的名称拆分为(艺术家, 歌曲名)，没有分隔符时艺术家为空
+    """
+    name = unicodedata.normalize('NFKC', name)
+    for separator in (' - ', '-', '_'):
+        if separator in name:
+            artist, title = name.split(separator, 1)
+            if artist.strip() and title.strip():
+                return artist.strip(), title.strip()
+    return "", name.strip()
+
+
+def read_header_tags(lrc_path):
+    """
+    读取LRC文件头中的[ti:]和[ar:]标签，返回(标题, 艺术家)
+    """
+    try:
+        with open(lrc_path, 'rb') as f:
+            raw = f.read(HEADER_READ_BYTES)
+    except OSError:
+        return "", ""
+
+    for encoding in ('utf-8-sig', 'gbk'):
+        try:
+            text = raw.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        text = raw.decode('utf-8', errors='ignore')
+
+    tags = {}
+    for tag, value in HEADER_TAG_PATTERN.findall(text):
+        tags.setdefault(tag.lower(), value.strip())
+    return tags.get('ti', ""), tags.get('ar', "")
+
+
+class LyricsIndex:
+    """
+    单个文件夹的歌词文件索引
+
+    扫描一次文件夹，建立规范化文件名到歌词文件的映射，之后查找只需一次字典访问。
+    文件夹修改时间变化时增量更新，两次检查之间至少间隔refresh_interval秒，
+    避免在网络文件夹上频繁stat。扫描时只列出文件名，模糊匹配使用的文件头标签和n-gram
+    在第一次模糊查找时才读取和生成，读取文件时不持有索引锁。
+    """
+    def __init__(self, folder, refresh_interval=2.0):
+        self.folder = folder
+        self.refresh_interval = refresh_interval
+        self.names = set()
+        self.index = {}
+        self.entries = {}  # 文件名 -> (标题, 艺术家, 标题n-gram, 艺术家n-gram)
+        self.gram_index = {}  # 三元组 -> 包含该三元组的文件名集合
+        self.pending_tags = set()  # 还没有生成模糊匹配条目的文件名
+        self.folder_mtime = None
+        self.last_check = 0
+        self.lock = threading.Lock()  # 保护索引数据
+        self.refresh_lock = threading.Lock()  # 同一时间只有一个线程扫描文件夹
+        self.tags_lock = threading.Lock()  # 同一时间只有一个线程读取文件头标签
+
+    def _add(self, filename):
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() not in LYRICS_EXTENSIONS:
+            return
+        self.names.add(filename)
+        # 同一规范化名称有多个文件时保留先扫描到的
+        self.index.setdefault(normalize_name(stem), filename)
+
+        # 模糊匹配使用的标题和艺术家在第一次模糊查找时再生成
+        self.pending_tags.add(filename)
+
+    def _set_entry(self, filename, title, artist):
+        self._remove_entry(filename)
+        title = clean_title(title)
+        artist = normalize_name(artist)
+        self.entries[filename] = (title, artist, make_grams(title), make_grams(artist))
+        for gram in make_grams(title, 3):
+            self.gram_index.setdefault(gram, set()).add(filename)
+
+    def _remove_entry(self, filename):
+        entry = self.entries.pop(filename, None)
+        if entry:
+            for gram in make_grams(entry[0], 3):
+                filenames = self.gram_index.get(gram)
+                if filenames:
+                    filenames.discard(filename)
+                    if not filenames:
+                        del self.gram_index[gram]
+
+    def _remove(self, filename):
+        self.names.discard(filename)
+        self.pending_tags.discard(filename)
+        self._remove_entry(filename)
+
+        key = normalize_name(os.path.splitext(filename)[0])
+        if self.index.get(key) == filename:
+            del self.index[key]
+            # 如果还有其他文件对应同一个名称，重新指向它
+            for other in self.names:
+                if normalize_name(os.path.splitext(other)[0]) == key:
+                    self.index[key] = other
+                    break
+
+    def refresh(self, force=False):
+        """
+        文件夹修改时间变化时增量更新索引
+        """
+        if not force and time.time() - self.last_check < self.refresh_interval:
+            return
+
+        # 已经有索引时不等待其他线程正在进行的扫描，直接使用当前的索引
+        if not self.refresh_lock.acquire(blocking=force or self.folder_mtime is None):
+            return
+        try:
+            now = time.time()
+            if not force and now - self.last_check < self.refresh_interval:
+                return
+            self.last_check = now
+
+            try:
+                folder_mtime = os.stat(self.folder).st_mtime_ns
+            except OSError:
+                with self.lock:
+                    self.names = set()
+                    self.index = {}
+                    self.entries = {}
+                    self.gram_index = {}
+                    self.pending_tags = set()
+                self.folder_mtime = None
+                return
+
+            if not force and folder_mtime == self.folder_mtime:
+                return
+
+            try:
+                current_names = set(entry.name for entry in os.scandir(self.folder) if entry.is_file())
+            except OSError as e:
+                print(f"扫描歌词文件夹时出错: {str(e)}")
+                return
+
+            with self.lock:
+                for filename in self.names - current_names:
+                    self._remove(filename)
+                for filename in current_names - self.names:
+                    self._add(filename)
+
+            self.folder_mtime = folder_mtime
+        finally:
+            self.refresh_lock.release()
+
+    def load_header_tags(self):
+        """
+        读取新歌词文件头中的[ti:]和[ar:]标签，生成模糊匹配使用的标题和艺术家
+        """
+        with self.tags_lock:
+            with self.lock:
+                if not self.pending_tags:
+                    return
+                pending = self.pending_tags
+                self.pending_tags = set()
+
+            # 读取文件时不持有索引锁，精确查找不需要等待
+            tags = [(filename, read_header_tags(os.path.join(self.folder, filename))) for filename in pending]
+
+            with self.lock:
+                for filename, (tag_title, tag_artist) in tags:
+                    if filename not in self.names:
+                        continue
+                    # 优先使用文件头中的标签，没有标签时从文件名中拆分
+                    name_artist, name_title = split_artist_title(os.path.splitext(filename)[0])
+                    self._set_entry(filename, tag_title or name_title, tag_artist or name_artist)
+
+    def lookup(self, name):
+        """
+        按名称（不含扩展名）查找歌词文件，返回完整路径，没有找到时返回None
+        """
+        self.refresh()
+        filename = self.index.get(normalize_name(name))
+        if filename:
+            return os.path.join(self.folder, filename)
+        return None
+
+    def fuzzy_lookup(self, title, artist=""):
+        """
+        按歌曲名和艺术家模糊查找歌词文件，返回(路径, 得分)，没有足够相似的文件时返回(None, 0)
+
+        只比较与歌曲名共有三元组最多的候选文件，大型歌词库中也只需检查少量文件，
+        个别拼写错误产生的罕见三元组不会决定候选文件。
+        """
+        self.refresh()
+        self.load_header_tags()
+
+        title = clean_title(title)
+        title_grams = make_grams(title)
+        if not title_grams:
+            return None, 0.0
+        artist_grams = make_grams(normalize_name(artist)) if artist else set()
+
+        with self.lock:
+            # 统计每个文件与歌曲名共有的三元组数量
+            gram_counts = collections.Counter()
+            for gram in make_grams(title, 3):
+                gram_counts.update(self.gram_index.get(gram, ()))
+            candidates = [
+                filename for filename, _ in
+                heapq.nsmallest(FUZZY_MAX_CANDIDATES, gram_counts.items(), key=lambda item: (-item[1], item[0]))
+            ]
+
+            best_file = None
+            best_score = 0.0
+            for filename in candidates:
+                _, _, entry_title_grams, entry_artist_grams = self.entries[filename]
+                score = similarity(title_grams, entry_title_grams)
+                if artist_grams and entry_artist_grams:
+                    score = 0.7 * score + 0.3 * similarity(artist_grams, entry_artist_grams)
+                # 得分相同时按文件名排序，保证结果稳定
+                if score > best_score or (score == best_score and best_file and filename < best_file):
+                    best_file = filename
+                    best_score = score
+
+        if best_file and best_score >= FUZZY_THRESHOLD:
+            return os.path.join(self.folder, best_file), best_score
+        return None, 0.0
+
+
+class LyricsResolver:
+    """
+    歌词文件查找器
+
+    依次查找音乐文件旁边的同名歌词和歌词文件夹中的歌词，每个文件夹只建立一次索引。
+    """
+    def __init__(self, refresh_interval=2.0):
+        self.refresh_interval = refresh_interval
+        self.indexes = {}
+        self.lock = threading.Lock()
+
+    def index_for(self, folder):
+        """
+        获取文件夹的索引，第一次使用时创建
+        """
+        folder = os.path.abspath(folder)
+        with self.lock:
+            if folder not in self.indexes:
+                self.indexes[folder] = LyricsIndex(folder, self.refresh_interval)
+            return self.indexes[folder]
+
+    def invalidate(self, folder):
+        """
+        文件夹内容已知发生变化时（例如刚复制了歌词文件）立即更新索引
+        """
+        self.index_for(folder).refresh(force=True)
+
+    def candidate_names(self, music_file):
+        """
+        根据音乐文件名生成可能的歌词文件名（不含扩展名）
+        """
+        filename_no_ext = os.path.splitext(os.path.basename(music_file))[0]
+        names = [filename_no_ext]
+
+        # 如果文件名包含艺术家和歌曲名信息（如"艺术家-歌曲名"格式）
+        if '-' in filename_no_ext:
+            artist, title = filename_no_ext.split('-', 1)
+            names.extend([
+                f"{artist.strip()} - {title.strip()}",
+                title.strip()
+            ])
+
+        return names
+
+    def resolve(self, music_file, lyrics_folder=None):
+        """
+        查找音乐文件对应的歌词文件，返回路径，没有找到时返回None
+        """
+        # 1. 检查音乐文件旁边是否有同名的歌词文件
+        filename_no_ext = os.path.splitext(os.path.basename(music_file))[0]
+        music_dir = os.path.dirname(os.path.abspath(music_file))
+        lyrics_path = self.index_for(music_dir).lookup(filename_no_ext)
+        if lyrics_path:
+            return lyrics_path
+
+        # 2. 检查歌词文件夹中是否有对应的歌词文件
+        if lyrics_folder:
+            index = self.index_for(lyrics_folder)
+            for name in self.candidate_names(music_file):
+                lyrics_path = index.lookup(name)
+                if lyrics_path:
+                    return lyrics_path
+
+        return None
+
+    def resolve_fuzzy(self, music_file, lyrics_folder=None, title="", artist=""):
+        """
+        精确查找失败后，使用音频标签和文件名模糊查找歌词文件，返回路径，没有找到时返回None
+        """
+        name_artist, name_title = split_artist_title(os.path.splitext(os.path.basename(music_file))[0])
+        queries = []
+        if title:
+            queries.append((title, artist))
+        queries.append((name_title, name_artist))
+
+        folders = [os.path.dirname(os.path.abspath(music_file))]
+        if lyrics_folder:
+            folders.append(lyrics_folder)
+
+        best_path = None
+        best_score = 0.0
+        for folder in folders:
+            index = self.index_for(folder)
+            for query_title, query_artist in queries:
+                lyrics_path, score = index.fuzzy_lookup(query_title, query_artist)
+                if lyrics_path and score > best_score:
+                    best_path = lyrics_path
+                    best_score = score
+
+        return best_path
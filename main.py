@@ -4,18 +4,34 @@ import subprocess
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import threading
+import concurrent.futures
+import collections
 from PIL import Image, ImageTk, ImageDraw, ImageFont
 import json
 import tempfile
 import uuid
 import math
+import bisect
 from check_ffmpeg import check_ffmpeg
+from transcode_cache import TranscodeCache
+from metadata_cache import MetadataCache
+from audio_probe import probe_audio, probe_with_ffprobe, PROBE_MUTAGEN
+from lyrics_index import LyricsResolver
+from lrc_parser import parse_lrc_file
+from lyrics_cache import LyricsCache
+from lyrics_check import check_lyrics_files, format_report
+from layer_cache import LayerCache
+from font_registry import FontRegistry, read_font_name
+from text_fit import get_text_fitter, ELLIPSIS_END, ELLIPSIS_MIDDLE
+from playlist_layout import compute_playlist_layout, page_start_times, PLAYLIST_BOTTOM_MARGIN
+from subtitle_writer import build_cue_block, write_srt_cues, write_ass_header, write_ass_cues
+from subtitle_writer import ASS_PLAY_RES_Y, ASS_OUTLINE, ASS_MARGIN_V, SUBTITLE_WRITE_BUFFER
+from lyric_frames import build_lyric_timeline, split_timeline, split_timeline_at, lyric_band_height, render_lyric_overlay, write_frame_concat_list
 import re
 import urllib.request
 import urllib.parse
 import urllib.error
 import html
-from fontTools.ttLib import TTFont
 from io import BytesIO
 # 导入mutagen库用于读取MP3的ID3标签
 try:
@@ -39,6 +55,72 @@ import time
 import shutil
 import traceback
 
+# 静态画面快速编码参数：只编码一个短GOP片段，再循环拷贝到整个播放时长
+STILL_FRAME_RATE = 25  # 片段帧率，与逐帧编码输出保持一致
+STILL_SEGMENT_SECONDS = 10  # 片段时长（秒），整个片段为一个GOP
+
+# 批量导出时每个视频任务分配的编码线程数，用于自动确定同时运行的任务数
+ENCODER_THREADS_PER_JOB = 4
+# 使用GPU编码时同时运行的任务数上限（消费级显卡的NVENC会话数有限）
+MAX_GPU_PARALLEL_JOBS = 2
+
+# 批量探测音频元数据时使用的线程数（以I/O等待为主）
+METADATA_PROBE_WORKERS = 8
+
+# 歌单图片和视频画面的尺寸
+VIDEO_SIZE = (1920, 1080)
+
+# 歌单区域的位置和宽度，标题的纵坐标
+PLAYLIST_X = 20  # 从左侧开始
+PLAYLIST_PANEL_WIDTH = 1800  # 接近视频宽度(1920)，留出一些边距
+PLAYLIST_TITLE_Y = 30
+
+# 分列时每列歌曲名称至少能显示的字数（按字体大小计算宽度）
+PLAYLIST_MIN_NAME_CHARS = 12
+
+# 歌单预览的尺寸（与视频画面比例相同）和设置变化后更新预览的延迟
+PREVIEW_SIZE = (600, 338)
+PREVIEW_UPDATE_DELAY_MS = 300
+
+# 预渲染歌词图层时临时目录至少保留的剩余空间，以及每绘制多少张图层检查一次
+PRERENDER_MIN_FREE_BYTES = 256 * 1024 * 1024
+PRERENDER_SPACE_CHECK_INTERVAL = 200
+
+# 字幕时间数组缓存最多保存的歌词句数，超过时淘汰最久未使用的歌曲
+CUE_CACHE_MAX_CUES = 200000
+
+# 单个视频任务的不可变描述，批量导出时每个视频一个
+VideoJob = collections.namedtuple('VideoJob', ['index', 'music_files', 'output_filename', 'image_file', 'order_desc'])
+
+# 音频转码参数：非MP3音频先转为统一参数的MP3
+MP3_TRANSCODE_ARGS = [
+    '-vn',  # 不处理视频流
+    '-ar', '44100',  # 设置采样率
+    '-ac', '2',  # 设置声道数
+    '-b:a', '192k',  # 设置比特率
+]
+
+# 合并音频的采样率，每首歌按探测到的时长精确裁剪或补齐到该采样率下的采样数
+COMBINED_SAMPLE_RATE = 44100
+
+# 分段音频参数：每首歌编码为采样率和声道数一致的AAC片段，之后只需流复制拼接。
+# 不写MP4编辑列表，片段中保留编码器延迟帧，拼接时由concat列表的inpoint/outpoint去掉
+SEGMENT_TRANSCODE_ARGS = [
+    '-vn',
+    '-ar', '44100',
+    '-ac', '2',
+    '-c:a', 'aac',
+    '-b:a', '192k',
+    '-use_editlist', '0',
+]
+
+# AAC每帧的采样数，以及FFmpeg的AAC编码器在片段开头写入的编码器延迟（正好一帧）
+AAC_FRAME_SAMPLES = 1024
+AAC_PRIMING_SAMPLES = 1024
+
+# 合并后的音频时长与歌单时长（各首歌探测时长之和）允许的误差（秒）
+COMBINED_DURATION_TOLERANCE = 0.1
+
 class MusicVideoGenerator:
     def __init__(self, root):
         self.root = root
@@ -54,6 +136,8 @@ class MusicVideoGenerator:
         
         self.music_files = []
         self.music_item_frames = []  # 初始化音乐项目框架列表
+        self.lyrics_status = {}  # 每首歌最近一次检查的歌词状态
+        self.duration_text = {}  # 每首歌的时长显示文本
         self.image_file = ""
         self.image_folder = ""  # 添加图片文件夹路径
         self.image_files = []   # 添加图片文件列表
@@ -61,10 +145,31 @@ class MusicVideoGenerator:
         self.overlay_image = ""  # 叠加图片路径
         self.output_dir = ""
         self.lyrics_folder = ""  # 歌词文件夹路径
+        self.lyrics_resolver = LyricsResolver()  # 歌词文件索引，每个文件夹只扫描一次
         self.merge_mode = True  # 合并模式标志
         self.use_gpu = False    # 是否使用GPU加速
         self.is_generating = False  # 添加标志跟踪是否正在生成视频
-        self.ffmpeg_process = None  # 添加变量存储FFmpeg进程
+        self.ffmpeg_processes = set()  # 并发执行中的FFmpeg子进程
+        self.ffmpeg_processes_lock = threading.Lock()
+        
+        # 批量导出任务状态
+        self.job_context = threading.local()  # 当前线程正在执行的任务
+        self.job_lock = threading.Lock()
+        self.job_progress = {}  # 每个任务的进度 (0-1)
+        self.job_start_times = {}  # 正在运行的任务的开始时间
+        self.total_video_count = 1
+        self.completed_video_count = 0
+        self.encoder_threads = 0  # 每个编码器使用的线程数，0表示编码器默认值
+        self.parallel_jobs = 1  # 同时运行的视频任务数，音频转码并发数在这些任务之间平分
+        self.cue_blocks = collections.OrderedDict()  # 每首歌的字幕时间数组，多个排列顺序之间复用
+        self.cue_block_count = 0  # 缓存中的歌词句数
+        self.layer_cache = LayerCache()  # 缩放并叠加好的背景图层
+        
+        # 歌单预览状态：只有歌单、字体或图片变化时才重新绘制
+        self.preview_enabled = False  # 第一次点击预览后自动更新
+        self.preview_key = None  # 当前显示（或正在绘制）的预览对应的设置
+        self.preview_generation = 0  # 每次开始绘制时递增，丢弃过期的结果
+        self.preview_after_id = None
         
         # 添加字体文件路径设置
         self.custom_font_path = ""  # 自定义字体文件路径
@@ -75,9 +180,7 @@ class MusicVideoGenerator:
         self.playlist_font_size = tk.IntVar(value=24)  # 播放列表字体大小
         
         # 添加用于跟踪处理时间的变量
-        self.start_time = 0
         self.elapsed_time = 0
-        self.timer_running = False
         
         # 检查FFmpeg是否安装
         if not check_ffmpeg():
@@ -91,6 +194,18 @@ class MusicVideoGenerator:
         # 创建默认歌词文件夹
         self.create_default_lyrics_folder()
         
+        # 创建音频转码缓存
+        self.create_transcode_cache()
+        
+        # 创建音频元数据缓存
+        self.create_metadata_cache()
+        
+        # 创建解析后的歌词缓存
+        self.create_lyrics_cache()
+        
+        # 创建字体对象和字体名称缓存
+        self.create_font_registry()
+        
         self.setup_ui()
         
         # 添加进度更新队列
@@ -135,6 +250,53 @@ class MusicVideoGenerator:
         except Exception as e:
             print(f"创建默认歌词文件夹时出错: {str(e)}")
     
+    def create_transcode_cache(self):
+        """创建转码音频的持久化缓存，跨视频和跨运行复用转码结果"""
+        try:
+            cache_dir = os.path.join(os.getcwd(), "cache", "audio")
+            self.transcode_cache = TranscodeCache(cache_dir)
+            print(f"音频转码缓存目录: {cache_dir}")
+        except Exception as e:
+            print(f"创建音频转码缓存时出错: {str(e)}")
+            self.transcode_cache = None
+        
+        try:
+            segment_cache_dir = os.path.join(os.getcwd(), "cache", "segments")
+            self.segment_cache = TranscodeCache(segment_cache_dir, extension='.m4a')
+        except Exception as e:
+            print(f"创建分段音频缓存时出错: {str(e)}")
+            self.segment_cache = None
+    
+    def create_metadata_cache(self):
+        """创建音频元数据缓存（内存和SQLite），未修改的文件不再重新读取"""
+        try:
+            self.metadata_cache = MetadataCache(os.path.join(os.getcwd(), "cache", "metadata.db"))
+        except Exception as e:
+            print(f"创建音频元数据缓存时出错: {str(e)}")
+            self.metadata_cache = None
+    
+    def create_font_registry(self):
+        """创建字体注册表，加载好的字体对象和读取过的字体名称不再重复处理"""
+        try:
+            self.font_registry = FontRegistry(os.path.join(os.getcwd(), "cache", "fonts.db"))
+        except Exception as e:
+            print(f"创建字体缓存时出错: {str(e)}")
+            self.font_registry = None
+    
+    def create_lyrics_cache(self):
+        """创建解析后的歌词缓存（内存和SQLite），未修改的歌词文件不再重新解析"""
+        try:
+            self.lyrics_cache = LyricsCache(os.path.join(os.getcwd(), "cache", "lyrics.db"))
+        except Exception as e:
+            print(f"创建歌词缓存时出错: {str(e)}")
+            self.lyrics_cache = None
+        
+        try:
+            self.lyrics_check_cache = MetadataCache(os.path.join(os.getcwd(), "cache", "lyrics_check.db"), table="lyrics_check")
+        except Exception as e:
+            print(f"创建歌词检查结果缓存时出错: {str(e)}")
+            self.lyrics_check_cache = None
+    
     def check_gpu_support(self):
         """检查系统是否支持GPU加速（NVIDIA NVENC）"""
         try:
@@ -260,6 +422,13 @@ class MusicVideoGenerator:
         check_lyrics_btn = tk.Button(btn_row4, text="检查歌词", command=self.check_selected_lyrics, bg="#FF9800", fg="white", font=("Arial", 10), width=15)
         check_lyrics_btn.pack(side=tk.RIGHT, padx=2, fill=tk.X, expand=True)
         
+        # 第五行：批量检查所有歌曲的歌词时间轴
+        btn_row5 = tk.Frame(music_btn_frame, bg="#f0f0f0")
+        btn_row5.pack(fill=tk.X)
+        
+        check_all_lyrics_btn = tk.Button(btn_row5, text="批量检查歌词时间轴", command=self.check_all_lyrics, bg="#FF9800", fg="white", font=("Arial", 10), width=30)
+        check_all_lyrics_btn.pack(fill=tk.X, padx=2, expand=True)
+        
         # 选择封面图片
         image_frame = tk.LabelFrame(self.content_frame, text="选择背景图片文件夹", bg="#f0f0f0", font=("Arial", 12))
         image_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -292,28 +461,28 @@ class MusicVideoGenerator:
         clear_overlay_btn = tk.Button(overlay_right_frame, text="清除图片", command=self.clear_overlay, bg="#F44336", fg="white", font=("Arial", 10), width=15)
         clear_overlay_btn.pack(side=tk.RIGHT, padx=5)
         
-        # # 添加预览歌单背景的框架
-        # preview_frame = tk.LabelFrame(self.content_frame, text="歌单背景预览", bg="#f0f0f0", font=("Arial", 12))
-        # preview_frame.pack(fill=tk.X, padx=10, pady=10)
+        # 添加预览歌单背景的框架
+        preview_frame = tk.LabelFrame(self.content_frame, text="歌单背景预览", bg="#f0f0f0", font=("Arial", 12))
+        preview_frame.pack(fill=tk.X, padx=10, pady=10)
         
-        # # 创建左侧预览图片区域
-        # preview_left_frame = tk.Frame(preview_frame, bg="#f0f0f0")
-        # preview_left_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
+        # 创建左侧预览图片区域
+        preview_left_frame = tk.Frame(preview_frame, bg="#f0f0f0")
+        preview_left_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # # 创建预览图片标签
-        # self.preview_image_label = tk.Label(preview_left_frame, text="点击预览按钮生成歌单背景预览", 
-        #                                   bg="#f0f0f0", anchor=tk.CENTER, justify=tk.CENTER, 
-        #                                   padx=10, pady=10, wraplength=600)
-        # self.preview_image_label.pack(fill=tk.BOTH, expand=True)
+        # 创建预览图片标签
+        self.preview_image_label = tk.Label(preview_left_frame, text="点击预览按钮生成歌单背景预览", 
+                                          bg="#f0f0f0", anchor=tk.CENTER, justify=tk.CENTER, 
+                                          padx=10, pady=10, wraplength=600)
+        self.preview_image_label.pack(fill=tk.BOTH, expand=True)
         
-        # # 创建右侧按钮区域
-        # preview_right_frame = tk.Frame(preview_frame, bg="#f0f0f0")
-        # preview_right_frame.pack(side=tk.RIGHT, padx=10, pady=10)
+        # 创建右侧按钮区域
+        preview_right_frame = tk.Frame(preview_frame, bg="#f0f0f0")
+        preview_right_frame.pack(side=tk.RIGHT, padx=10, pady=10)
         
-        # # 添加预览按钮
-        # preview_btn = tk.Button(preview_right_frame, text="预览歌单背景", command=self.preview_playlist_image, 
-        #                      bg="#009688", fg="white", font=("Arial", 10), width=15)
-        # preview_btn.pack(side=tk.RIGHT, padx=5)
+        # 添加预览按钮（预览生成后，歌单、字体或图片变化时自动更新）
+        preview_btn = tk.Button(preview_right_frame, text="预览歌单背景", command=self.preview_playlist_image, 
+                             bg="#009688", fg="white", font=("Arial", 10), width=15)
+        preview_btn.pack(side=tk.RIGHT, padx=5)
         
         # 选择输出目录和文件名
         output_frame = tk.LabelFrame(self.content_frame, text="选择输出位置", bg="#f0f0f0", font=("Arial", 12))
@@ -351,6 +520,13 @@ class MusicVideoGenerator:
         count_spinbox = tk.Spinbox(count_frame, from_=1, to=10, textvariable=self.export_count, width=5)
         count_spinbox.pack(side=tk.LEFT, padx=5)
         
+        # 同时导出数量（0表示根据CPU核心数自动选择）
+        tk.Label(count_frame, text="同时导出(0=自动):", bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
+        
+        self.parallel_jobs_var = tk.IntVar(value=0)
+        parallel_spinbox = tk.Spinbox(count_frame, from_=0, to=32, textvariable=self.parallel_jobs_var, width=5)
+        parallel_spinbox.pack(side=tk.LEFT, padx=5)
+        
         # 选项设置
         options_frame = tk.LabelFrame(self.content_frame, text="设置选项", bg="#f0f0f0", font=("Arial", 12))
         options_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -370,6 +546,64 @@ class MusicVideoGenerator:
         # 如果系统不支持GPU加速，禁用该选项
         if not self.use_gpu:
             gpu_check.config(state=tk.DISABLED)
+        
+        # 静态画面快速编码选项（烧录歌词字幕时自动回退为逐帧编码）
+        self.static_video_var = tk.BooleanVar(value=True)
+        static_video_check = tk.Checkbutton(options_frame, text="静态画面快速编码（无歌词字幕时生效）", 
+                                          variable=self.static_video_var, bg="#f0f0f0")
+        static_video_check.pack(anchor=tk.W, padx=10, pady=5)
+        
+        # 歌词渲染方式（预渲染失败时自动回退为字幕滤镜）
+        lyrics_render_frame = tk.Frame(options_frame, bg="#f0f0f0")
+        lyrics_render_frame.pack(fill=tk.X, padx=10, pady=5, anchor=tk.W)
+        tk.Label(lyrics_render_frame, text="歌词渲染方式:", bg="#f0f0f0").pack(side=tk.LEFT)
+        self.lyrics_render_var = tk.StringVar(value="prerender")
+        lyrics_render_modes = [
+            ("预渲染歌词画面", "prerender"),
+            ("逐帧字幕滤镜", "libass"),
+        ]
+        for text, value in lyrics_render_modes:
+            tk.Radiobutton(lyrics_render_frame, text=text, variable=self.lyrics_render_var, value=value, 
+                           bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
+        
+        # 可变帧率输出（只对预渲染歌词画面生效），部分平台要求固定的最大关键帧间隔
+        vfr_frame = tk.Frame(options_frame, bg="#f0f0f0")
+        vfr_frame.pack(fill=tk.X, padx=10, pady=5, anchor=tk.W)
+        self.vfr_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(vfr_frame, text="可变帧率输出（只在歌词变化时输出画面）", 
+                       variable=self.vfr_var, bg="#f0f0f0").pack(side=tk.LEFT)
+        tk.Label(vfr_frame, text="最大关键帧间隔(秒,0=不限):", bg="#f0f0f0").pack(side=tk.LEFT, padx=(10, 0))
+        self.keyframe_interval_var = tk.IntVar(value=0)
+        tk.Spinbox(vfr_frame, from_=0, to=60, textvariable=self.keyframe_interval_var, width=5).pack(side=tk.LEFT, padx=5)
+        
+        # 快速启动选项（moov前置，在编码的同一次输出中完成）
+        self.faststart_var = tk.BooleanVar(value=False)
+        faststart_check = tk.Checkbutton(options_frame, text="优化网络播放（moov前置）", 
+                                       variable=self.faststart_var, bg="#f0f0f0")
+        faststart_check.pack(anchor=tk.W, padx=10, pady=5)
+        
+        # 音频合并方式（单次编码或分段失败时自动回退为先转码再合并）
+        audio_mode_frame = tk.Frame(options_frame, bg="#f0f0f0")
+        audio_mode_frame.pack(fill=tk.X, padx=10, pady=5, anchor=tk.W)
+        tk.Label(audio_mode_frame, text="音频合并方式:", bg="#f0f0f0").pack(side=tk.LEFT)
+        self.audio_mode_var = tk.StringVar(value="auto")
+        audio_modes = [
+            ("自动", "auto"),
+            ("单次编码", "single_pass"),
+            ("分段缓存(多次导出)", "segments"),
+            ("先转MP3再合并", "mp3"),
+        ]
+        for text, value in audio_modes:
+            tk.Radiobutton(audio_mode_frame, text=text, variable=self.audio_mode_var, value=value, 
+                           bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
+            
+        # 音频转码并发数设置（0表示根据CPU核心数自动选择）
+        transcode_frame = tk.Frame(options_frame, bg="#f0f0f0")
+        transcode_frame.pack(fill=tk.X, padx=10, pady=5, anchor=tk.W)
+        tk.Label(transcode_frame, text="音频转码并发数(0=自动):", bg="#f0f0f0").pack(side=tk.LEFT)
+        self.transcode_workers = tk.IntVar(value=0)
+        transcode_spinbox = tk.Spinbox(transcode_frame, from_=0, to=64, textvariable=self.transcode_workers, width=5)
+        transcode_spinbox.pack(side=tk.LEFT, padx=5)
             
         # 添加字体大小设置
         font_size_frame = tk.LabelFrame(options_frame, text="字体大小设置", bg="#f0f0f0", padx=10, pady=5)
@@ -389,6 +623,26 @@ class MusicVideoGenerator:
         playlist_font_spinbox = tk.Spinbox(playlist_font_frame, from_=12, to=48, textvariable=self.playlist_font_size, width=5)
         playlist_font_spinbox.pack(side=tk.LEFT, padx=5)
         
+        # 过长歌曲名称的省略方式
+        tk.Label(playlist_font_frame, text="长歌名省略:", bg="#f0f0f0").pack(side=tk.LEFT, padx=(10, 0))
+        self.ellipsis_mode_var = tk.StringVar(value=ELLIPSIS_END)
+        ellipsis_modes = [
+            ("末尾省略", ELLIPSIS_END),
+            ("中间省略", ELLIPSIS_MIDDLE),
+        ]
+        for text, value in ellipsis_modes:
+            tk.Radiobutton(playlist_font_frame, text=text, variable=self.ellipsis_mode_var, value=value, 
+                           bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
+        
+        # 歌单最多分几列，仍然放不下时分页，在歌曲切换处翻页
+        tk.Label(playlist_font_frame, text="歌单最多列数:", bg="#f0f0f0").pack(side=tk.LEFT, padx=(10, 0))
+        self.playlist_columns_var = tk.IntVar(value=3)
+        tk.Spinbox(playlist_font_frame, from_=1, to=4, textvariable=self.playlist_columns_var, width=5).pack(side=tk.LEFT, padx=5)
+        
+        # 影响歌单图片的设置变化时更新预览
+        for variable in (self.title_font_size, self.playlist_font_size, self.ellipsis_mode_var, self.playlist_columns_var):
+            variable.trace_add('write', lambda *args: self.schedule_preview_update())
+        
         # 歌词字体大小设置
         lyrics_font_frame = tk.Frame(font_size_frame, bg="#f0f0f0")
         lyrics_font_frame.pack(fill=tk.X, pady=2)
@@ -409,6 +663,17 @@ class MusicVideoGenerator:
         
         clear_font_btn = tk.Button(font_file_frame, text="清除", command=self.clear_font, bg="#f44336", fg="white", font=("Arial", 9))
         clear_font_btn.pack(side=tk.LEFT, padx=5)
+        
+        # 按字体名称选择同一文件夹中的其他字体（选择字体文件后在后台建立索引）
+        font_family_frame = tk.Frame(font_size_frame, bg="#f0f0f0")
+        font_family_frame.pack(fill=tk.X, pady=2)
+        tk.Label(font_family_frame, text="同文件夹字体:", bg="#f0f0f0", width=15, anchor=tk.W).pack(side=tk.LEFT)
+        
+        self.font_directory_index = {}  # 字体名称 -> 字体文件路径
+        self.font_family_var = tk.StringVar()
+        self.font_family_combo = ttk.Combobox(font_family_frame, textvariable=self.font_family_var, state="readonly", width=30)
+        self.font_family_combo.pack(side=tk.LEFT, padx=5)
+        self.font_family_combo.bind("<<ComboboxSelected>>", self.select_font_family)
             
         # 进度条
         progress_frame = tk.Frame(self.content_frame, bg="#f0f0f0")
@@ -481,18 +746,21 @@ class MusicVideoGenerator:
                       ("所有文件", "*.*")]
         )
         if files:
+            new_files = []
             for file in files:
                 if file not in self.music_files:
                     self.music_files.append(file)
-                    
-                    # 检查是否有歌词
-                    has_lyrics = self.check_lyrics_exist(file)
+                    new_files.append(file)
                     
                     # 添加到后台Listbox（用于保持一致性）
                     self.music_list.insert(tk.END, os.path.basename(file))
                     
-                    # 在UI中创建新的音乐项目
-                    self.add_music_item_to_ui(file, len(self.music_files) - 1, has_lyrics)
+                    # 在UI中创建新的音乐项目，歌词状态在后台检查完成后更新
+                    self.add_music_item_to_ui(file, len(self.music_files) - 1, self.lyrics_status.get(file))
+            
+            # 在后台批量检查新添加的音乐，避免界面冻结
+            self.refresh_music_status_async(new_files)
+            self.schedule_preview_update()
     
     def add_music_item_to_ui(self, music_file, index, has_lyrics):
         """在UI中添加一个音乐项目"""
@@ -504,15 +772,15 @@ class MusicVideoGenerator:
         index_label = tk.Label(item_frame, text=f"{index + 1}.", width=3)
         index_label.pack(side=tk.LEFT, padx=2)
         
-        # 添加歌词状态指示器
-        if has_lyrics:
-            lyrics_indicator = tk.Label(item_frame, text="歌词", bg="#4CAF50", fg="white", 
-                                      font=("Arial", 8), padx=5, pady=1)
-        else:
-            lyrics_indicator = tk.Label(item_frame, text="无歌词", bg="#f44336", fg="white", 
-                                      font=("Arial", 8), padx=5, pady=1)
+        # 添加歌词状态指示器（has_lyrics为None表示正在检查）
+        lyrics_indicator = tk.Label(item_frame, fg="white", font=("Arial", 8), padx=5, pady=1)
+        self.set_lyrics_indicator(lyrics_indicator, has_lyrics)
         lyrics_indicator.pack(side=tk.LEFT, padx=5)
         
+        # 添加时长标签，探测完成后显示
+        duration_label = tk.Label(item_frame, text=self.duration_text.get(music_file, ""), width=8, anchor=tk.E)
+        duration_label.pack(side=tk.RIGHT, padx=5)
+        
         # 添加文件名标签
         filename_label = tk.Label(item_frame, text=os.path.basename(music_file), anchor=tk.W)
         filename_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
@@ -522,6 +790,7 @@ class MusicVideoGenerator:
         item_frame.music_file = music_file
         item_frame.filename_label = filename_label
         item_frame.lyrics_indicator = lyrics_indicator
+        item_frame.duration_label = duration_label
         
         # 添加选择事件
         def select_item(event, idx=index):
@@ -540,6 +809,40 @@ class MusicVideoGenerator:
         
         self.music_item_frames[index] = item_frame
     
+    def set_lyrics_indicator(self, lyrics_indicator, has_lyrics):
+        """根据歌词状态设置指示器的文字和颜色"""
+        if has_lyrics is None:
+            lyrics_indicator.config(text="检查中", bg="#9E9E9E")
+        elif has_lyrics:
+            lyrics_indicator.config(text="歌词", bg="#4CAF50")
+        else:
+            lyrics_indicator.config(text="无歌词", bg="#f44336")
+    
+    def update_music_item_status(self, music_file, info):
+        """后台探测完成一首歌后更新其歌词状态和时长（在UI线程中调用）"""
+        self.lyrics_status[music_file] = info['has_lyrics']
+        self.duration_text[music_file] = self.format_time(info['duration']) if info['duration'] else ""
+        
+        for item in self.music_item_frames:
+            if item and item.music_file == music_file:
+                self.set_lyrics_indicator(item.lyrics_indicator, info['has_lyrics'])
+                item.duration_label.config(text=self.duration_text[music_file])
+    
+    def refresh_music_status_async(self, music_files):
+        """在后台线程中批量探测音乐文件，每完成一首就更新界面"""
+        music_files = list(music_files)
+        if not music_files:
+            return
+        
+        def probe_worker():
+            try:
+                for music_file, info in self.iter_music_metadata(music_files):
+                    self.root.after(0, lambda f=music_file, i=info: self.update_music_item_status(f, i))
+            except Exception as e:
+                print(f"批量检查音乐文件时出错: {str(e)}")
+        
+        threading.Thread(target=probe_worker, daemon=True).start()
+    
     def select_music_item(self, index):
         """选择一个音乐项目"""
         # 清除所有项目的选择状态
@@ -570,10 +873,12 @@ class MusicVideoGenerator:
         # 清空引用列表
         self.music_item_frames = []
         
-        # 重新检查所有音乐的歌词状态并添加到UI
+        # 先使用上次检查的歌词状态添加到UI，再在后台重新检查
         for i, music_file in enumerate(self.music_files):
-            has_lyrics = self.check_lyrics_exist(music_file)
-            self.add_music_item_to_ui(music_file, i, has_lyrics)
+            self.add_music_item_to_ui(music_file, i, self.lyrics_status.get(music_file))
+        
+        self.refresh_music_status_async(self.music_files)
+        self.schedule_preview_update()
     
     def remove_music(self):
         try:
@@ -640,6 +945,7 @@ class MusicVideoGenerator:
             # 更新UI显示，只显示文件夹路径和图片数量
             self.image_label.config(text=f"已选择背景图片文件夹: {folder} (包含 {len(self.image_files)} 张图片)", image="", compound=tk.NONE)
             self.image_label.image = None
+            self.schedule_preview_update()
     
     def select_overlay(self):
         """选择叠加背景图片"""
@@ -672,6 +978,7 @@ class MusicVideoGenerator:
                 
                 # 在预览图片下方显示文件路径
                 self.overlay_label.config(text=f"已选择叠加图片: {file}")
+                self.schedule_preview_update()
             except Exception as e:
                 messagebox.showerror("错误", f"加载叠加图片时出错: {str(e)}")
     
@@ -680,6 +987,7 @@ class MusicVideoGenerator:
         self.overlay_image = ""
         self.overlay_label.config(text="未选择叠加图片", image="", compound=tk.NONE)
         self.overlay_label.image = None
+        self.schedule_preview_update()
     
     def select_output(self):
         directory = filedialog.askdirectory(title="选择输出目录")
@@ -764,34 +1072,18 @@ class MusicVideoGenerator:
         threading.Thread(target=lambda: self.generate_multiple_videos(export_count), daemon=True).start()
     
     def generate_multiple_videos(self, count):
-        """生成多个视频，第一个保持原顺序，之后的随机打乱"""
+        """生成多个视频，第一个保持原顺序，之后的随机打乱
+        
+        每个视频先生成不可变的任务描述，再由任务调度器并发执行
+        """
         # 确保设置生成标志
         self.is_generating = True
-        
-        # 保存原始音乐文件列表和当前索引
-        self.original_music_files = self.music_files.copy()
-        self.current_video_index = 0
         self.total_video_count = count
-        self.original_filename = self.output_filename.get()
-        
-        # 重置图片索引，从第一张图片开始
-        self.current_image_index = 0
         
         # 初始化总耗时
         self.total_process_time = 0
         self.total_start_time = time.time()  # 记录总处理开始时间
         
-        # 跟踪已生成的歌曲顺序，防止重复
-        self.generated_orders = []
-        # 保存原始顺序的哈希值
-        self.generated_orders.append(self.get_order_hash(self.original_music_files))
-        
-        # 如果只有两首歌曲，并且需要生成第二个视频，提前计算出颠倒顺序
-        if len(self.original_music_files) == 2 and count > 1:
-            # 创建反序列表，用于第二个视频
-            self.reversed_music_files = self.original_music_files.copy()
-            self.reversed_music_files.reverse()
-        
         # 更新导出进度显示
         self.root.after(0, lambda idx=0, tot=count: self.export_progress_label.configure(
             text=f"导出进度: {idx}/{tot} 视频完成"))
@@ -799,132 +1091,178 @@ class MusicVideoGenerator:
         # 更新总耗时显示
         self.root.after(0, lambda: self.total_time_label.configure(text=f"总耗时: 00:00:00"))
         
-        # 开始第一个视频生成
-        self.generate_next_video()
-    
-    def get_order_hash(self, file_list):
-        """获取歌曲顺序的哈希值，用于检查重复"""
-        # 使用文件路径作为唯一标识
-        order_str = "".join(file_list)
-        import hashlib
-        return hashlib.md5(order_str.encode()).hexdigest()
-    
-    def generate_next_video(self):
-        """生成下一个视频"""
         try:
-            # 检查是否已完成所有视频生成或者是否请求停止
-            if self.current_video_index >= self.total_video_count or not self.is_generating:
-                # 所有视频已生成完成或请求停止，恢复原始列表
-                self.music_files = self.original_music_files.copy()
-                # 恢复原始文件名
-                self.output_filename.set(self.original_filename)
-                # 恢复生成按钮状态
-                self.root.after(0, lambda: self.generate_btn.config(text="生成视频", command=self.start_generation, state=tk.NORMAL, bg="#4CAF50"))
-                # 更新状态和导出进度
-                if not self.is_generating:
-                    self.root.after(0, lambda: self.status_label.configure(text=f"已停止视频生成"))
-                else:
-                    self.root.after(0, lambda: self.status_label.configure(text=f"已完成所有 {self.total_video_count} 个视频生成"))
-                    
-                self.root.after(0, lambda cur=self.current_video_index, tot=self.total_video_count: self.export_progress_label.configure(
-                    text=f"导出进度: {cur}/{tot} 视频完成"))
-                    
-                # 重置生成标志
-                self.is_generating = False
-                return
-            
-            # 设置文件名
-            if self.total_video_count > 1:
-                new_filename = f"{self.original_filename}_{self.current_video_index + 1}"
-                self.output_filename.set(new_filename)
-            
-            # 处理不同的歌曲排序
-            if self.current_video_index > 0:
-                # 只有两首歌曲的特殊情况处理
-                if len(self.original_music_files) == 2:
-                    # 直接使用提前准备好的反序列表
-                    self.music_files = self.reversed_music_files.copy()
-                    # 更新状态
-                    self.root.after(0, lambda idx=self.current_video_index+1, total=self.total_video_count: 
-                                self.status_label.configure(text=f"正在生成第 {idx}/{total} 个视频 (反序顺序)..."))
-                # 三首及以上歌曲的随机排序处理
-                else:
-                    import random
-                    max_attempts = 100  # 最大尝试次数，防止无限循环
-                    attempts = 0
-                    
-                    while attempts < max_attempts:
-                        # 复制原始列表并打乱
-                        self.music_files = self.original_music_files.copy()
-                        random.shuffle(self.music_files)
-                        
-                        # 检查是否生成了新的顺序
-                        current_hash = self.get_order_hash(self.music_files)
-                        if current_hash not in self.generated_orders:
-                            # 找到新顺序，保存并跳出循环
-                            self.generated_orders.append(current_hash)
-                            break
-                        
-                        attempts += 1
-                    
-                    # 更新状态，提示是否找到了不重复的顺序
-                    if attempts < max_attempts:
-                        self.root.after(0, lambda idx=self.current_video_index+1, total=self.total_video_count: 
-                                    self.status_label.configure(text=f"正在生成第 {idx}/{total} 个视频 (随机顺序)..."))
-                    else:
-                        # 无法找到不重复的顺序，提示用户并停止生成
-                        error_msg = "无法生成更多不重复的歌曲顺序，已停止处理"
-                        print(error_msg)
-                        self.root.after(0, lambda: self.status_label.configure(text=f"发生错误: {error_msg}"))
-                        self.root.after(0, lambda: messagebox.showerror("错误", error_msg))
-                        
-                        # 恢复原始设置和按钮状态
-                        self.music_files = self.original_music_files.copy()
-                        self.output_filename.set(self.original_filename)
-                        self.root.after(0, lambda: self.generate_btn.config(text="生成视频", state=tk.NORMAL, bg="#4CAF50"))
-                        return
-            else:
-                # 第一次使用原始顺序
-                self.music_files = self.original_music_files.copy()
-                # 更新状态
-                self.root.after(0, lambda: self.status_label.configure(text=f"正在生成第 1/{self.total_video_count} 个视频 (原始顺序)..."))
-            
-            # 为当前视频选择图片
-            if self.image_files:
-                # 选择当前索引对应的图片
-                self.image_file = self.image_files[self.current_image_index % len(self.image_files)]
-                # 增加图片索引，为下一个视频准备
-                self.current_image_index += 1
-                # 如果索引超出范围，重新开始
-                if self.current_image_index >= len(self.image_files):
-                    self.current_image_index = 0
-            
-            # 开始生成当前视频
-            threading.Thread(target=lambda: self.generate_combined_video(self.on_video_complete), daemon=True).start()
-            
-            # 增加索引，准备下一个视频
-            self.current_video_index += 1
-            
+            jobs = self.build_video_jobs(count)
         except Exception as e:
             error_msg = str(e)
             print(f"生成多个视频时出错: {error_msg}")
             self.root.after(0, lambda: self.status_label.configure(text=f"发生错误: {error_msg}"))
             self.root.after(0, lambda: messagebox.showerror("错误", f"生成多个视频时出错: {error_msg}"))
+            jobs = []
+        
+        if jobs:
+            self.run_video_jobs(jobs)
+        
+        # 恢复生成按钮状态
+        self.root.after(0, lambda: self.generate_btn.config(text="生成视频", command=self.start_generation, state=tk.NORMAL, bg="#4CAF50"))
+        
+        # 更新状态
+        if not self.is_generating:
+            self.root.after(0, lambda: self.status_label.configure(text=f"已停止视频生成"))
+        elif jobs and self.completed_video_count == len(jobs):
+            self.root.after(0, lambda: self.status_label.configure(text=f"已完成所有 {len(jobs)} 个视频生成"))
+        
+        # 重置生成标志
+        self.is_generating = False
+    
+    def build_video_jobs(self, count):
+        """为每个要导出的视频生成任务描述（歌曲顺序、文件名和背景图片的快照）"""
+        original_music_files = tuple(self.music_files)
+        original_filename = self.output_filename.get()
+        
+        # 跟踪已生成的歌曲顺序，防止重复
+        generated_orders = [self.get_order_hash(original_music_files)]
+        
+        jobs = []
+        for index in range(count):
+            # 设置文件名
+            if count > 1:
+                output_filename = f"{original_filename}_{index + 1}"
+            else:
+                output_filename = original_filename
             
-            # 恢复生成按钮状态
-            self.root.after(0, lambda: self.generate_btn.config(text="生成视频", state=tk.NORMAL, bg="#4CAF50"))
+            # 处理不同的歌曲排序
+            if index == 0:
+                # 第一次使用原始顺序
+                music_files = original_music_files
+                order_desc = "原始顺序"
+            elif len(original_music_files) == 2:
+                # 只有两首歌曲时直接使用反序列表
+                music_files = tuple(reversed(original_music_files))
+                order_desc = "反序顺序"
+            else:
+                # 三首及以上歌曲的随机排序处理
+                import random
+                max_attempts = 100  # 最大尝试次数，防止无限循环
+                for _ in range(max_attempts):
+                    # 复制原始列表并打乱
+                    shuffled = list(original_music_files)
+                    random.shuffle(shuffled)
+                    
+                    # 检查是否生成了新的顺序
+                    current_hash = self.get_order_hash(shuffled)
+                    if current_hash not in generated_orders:
+                        # 找到新顺序，保存并跳出循环
+                        generated_orders.append(current_hash)
+                        break
+                else:
+                    # 无法找到不重复的顺序
+                    raise Exception("无法生成更多不重复的歌曲顺序，已停止处理")
+                music_files = tuple(shuffled)
+                order_desc = "随机顺序"
+            
+            # 为当前视频选择图片，按顺序轮流使用文件夹中的图片
+            image_file = self.image_files[index % len(self.image_files)] if self.image_files else self.image_file
+            
+            jobs.append(VideoJob(
+                index=index,
+                music_files=music_files,
+                output_filename=output_filename,
+                image_file=image_file,
+                order_desc=order_desc
+            ))
+        
+        return jobs
+    
+    def get_parallel_job_count(self, job_count):
+        """根据CPU核心数和每个任务的编码线程数确定同时运行的视频任务数"""
+        try:
+            parallel_jobs = int(self.parallel_jobs_var.get())
+        except (tk.TclError, ValueError):
+            parallel_jobs = 0
+        
+        if parallel_jobs <= 0:
+            parallel_jobs = max(1, (os.cpu_count() or 1) // ENCODER_THREADS_PER_JOB)
+            # 消费级显卡同时运行的NVENC会话数有限
+            if self.gpu_acceleration_var.get() and self.use_gpu:
+                parallel_jobs = min(parallel_jobs, MAX_GPU_PARALLEL_JOBS)
+        
+        return max(1, min(parallel_jobs, job_count))
+    
+    def run_video_jobs(self, jobs):
+        """并发执行视频任务，并汇总每个任务的进度"""
+        parallel_jobs = self.get_parallel_job_count(len(jobs))
+        
+        # 多个任务同时运行时平分CPU给每个编码器，单个任务时使用编码器默认线程数
+        if parallel_jobs > 1:
+            self.encoder_threads = max(1, (os.cpu_count() or 1) // parallel_jobs)
+        else:
+            self.encoder_threads = 0
+        self.parallel_jobs = parallel_jobs
+        
+        print(f"同时运行 {parallel_jobs} 个视频任务，共 {len(jobs)} 个")
+        
+        self.completed_video_count = 0
+        self.job_progress = {job.index: 0.0 for job in jobs}
+        self.job_start_times = {}
+        self.processing = True
+        
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=parallel_jobs) as executor:
+                futures = [executor.submit(self.run_video_job, job) for job in jobs]
+                for future in concurrent.futures.as_completed(futures):
+                    # 任务内部已处理并显示错误，这里只记录意外异常
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"视频任务执行出错: {str(e)}")
+        finally:
+            self.processing = False
+            self.encoder_threads = 0
+            self.parallel_jobs = 1
+    
+    def run_video_job(self, job):
+        """在任务线程中生成单个视频"""
+        # 如果已经请求停止，不再启动新的任务
+        if not self.is_generating:
+            return False
+        
+        # 记录当前线程正在执行的任务，进度消息会带上任务序号
+        self.job_context.index = job.index
+        try:
+            self.root.after(0, lambda idx=job.index+1, total=self.total_video_count, desc=job.order_desc: 
+                            self.status_label.configure(text=f"正在生成第 {idx}/{total} 个视频 ({desc})..."))
+            success = self.generate_combined_video(job)
+        finally:
+            self.job_context.index = None
+        
+        if success:
+            with self.job_lock:
+                self.completed_video_count += 1
+                self.job_progress[job.index] = 1.0
+                completed = self.completed_video_count
             
-            # 恢复原始设置
-            self.music_files = self.original_music_files.copy()
-            self.output_filename.set(self.original_filename)
+            # 更新导出进度显示
+            self.root.after(0, lambda idx=completed, tot=self.total_video_count: self.export_progress_label.configure(
+                text=f"导出进度: {idx}/{tot} 视频完成"))
+        
+        return success
     
-    def on_video_complete(self):
-        """视频完成后的回调"""
-        # 更新导出进度显示
-        self.root.after(0, lambda idx=self.current_video_index, tot=self.total_video_count: self.export_progress_label.configure(
-            text=f"导出进度: {idx}/{tot} 视频完成"))
-        # 继续生成下一个视频
-        self.generate_next_video()
+    def get_order_hash(self, file_list):
+        """获取歌曲顺序的哈希值，用于检查重复"""
+        # 使用文件路径作为唯一标识
+        order_str = "".join(file_list)
+        import hashlib
+        return hashlib.md5(order_str.encode()).hexdigest()
+    
+    def report_progress(self, stage, progress, message):
+        """将当前任务的进度放入进度队列"""
+        self.progress_queue.put({
+            'job': getattr(self.job_context, 'index', None),
+            'stage': stage,
+            'progress': progress,
+            'message': message
+        })
     
     def start_progress_monitor(self):
         """启动进度监控线程，定期检查队列中的进度更新并应用到UI"""
@@ -935,10 +1273,11 @@ class MusicVideoGenerator:
                     time.sleep(0.1)
                     continue
                 
-                # 更新当前视频耗时显示
-                if self.timer_running:
+                # 更新当前视频耗时显示（多个任务同时运行时显示最早开始的任务）
+                job_start_times = list(self.job_start_times.values())
+                if job_start_times:
                     current_time = time.time()
-                    self.elapsed_time = current_time - self.start_time
+                    self.elapsed_time = current_time - min(job_start_times)
                     elapsed_str = self.format_elapsed_time(self.elapsed_time)
                     self.root.after(0, lambda t=elapsed_str: self.current_time_label.configure(text=f"当前耗时: {t}"))
                     
@@ -951,22 +1290,32 @@ class MusicVideoGenerator:
                 try:
                     # 非阻塞方式获取队列中的进度更新
                     progress_info = self.progress_queue.get_nowait()
+                    job = progress_info.get('job')
                     stage = progress_info.get('stage', '')
                     progress = progress_info.get('progress', 0)
                     message = progress_info.get('message', '')
                     
-                    # 根据处理阶段和进度更新UI
+                    # 根据处理阶段和进度计算单个任务的进度
+                    value = None
                     if stage == 'audio':
                         # 音频合并阶段 (0-33%)
                         value = progress * 0.33
-                        self.root.after(0, lambda v=value: self.progress.configure(value=v))
                     elif stage == 'video':
                         # 视频生成阶段 (33-100%)
                         value = 0.33 + progress * 0.67
+                    
+                    if value is not None:
+                        if job is not None and self.total_video_count > 1:
+                            # 批量导出时进度条显示所有任务的总进度
+                            with self.job_lock:
+                                self.job_progress[job] = value
+                                value = sum(self.job_progress.values()) / self.total_video_count
                         self.root.after(0, lambda v=value: self.progress.configure(value=v))
                     
-                    # 更新状态消息
+                    # 更新状态消息，批量导出时标明所属视频
                     if message:
+                        if job is not None and self.total_video_count > 1:
+                            message = f"[视频 {job + 1}/{self.total_video_count}] {message}"
                         self.root.after(0, lambda m=message: self.status_label.configure(text=m))
                         
                     self.progress_queue.task_done()
@@ -991,6 +1340,7 @@ class MusicVideoGenerator:
     
     def run_ffmpeg_with_progress(self, command, stage, total_duration, message_prefix):
         """运行FFmpeg命令并报告进度"""
+        process = None
         try:
             # 使用subprocess.Popen来获取实时输出
             process = subprocess.Popen(
@@ -1002,8 +1352,8 @@ class MusicVideoGenerator:
                 text=True
             )
             
-            # 存储进程引用以便可以在需要时终止
-            self.ffmpeg_process = process
+            # 登记进程引用以便可以在需要时终止
+            self.register_process(process)
             
             # 读取错误输出（FFmpeg将进度信息输出到stderr）
             for line in process.stderr:
@@ -1016,11 +1366,7 @@ class MusicVideoGenerator:
                 if progress is not None:
                     # 将进度信息放入队列
                     percentage = int(progress * 100)
-                    self.progress_queue.put({
-                        'stage': stage,
-                        'progress': progress,
-                        'message': f"{message_prefix} ({percentage}%)"
-                    })
+                    self.report_progress(stage, progress, f"{message_prefix} ({percentage}%)")
             
             # 等待进程完成或终止它
             if not self.is_generating and process.poll() is None:
@@ -1032,11 +1378,12 @@ class MusicVideoGenerator:
             else:
                 process.wait()
                 
-            self.ffmpeg_process = None
+            self.unregister_process(process)
             return process.returncode
         except Exception as e:
             print(f"FFmpeg执行错误: {str(e)}")
-            self.ffmpeg_process = None
+            if process is not None:
+                self.unregister_process(process)
             return -1
             
     def stop_generation(self):
@@ -1047,48 +1394,428 @@ class MusicVideoGenerator:
         # 设置标志以停止处理
         self.is_generating = False
         
-        # 终止当前FFmpeg进程（如果有）
-        if self.ffmpeg_process and self.ffmpeg_process.poll() is None:
-            try:
-                self.ffmpeg_process.terminate()
-                # 给进程一些时间来优雅地关闭
-                self.ffmpeg_process.wait(timeout=5)
-                # 如果进程未能在超时时间内终止，则强制终止
-                if self.ffmpeg_process.poll() is None:
-                    self.ffmpeg_process.kill()
-            except Exception as e:
-                print(f"终止FFmpeg进程时出错: {str(e)}")
-        
-        # 重置计时器
-        self.timer_running = False
+        # 终止所有执行中的FFmpeg进程
+        with self.ffmpeg_processes_lock:
+            running_processes = list(self.ffmpeg_processes)
+        for process in running_processes:
+            if process.poll() is None:
+                self.terminate_process(process)
         
         # 更新UI
         self.root.after(0, lambda: self.status_label.configure(text="已停止视频生成"))
         self.root.after(0, lambda: self.generate_btn.config(text="生成视频", command=self.start_generation, state=tk.NORMAL, bg="#4CAF50"))
+    
+    def register_process(self, process):
+        """登记执行中的FFmpeg进程，停止生成时统一终止"""
+        with self.ffmpeg_processes_lock:
+            self.ffmpeg_processes.add(process)
+    
+    def unregister_process(self, process):
+        """移除已结束的FFmpeg进程"""
+        with self.ffmpeg_processes_lock:
+            self.ffmpeg_processes.discard(process)
+    
+    def terminate_process(self, process):
+        """终止FFmpeg进程，超时后强制结束"""
+        try:
+            process.terminate()
+            # 给进程一些时间来优雅地关闭
+            process.wait(timeout=5)
+        except Exception as e:
+            print(f"终止FFmpeg进程时出错: {str(e)}")
+        finally:
+            # 如果进程未能在超时时间内终止，则强制终止
+            if process.poll() is None:
+                process.kill()
+    
+    def get_segment_samples(self, duration):
+        """分段模式下每首歌的采样数：补齐到AAC帧长的整数倍，片段的每一帧都是完整的歌曲内容"""
+        frames = math.ceil(round(duration * COMBINED_SAMPLE_RATE) / AAC_FRAME_SAMPLES)
+        return max(1, frames) * AAC_FRAME_SAMPLES
+    
+    def align_segment_durations(self, music_info):
+        """将每首歌的时长对齐到分段片段的实际时长（最多补齐一帧），返回新的总时长
+        
+        歌单、分页和歌词都使用对齐后的时长，与流复制拼接后的时间轴一致
+        """
+        for info in music_info:
+            info['duration'] = self.get_segment_samples(info['duration']) / COMBINED_SAMPLE_RATE
+        return sum(info['duration'] for info in music_info)
+    
+    def get_transcode_workers(self, task_count):
+        """获取单个视频任务的音频转码并发数，用户未设置时根据CPU核心数自动选择
+        
+        设置值（或CPU核心数）是所有同时运行的视频任务共用的总并发数，按任务数平分
+        """
+        try:
+            workers = int(self.transcode_workers.get())
+        except (tk.TclError, ValueError):
+            workers = 0
+        
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        
+        workers //= max(1, self.parallel_jobs)
+        return max(1, min(workers, task_count))
+    
+    def transcode_audio_file(self, source_file, temp_output, transcode_args, cache):
+        """将单个音频文件按指定参数转码，在转码线程池中执行"""
+        # 如果已经请求停止，不再启动新的转码
+        if not self.is_generating:
+            return None
         
-        # 如果处于批量生成模式，则恢复原始设置
-        if hasattr(self, 'original_music_files'):
-            self.music_files = self.original_music_files.copy()
-            if hasattr(self, 'original_filename'):
-                self.output_filename.set(self.original_filename)
+        # 优先使用转码缓存，命中时直接复用之前的转码结果
+        cache_key = None
+        if cache:
+            try:
+                cache_key = cache.make_key(source_file, transcode_args)
+            except OSError as e:
+                print(f"读取转码缓存时出错: {str(e)}")
+        
+        if cache_key:
+            # 同时运行的视频任务转码同一首歌时，后到的任务等待并直接使用缓存
+            with cache.key_lock(cache_key):
+                cached_file = cache.get(cache_key)
+                if cached_file:
+                    print(f"使用转码缓存: {os.path.basename(source_file)}")
+                    return cached_file
+                return self.run_transcode(source_file, cache.temp_path_for(cache_key), transcode_args, cache, cache_key)
+        
+        return self.run_transcode(source_file, temp_output, transcode_args, None, None)
     
-    def generate_combined_video(self, callback=None):
+    def run_transcode(self, source_file, temp_output, transcode_args, cache, cache_key):
+        """执行FFmpeg转码，cache_key不为空时将结果放入缓存"""
+        print(f"转换音频文件: {os.path.basename(source_file)}")
+        
+        # 使用FFmpeg转换音频格式
+        convert_command = ['ffmpeg', '-i', source_file] + transcode_args + ['-y', temp_output]
+        
         try:
-            # 标记处理开始
-            self.processing = True
+            # 执行转换命令
+            process = subprocess.Popen(
+                convert_command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+            
+            # 登记子进程，以便停止时可以全部终止
+            self.register_process(process)
+            try:
+                _, stderr = process.communicate()
+            finally:
+                self.unregister_process(process)
+            
+            # 停止请求导致的进程结束不算作转换失败
+            if not self.is_generating:
+                if cache_key:
+                    cache.discard(temp_output)
+                return None
+            
+            if process.returncode != 0:
+                print(f"转换音频错误: {stderr.decode('utf-8', errors='ignore')}")
+                raise Exception(f"转换音频文件失败: {os.path.basename(source_file)}")
+            
+            # 转换成功后放入缓存
+            if cache_key:
+                return cache.put(cache_key, temp_output)
+            
+            # 使用转换后的文件
+            return temp_output
+            
+        except Exception as e:
+            print(f"转换音频出错: {str(e)}")
+            if cache_key:
+                cache.discard(temp_output)
+            raise Exception(f"转换音频文件失败: {os.path.basename(source_file)}")
+    
+    def transcode_audio_files(self, music_info, temp_dir, segment_mode=False):
+        """并发转码音频，返回按歌单顺序排列的(索引, 转换后文件)列表
+        
+        segment_mode为False时只将非MP3格式转换为MP3；为True时将每首歌都编码为AAC片段，
+        片段按get_segment_samples补齐或裁剪到AAC帧长的整数倍
+        """
+        if segment_mode:
+            cache, extension = self.segment_cache, '.m4a'
+        else:
+            cache, extension = self.transcode_cache, '.mp3'
+        
+        tasks = []
+        for i, info in enumerate(music_info):
+            source_file = info['file']
+            file_ext = os.path.splitext(source_file)[1].lower()
+            
+            # 如果文件不是MP3格式，需要先转换（分段模式下每首歌都需要编码）
+            if segment_mode:
+                # 采样数写在滤镜参数中，也是缓存键的一部分
+                samples = self.get_segment_samples(info['duration'])
+                transcode_args = SEGMENT_TRANSCODE_ARGS + [
+                    '-af', 
+                    f"aresample={COMBINED_SAMPLE_RATE},aformat=sample_fmts=fltp:channel_layouts=stereo,"
+                    f"apad=whole_len={samples},atrim=end_sample={samples}"
+                ]
+            elif file_ext != '.mp3':
+                transcode_args = MP3_TRANSCODE_ARGS
+            else:
+                continue
+            tasks.append((i, source_file, os.path.join(temp_dir, f"temp_{i}{extension}"), transcode_args))
+        
+        if not tasks:
+            return []
+        
+        workers = self.get_transcode_workers(len(tasks))
+        print(f"使用 {workers} 个并发任务转换 {len(tasks)} 个音频文件")
+        
+        converted_files = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                (i, executor.submit(self.transcode_audio_file, source_file, temp_output, transcode_args, cache))
+                for i, source_file, temp_output, transcode_args in tasks
+            ]
             
+            try:
+                # 按歌单顺序收集结果
+                for done_count, (i, future) in enumerate(futures, 1):
+                    temp_output = future.result()
+                    if temp_output:
+                        converted_files.append((i, temp_output))
+                    
+                    self.report_progress(
+                        'audio', 
+                        0.2 + 0.3 * done_count / len(futures), 
+                        f"步骤2/4: 转换音频文件 ({done_count}/{len(futures)})..."
+                    )
+            except Exception:
+                # 任一转换失败时取消尚未开始的转码任务
+                # （其他视频任务可能同时在运行，因此不终止全局登记的进程）
+                for _, future in futures:
+                    future.cancel()
+                raise
+        
+        # 缓存超过容量上限时淘汰最久未使用的文件（保留本次任务正在使用的文件）
+        if cache:
+            cache.evict(keep=[temp_output for _, temp_output in converted_files])
+        
+        return converted_files
+    
+    def combine_audio_single_pass(self, music_info, temp_dir, total_duration):
+        """单次编码合并音频：用concat滤镜解码所有原始音频，直接编码为最终的AAC音频流"""
+        return self.encode_combined_audio(
+            [info['file'] for info in music_info], 
+            music_info, 
+            temp_dir, 
+            total_duration, 
+            "步骤2/4: 合并音频文件"
+        )
+    
+    def encode_combined_audio(self, input_files, music_info, temp_dir, total_duration, status_text):
+        """用concat滤镜合并解码后的音频并只编码一次，返回合并后的音频文件，失败时返回None
+        
+        每首歌按探测到的时长精确裁剪或补齐，歌曲之间没有额外的静音，
+        每首歌的开始时间与歌单和歌词使用的时间轴一致
+        """
+        temp_audio = os.path.join(temp_dir, "combined_audio.m4a")
+        
+        audio_command = ['ffmpeg']
+        for input_file in input_files:
+            audio_command.extend(['-i', input_file])
+        
+        # 统一采样率、声道和采样格式，concat滤镜要求所有输入的音频参数一致
+        filter_parts = []
+        for i, info in enumerate(music_info):
+            samples = int(round(info['duration'] * COMBINED_SAMPLE_RATE))
+            filter_parts.append(
+                f"[{i}:a:0]aresample={COMBINED_SAMPLE_RATE},aformat=sample_fmts=fltp:channel_layouts=stereo,"
+                f"apad=whole_len={samples},atrim=end_sample={samples},asetpts=N/SR/TB[a{i}]"
+            )
+        concat_inputs = "".join(f"[a{i}]" for i in range(len(music_info)))
+        filter_parts.append(f"{concat_inputs}concat=n={len(music_info)}:v=0:a=1[aout]")
+        
+        # 滤镜图写入脚本文件，避免歌曲较多时命令行过长
+        filter_script = os.path.join(temp_dir, "audio_filter.txt")
+        with open(filter_script, 'w', encoding='utf-8') as f:
+            f.write(";\n".join(filter_parts))
+        
+        audio_command.extend([
+            '-filter_complex_script', filter_script,
+            '-map', '[aout]',
+            '-c:a', 'aac',
+            '-b:a', '192k',
+            '-y',
+            temp_audio
+        ])
+        
+        print(f"执行合并音频命令: {' '.join(audio_command)}")
+        
+        audio_result = self.run_ffmpeg_with_progress(
+            audio_command, 
+            'audio', 
+            total_duration, 
+            status_text
+        )
+        
+        if audio_result != 0 or not self.check_combined_duration(temp_audio, total_duration):
+            return None
+        
+        return temp_audio
+    
+    def check_combined_duration(self, audio_file, total_duration):
+        """检查合并后的音频时长与各首歌探测时长之和是否一致
+        
+        没有安装ffprobe时无法读取时长，跳过检查（否则每次导出都会在完成编码后回退到MP3方式）
+        """
+        if not shutil.which('ffprobe'):
+            print("警告: 未找到ffprobe，跳过合并后音频的时长检查")
+            return True
+        
+        info = probe_with_ffprobe(audio_file)
+        if not info:
+            print(f"无法读取合并后音频的时长: {audio_file}")
+            return False
+        
+        difference = info['duration'] - total_duration
+        if abs(difference) > COMBINED_DURATION_TOLERANCE:
+            print(f"合并后的音频时长 {info['duration']:.3f} 秒与歌单时长 {total_duration:.3f} 秒相差 {difference:.3f} 秒")
+            return False
+        
+        return True
+    
+    def write_concat_list(self, files, list_file, points=None):
+        """写入FFmpeg concat分离器使用的文件列表
+        
+        points为每个文件的(inpoint, outpoint)秒数列表，不为空时只使用每个文件的这一段
+        """
+        with open(list_file, 'w', encoding='utf-8') as f:
+            for i, file in enumerate(files):
+                # 确保文件路径格式正确（对于Windows和Unix系统）
+                if os.name == 'nt':  # Windows系统
+                    file_path = file.replace('\\', '\\\\')
+                else:
+                    file_path = file
+                f.write(f"file '{file_path}'\n")
+                if points:
+                    inpoint, outpoint = points[i]
+                    f.write(f"inpoint {inpoint:.6f}\noutpoint {outpoint:.6f}\n")
+    
+    def combine_audio_segments(self, music_info, temp_dir, total_duration):
+        """分段合并音频：每首歌只编码一次AAC片段（带缓存），不同顺序的视频直接流复制拼接
+        
+        music_info中的时长需要已经用align_segment_durations对齐到AAC帧长
+        """
+        try:
+            segment_files = self.transcode_audio_files(music_info, temp_dir, segment_mode=True)
+        except Exception as e:
+            print(f"编码分段音频出错: {str(e)}")
+            return None
+        
+        # 检查是否请求停止
+        if not self.is_generating or len(segment_files) != len(music_info):
+            return None
+        
+        # 每个片段开头是一帧编码器延迟，之后是整数帧的歌曲内容，末尾是编码器补齐的帧。
+        # inpoint跳过延迟帧、outpoint去掉补齐帧，两者都落在AAC帧边界上，流复制时按帧精确裁剪，
+        # 歌曲之间没有静音间隙，每首歌的起始时间与歌单时间轴一致
+        points = []
+        for info in music_info:
+            samples = self.get_segment_samples(info['duration'])
+            points.append((
+                AAC_PRIMING_SAMPLES / COMBINED_SAMPLE_RATE,
+                (AAC_PRIMING_SAMPLES + samples) / COMBINED_SAMPLE_RATE
+            ))
+        
+        audio_list_file = os.path.join(temp_dir, "segment_list.txt")
+        self.write_concat_list([segment_file for _, segment_file in segment_files], audio_list_file, points)
+        
+        temp_audio = os.path.join(temp_dir, "combined_audio.m4a")
+        audio_command = [
+            'ffmpeg',
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', audio_list_file,
+            '-c', 'copy',
+            '-y',
+            temp_audio
+        ]
+        
+        print(f"执行拼接音频片段命令: {' '.join(audio_command)}")
+        
+        audio_result = self.run_ffmpeg_with_progress(
+            audio_command, 
+            'audio', 
+            total_duration, 
+            "步骤2/4: 拼接音频片段"
+        )
+        
+        if audio_result != 0 or not self.check_combined_duration(temp_audio, total_duration):
+            return None
+        
+        return temp_audio
+    
+    def combine_audio_via_mp3(self, music_info, temp_dir, total_duration):
+        """先将非MP3音频转码为MP3，再用concat分离器合并，返回合并后的音频文件"""
+        # 首先将所有非MP3格式转换为MP3格式（使用有上限的并发转码）
+        converted_files = self.transcode_audio_files(music_info, temp_dir)
+        
+        # 检查是否请求停止
+        if not self.is_generating:
+            return None
+        
+        # 更新音乐信息中的文件路径
+        for idx, temp_file in converted_files:
+            music_info[idx]['file'] = temp_file
+        
+        # 创建合并音频的列表文件
+        audio_list_file = os.path.join(temp_dir, "audio_list.txt")
+        self.write_concat_list([info['file'] for info in music_info], audio_list_file)
+        
+        temp_audio = os.path.join(temp_dir, "combined_audio.mp3")
+        
+        # 运行音频合并命令
+        audio_command = [
+            'ffmpeg',
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', audio_list_file,
+            '-c:a', 'libmp3lame',
+            '-q:a', '4',
+            '-y',
+            temp_audio
+        ]
+        
+        print(f"执行合并音频命令: {' '.join(audio_command)}")
+        
+        # 运行音频合并并监控进度
+        audio_result = self.run_ffmpeg_with_progress(
+            audio_command, 
+            'audio', 
+            total_duration, 
+            "步骤2/4: 合并音频文件"
+        )
+        
+        if not self.is_generating:
+            return None
+        
+        if audio_result != 0:
+            raise Exception("合并音频文件失败")
+        
+        return temp_audio
+    
+    def generate_combined_video(self, job):
+        """根据任务描述生成一个合并视频，成功时返回True"""
+        success = False
+        job_start_time = time.time()
+        try:
             # 如果已经请求停止，直接返回
             if not self.is_generating:
-                self.processing = False
-                return
+                return False
             
             # 开始计时
-            self.start_time = time.time()
-            self.timer_running = True
+            with self.job_lock:
+                self.job_start_times[job.index] = job_start_time
             
             # 设置进度条最大值为1（0-100%）
             self.root.after(0, lambda: self.progress.configure(maximum=1.0))
-            self.root.after(0, lambda: self.progress.configure(value=0.0))
+            if self.total_video_count <= 1:
+                self.root.after(0, lambda: self.progress.configure(value=0.0))
             
             # 创建临时工作目录
             with tempfile.TemporaryDirectory() as temp_dir:
@@ -1096,439 +1823,183 @@ class MusicVideoGenerator:
                 self.root.after(0, lambda: self.status_label.configure(text="步骤1/4: 分析音频文件..."))
                 
                 # 1. 分析所有音频文件，获取时长信息
-                music_info = []
-                current_time = 0
-                total_duration = 0
+                # 批量并发探测所有音频文件的元数据和歌词位置
+                probed_files = self.probe_music_files(job.music_files)
+                music_info, total_duration = self.build_music_info(job.music_files, probed_files)
                 
-                for music_file in self.music_files:
-                    # 检查是否请求停止
-                    if not self.is_generating:
-                        self.processing = False
-                        return
-                        
-                    # 提取音频元数据
-                    title, artist, duration = self.extract_audio_info(music_file)
-                    total_duration += duration
-                    
-                    # 使用更好的显示名称（标题+艺术家）
-                    display_name = title
-                    if artist:
-                        display_name = f"{artist} - {title}"
-                    
-                    # 确保display_name不包含文件扩展名
-                    display_name = os.path.splitext(display_name)[0]
-                    
-                    # 检查歌词文件
-                    has_lyrics = False
-                    lyrics_path = None
-                    
-                    # 1. 检查是否有同名的.lrc文件
-                    base_name = os.path.splitext(music_file)[0]
-                    lrc_file = base_name + '.lrc'
-                    if os.path.exists(lrc_file):
-                        has_lyrics = True
-                        lyrics_path = lrc_file
-                    
-                    # 2. 如果没有同名文件，检查歌词文件夹中是否有对应的歌词文件
-                    if not has_lyrics and self.lyrics_folder and os.path.exists(self.lyrics_folder):
-                        # 获取音频文件名（不含路径和扩展名）
-                        audio_filename = os.path.basename(music_file)
-                        filename_no_ext = os.path.splitext(audio_filename)[0]
-                        
-                        # 检查歌词文件夹中是否存在对应的歌词文件
-                        lrc_path = os.path.join(self.lyrics_folder, filename_no_ext + ".lrc")
-                        if os.path.exists(lrc_path):
-                            has_lyrics = True
-                            lyrics_path = lrc_path
-                        
-                        # 如果文件名包含艺术家和歌曲名信息（如"艺术家-歌曲名"格式）
-                        if not has_lyrics and '-' in filename_no_ext:
-                            artist_name, song_title = filename_no_ext.split('-', 1)
-                            artist_name = artist_name.strip()
-                            song_title = song_title.strip()
-                            
-                            # 检查可能的歌词文件名格式
-                            possible_names = [
-                                f"{artist_name} - {song_title}.lrc",
-                                f"{song_title}.lrc",
-                                f"{artist_name}-{song_title}.lrc"
-                            ]
-                            
-                            for lrc_name in possible_names:
-                                lrc_path = os.path.join(self.lyrics_folder, lrc_name)
-                                if os.path.exists(lrc_path):
-                                    has_lyrics = True
-                                    lyrics_path = lrc_path
-                                    break
-                    
-                    # 计算时间点
-                    start_time = current_time
-                    end_time = start_time + duration
-                    
-                    # 时间格式化 (HH:MM:SS)
-                    start_time_fmt = self.format_time(start_time)
-                    
-                    music_info.append({
-                        'file': music_file,
-                        'title': title,
-                        'artist': artist,
-                        'duration': duration,
-                        'start_time': start_time,
-                        'start_time_fmt': start_time_fmt,
-                        'display_name': display_name,
-                        'has_lyrics': has_lyrics,
-                        'lyrics_path': lyrics_path
-                    })
-                    
-                    current_time = end_time
+                # 分段模式下每首歌的时长对齐到AAC帧长，歌单和歌词与拼接后的音频使用同一时间轴
+                audio_mode = self.get_audio_mode()
+                if audio_mode == 'segments':
+                    total_duration = self.align_segment_durations(music_info)
+                
+                # 检查是否请求停止
+                if not self.is_generating:
+                    return False
                 
                 # 更新进度队列，表示分析完成
-                self.progress_queue.put({
-                    'stage': 'audio',
-                    'progress': 0.1,
-                    'message': "步骤2/4: 生成带歌单的视频..."
-                })
+                self.report_progress('audio', 0.1, "步骤2/4: 生成带歌单的视频...")
                 
-                # 2. 生成包含歌单的背景图
-                img_with_playlist = os.path.join(temp_dir, "background_with_playlist.png")
-                self.create_image_with_playlist(music_info, img_with_playlist)
+                # 2. 生成包含歌单的背景图（歌曲较多时分为多页）
+                playlist_pages = self.create_playlist_pages(music_info, temp_dir, job.image_file)
+                img_with_playlist = playlist_pages[0][0]
                 
                 # 确保输出目录存在
-                output_file = os.path.join(self.output_dir, f"{self.output_filename.get()}.mp4")
+                output_file = os.path.join(self.output_dir, f"{job.output_filename}.mp4")
                 os.makedirs(os.path.dirname(output_file), exist_ok=True)
                 
                 # 更新进度队列，表示准备合并音频
-                self.progress_queue.put({
-                    'stage': 'audio',
-                    'progress': 0.2,
-                    'message': "步骤2/4: 准备合并音频文件..."
-                })
-                
-                # 根据音频类型进行处理
-                # 首先将所有非MP3格式转换为MP3格式
-                converted_files = []
-                for i, info in enumerate(music_info):
-                    source_file = info['file']
-                    file_ext = os.path.splitext(source_file)[1].lower()
-                    
-                    # 如果文件不是MP3格式，需要先转换
-                    if file_ext != '.mp3':
-                        print(f"转换音频文件: {os.path.basename(source_file)}")
-                        temp_mp3 = os.path.join(temp_dir, f"temp_{i}.mp3")
+                self.report_progress('audio', 0.2, "步骤2/4: 准备合并音频文件...")
+                
+                # 根据音频合并方式进行处理
+                temp_audio = None
+                if audio_mode in ('single_pass', 'segments'):
+                    if audio_mode == 'segments':
+                        # 分段：每首歌只编码一次AAC片段（带缓存），不同顺序的视频直接流复制拼接
+                        temp_audio = self.combine_audio_segments(music_info, temp_dir, total_duration)
                         
-                        # 使用FFmpeg转换音频格式
-                        convert_command = [
-                            'ffmpeg',
-                            '-i', source_file,
-                            '-vn',  # 不处理视频流
-                            '-ar', '44100',  # 设置采样率
-                            '-ac', '2',  # 设置声道数
-                            '-b:a', '192k',  # 设置比特率
-                            '-y',
-                            temp_mp3
-                        ]
-                        
-                        try:
-                            # 执行转换命令
-                            process = subprocess.Popen(
-                                convert_command,
-                                stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE
-                            )
-                            
-                            _, stderr = process.communicate()
-                            
-                            if process.returncode != 0:
-                                print(f"转换音频错误: {stderr.decode('utf-8', errors='ignore')}")
-                                raise Exception(f"转换音频文件失败: {os.path.basename(source_file)}")
-                            
-                            # 使用转换后的文件
-                            converted_files.append((i, temp_mp3))
-                            
-                        except Exception as e:
-                            print(f"转换音频出错: {str(e)}")
-                            raise Exception(f"转换音频文件失败: {os.path.basename(source_file)}")
-                
-                # 更新音乐信息中的文件路径
-                for idx, temp_file in converted_files:
-                    music_info[idx]['file'] = temp_file
-                
-                # 创建合并音频的列表文件
-                audio_list_file = os.path.join(temp_dir, "audio_list.txt")
-                with open(audio_list_file, 'w', encoding='utf-8') as f:
-                    for info in music_info:
-                        # 确保文件路径格式正确（对于Windows和Unix系统）
-                        if os.name == 'nt':  # Windows系统
-                            file_path = info['file'].replace('\\', '\\\\')
-                        else:
-                            file_path = info['file']
-                        f.write(f"file '{file_path}'\n")
-                
-                temp_audio = os.path.join(temp_dir, "combined_audio.mp3")
-                
-                # 合并音频
-                try:
-                    # 运行音频合并命令
-                    audio_command = [
-                        'ffmpeg',
-                        '-f', 'concat',
-                        '-safe', '0',
-                        '-i', audio_list_file,
-                        '-c:a', 'libmp3lame',
-                        '-q:a', '4',
-                        '-y',
-                        temp_audio
-                    ]
+                        if not temp_audio and self.is_generating:
+                            print("合并音频片段失败，回退为单次编码")
+                            audio_mode = 'single_pass'
                     
-                    print(f"执行合并音频命令: {' '.join(audio_command)}")
+                    if audio_mode == 'single_pass':
+                        # 单次编码：用concat滤镜直接合并原始音频，只编码一次得到最终AAC音频流
+                        temp_audio = self.combine_audio_single_pass(music_info, temp_dir, total_duration)
                     
-                    # 运行音频合并并监控进度
-                    audio_result = self.run_ffmpeg_with_progress(
-                        audio_command, 
-                        'audio', 
-                        total_duration, 
-                        "步骤2/4: 合并音频文件"
-                    )
+                    # 检查是否请求停止
+                    if not self.is_generating:
+                        return False
                     
-                    if audio_result != 0:
-                        raise Exception("合并音频文件失败")
+                    if not temp_audio:
+                        print("合并音频失败，回退为先转码再合并")
+                
+                # 合并音频
+                try:
+                    if not temp_audio:
+                        temp_audio = self.combine_audio_via_mp3(music_info, temp_dir, total_duration)
+                        
+                        # 检查是否请求停止
+                        if not self.is_generating:
+                            return False
                     
                     # 更新进度，表示音频合并完成
-                    self.progress_queue.put({
-                        'stage': 'audio',
-                        'progress': 1.0,
-                        'message': "步骤3/4: 处理歌词字幕..."
-                    })
+                    self.report_progress('audio', 1.0, "步骤3/4: 处理歌词字幕...")
                     
                     # 3. 如果有歌词，将LRC文件转换为字幕文件
                     subtitle_file = None
                     if self.show_lyrics_var.get() and any(info['has_lyrics'] for info in music_info):
-                        # 将字幕文件保存到固定位置，避免路径问题
-                        subtitle_file = os.path.join(temp_dir, "lyrics.srt")
+                        # 使用ASS字幕，样式和字体直接写在文件头中
+                        subtitle_file = os.path.join(temp_dir, "lyrics.ass")
                         self.convert_lrc_to_subtitle(music_info, subtitle_file)
                     else:
-                        self.progress_queue.put({
-                            'stage': 'video',
-                            'progress': 0.0,
-                            'message': "步骤3/4: 跳过字幕处理(无歌词)..."
-                        })
+                        self.report_progress('video', 0.0, "步骤3/4: 跳过字幕处理(无歌词)...")
                     
                     # 4. 创建视频
-                    self.progress_queue.put({
-                        'stage': 'video',
-                        'progress': 0.1,
-                        'message': "步骤4/4: 生成最终视频..."
-                    })
+                    self.report_progress('video', 0.1, "步骤4/4: 生成最终视频...")
                     
-                    # 确保输出路径正确处理
-                    safe_output_file = output_file.replace('\\', '/')
-                    video_creation_success = False
+                    # 编码器直接写入输出目录中的临时文件，成功后原子重命名为最终文件
+                    partial_output_file = self.get_partial_output_path(output_file)
                     
-                    # 如果有字幕，使用两步法：先创建带字幕的临时视频
-                    if subtitle_file and os.path.exists(subtitle_file) and os.name == 'nt':
-                        # 步骤1：创建带字幕的临时视频
-                        temp_video_with_sub = os.path.join(temp_dir, "temp_with_sub.mp4")
+                    try:
+                        burn_subtitles = subtitle_file and os.path.exists(subtitle_file)
+                        
+                        # 不需要烧录字幕时画面完全静止，优先使用静态画面快速编码；
+                        # 需要烧录字幕时优先使用预渲染的歌词画面，只在歌词变化时提供新画面
+                        video_result = None
+                        if (burn_subtitles and self.lyrics_render_var.get() == "prerender") or \
+                                (not burn_subtitles and len(playlist_pages) > 1):
+                            # 多页歌单没有歌词时也通过concat分离器按页面显示时长提供画面
+                            video_result = self.create_prerendered_lyrics_video(
+                                playlist_pages, 
+                                temp_audio, 
+                                partial_output_file, 
+                                music_info, 
+                                total_duration, 
+                                temp_dir, 
+                                with_lyrics=bool(burn_subtitles)
+                            )
+                            if video_result != 0 and self.is_generating:
+                                print("预渲染歌词画面失败，回退为逐帧编码")
+                        elif not burn_subtitles and self.static_video_var.get():
+                            video_result = self.create_static_video(
+                                img_with_playlist, 
+                                temp_audio, 
+                                partial_output_file, 
+                                total_duration, 
+                                temp_dir
+                            )
+                            if video_result != 0 and self.is_generating:
+                                print("静态画面快速编码失败，回退为逐帧编码")
                         
-                        # 切换到临时目录
-                        old_cwd = os.getcwd()
-                        os.chdir(temp_dir)
+                        # 停止请求导致的失败不再回退重试
+                        if video_result != 0 and not self.is_generating:
+                            return False
                         
-                        try:
-                            # 获取用户设置的字体大小
-                            font_size = self.lyrics_font_size.get()
-                            
-                            # 如果用户选择了自定义字体，将其复制到临时目录
-                            font_name = "default"
-                            if self.custom_font_path and os.path.exists(self.custom_font_path):
-                                # 获取字体文件名
-                                font_file_name = os.path.basename(self.custom_font_path)
-                                font_name = self.get_font_name(self.custom_font_path)
-                                # 复制字体文件到临时目录
-                                print(f"复制字体文件 {self.custom_font_path} 到临时目录")
-                                shutil.copy2(self.custom_font_path, os.path.join(temp_dir, font_file_name))
+                        if video_result != 0:
+                            # 逐帧编码视频（需要烧录字幕或静态编码失败）
+                            if len(playlist_pages) > 1:
+                                # 多页歌单：按每页的显示时长提供背景图片
+                                pages_list = os.path.join(temp_dir, "playlist_pages.txt")
+                                write_frame_concat_list(
+                                    self.get_page_frames(playlist_pages, total_duration), 
+                                    pages_list
+                                )
+                                video_input = ['-f', 'concat', '-safe', '0', '-i', pages_list]
+                            else:
+                                video_input = ['-loop', '1', '-i', img_with_playlist]
                             
-                            # 使用相对路径
-                            sub_command = [
-                                'ffmpeg',
-                                '-loop', '1',
-                                '-i', img_with_playlist,
-                                '-i', temp_audio,
-                            ]
+                            video_command = ['ffmpeg']
+                            video_command.extend(video_input)
+                            video_command.extend(['-i', temp_audio])
+                            video_command.extend(self.get_video_codec_args())
+                            video_command.extend(self.get_audio_codec_args(temp_audio))
+                            video_command.append('-shortest')
                             
-                            # 设置字幕滤镜参数，使用临时目录中的字体
-                            subtitle_filter = f'subtitles=lyrics.srt:fontsdir=.:force_style=\'FontSize={font_size}'
-                            # 如果有自定义字体，设置FontName
-                            if self.custom_font_path and os.path.exists(self.custom_font_path):
-                                subtitle_filter += f',FontName={font_name}\''
-                            else:
-                                subtitle_filter += '\''
+                            # 有字幕时使用ass滤镜直接烧录，使用绝对路径，不需要切换工作目录
+                            # 多页歌单的画面只在翻页时变化，先按固定帧率补齐画面再烧录字幕
+                            video_filters = []
+                            if len(playlist_pages) > 1:
+                                video_filters.append(f"fps={STILL_FRAME_RATE}")
+                            if burn_subtitles:
+                                video_filters.append(self.get_subtitle_filter(subtitle_file))
+                            if video_filters:
+                                video_command.extend([
+                                    '-vf', ','.join(video_filters)
+                                ])
                             
-                            # 添加字幕滤镜参数
-                            sub_command.extend([
-                                '-vf', subtitle_filter,
-                                '-c:v', 'h264_nvenc' if self.gpu_acceleration_var.get() and self.use_gpu else 'libx264',
-                                '-preset', 'p7' if self.gpu_acceleration_var.get() and self.use_gpu else 'medium',
-                                '-crf', '23',
-                                '-c:a', 'aac',
-                                '-b:a', '192k',
-                                '-pix_fmt', 'yuv420p',
-                                '-shortest',
-                                '-y',
-                                temp_video_with_sub
-                            ])
+                            # 添加输出文件
+                            video_command.extend(self.get_output_muxer_args())
+                            video_command.extend(['-y', partial_output_file])
                             
-                            print(f"执行创建带字幕的临时视频命令: {' '.join(sub_command)}")
+                            print(f"执行创建视频命令: {' '.join(video_command)}")
                             
-                            # 运行带字幕的视频生成并监控进度
+                            # 使用进度监控运行视频生成命令
                             video_result = self.run_ffmpeg_with_progress(
-                                sub_command, 
+                                video_command, 
                                 'video', 
                                 total_duration, 
-                                "步骤4/4: 生成带字幕的临时视频"
+                                "步骤4/4: 生成带字幕的视频" if burn_subtitles else "步骤4/4: 生成视频"
                             )
                             
                             if video_result != 0:
-                                print(f"创建带字幕的临时视频错误")
-                                temp_video_with_sub = None
-                        finally:
-                            # 恢复工作目录
-                            os.chdir(old_cwd)
-                            
-                        # 步骤2：复制临时视频到最终位置
-                        if temp_video_with_sub and os.path.exists(temp_video_with_sub):
-                            self.progress_queue.put({
-                                'stage': 'video',
-                                'progress': 0.9,
-                                'message': "步骤4/4: 完成视频处理..."
-                            })
-                            
-                            # 直接复制视频文件
-                            copy_command = [
-                                'ffmpeg',
-                                '-i', temp_video_with_sub,
-                                '-c', 'copy',
-                                '-y',
-                                safe_output_file
-                            ]
-                            
-                            print(f"执行复制最终视频命令: {' '.join(copy_command)}")
-                            
-                            process = subprocess.Popen(
-                                copy_command,
-                                stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE
-                            )
-                            
-                            _, stderr = process.communicate()
-                            
-                            if process.returncode != 0:
-                                print(f"复制最终视频错误: {stderr.decode('utf-8', errors='ignore')}")
+                                if not self.is_generating:
+                                    return False
                                 raise Exception("生成视频失败")
-                            
-                            video_creation_success = True
-                    
-                    # 如果前面的步骤没有成功，尝试标准视频生成
-                    if not video_creation_success:
-                        # 创建临时视频文件
-                        temp_video = os.path.join(temp_dir, "temp_video.mp4")
-                        
-                        # 创建标准视频（无字幕或非Windows系统）
-                        video_command = [
-                            'ffmpeg',
-                            '-loop', '1',
-                            '-i', img_with_playlist,
-                            '-i', temp_audio,
-                            '-c:v', 'h264_nvenc' if self.gpu_acceleration_var.get() and self.use_gpu else 'libx264',
-                            '-preset', 'p7' if self.gpu_acceleration_var.get() and self.use_gpu else 'medium',
-                            '-crf', '23',
-                            '-c:a', 'aac',
-                            '-b:a', '192k',
-                            '-pix_fmt', 'yuv420p',
-                            '-shortest',
-                            '-y'
-                        ]
-                        
-                        # 如果是非Windows系统且有字幕文件，添加字幕滤镜
-                        if subtitle_file and os.path.exists(subtitle_file) and os.name != 'nt':
-                            # 添加字体大小设置
-                            font_size = self.lyrics_font_size.get()
-                            
-                            # 如果用户选择了自定义字体，将其复制到临时目录
-                            font_name = ""
-                            if self.custom_font_path and os.path.exists(self.custom_font_path):
-                                # 获取字体文件名
-                                font_file_name = os.path.basename(self.custom_font_path)
-                                font_name = self.get_font_name(self.custom_font_path)
-                                # 复制字体文件到临时目录
-                                print(f"复制字体文件 {self.custom_font_path} 到临时目录")
-                                shutil.copy2(self.custom_font_path, os.path.join(temp_dir, font_file_name))
-                                
-                                # 设置字幕滤镜参数，使用当前目录字体
-                                subtitle_filter = f"subtitles='{subtitle_file}':fontsdir='{temp_dir}':force_style='FontSize={font_size},FontName={font_name}'"
-                            else:
-                                # 使用系统默认字体目录
-                                font_dir = "/usr/share/fonts/truetype" if os.name != 'nt' else "C:/Windows/Fonts"
-                                subtitle_filter = f"subtitles='{subtitle_file}':fontsdir='{font_dir}':force_style='FontSize={font_size}'"
-                            
-                            video_command.extend([
-                                '-vf', subtitle_filter
-                            ])
-                        
-                        # 添加临时输出文件
-                        video_command.append(temp_video)
-                        
-                        print(f"执行创建视频命令: {' '.join(video_command)}")
                         
-                        # 使用进度监控运行视频生成命令
-                        video_result = self.run_ffmpeg_with_progress(
-                            video_command, 
-                            'video', 
-                            total_duration, 
-                            "步骤4/4: 生成临时视频"
-                        )
-                        
-                        if video_result != 0:
-                            raise Exception("生成临时视频失败")
-                            
-                        # 复制临时视频到最终位置
-                        self.progress_queue.put({
-                            'stage': 'video',
-                            'progress': 0.9,
-                            'message': "步骤4/4: 完成视频处理..."
-                        })
-                        
-                        copy_command = [
-                            'ffmpeg',
-                            '-i', temp_video,
-                            '-c', 'copy',
-                            '-y',
-                            safe_output_file
-                        ]
-                        
-                        print(f"执行复制最终视频命令: {' '.join(copy_command)}")
-                        
-                        process = subprocess.Popen(
-                            copy_command,
-                            stdout=subprocess.PIPE,
-                            stderr=subprocess.PIPE
-                        )
-                        
-                        _, stderr = process.communicate()
-                        
-                        if process.returncode != 0:
-                            print(f"复制最终视频错误: {stderr.decode('utf-8', errors='ignore')}")
-                            raise Exception("生成视频失败")
+                        # 发布最终文件（同一目录内重命名，不再复制整个视频）
+                        self.report_progress('video', 0.9, "步骤4/4: 完成视频处理...")
+                        os.replace(partial_output_file, output_file)
+                    finally:
+                        # 失败或停止时清理未完成的临时文件
+                        if os.path.exists(partial_output_file):
+                            try:
+                                os.remove(partial_output_file)
+                            except OSError as e:
+                                print(f"清理临时视频文件时出错: {str(e)}")
                     
                     # 最终完成处理
-                    self.progress_queue.put({
-                        'stage': 'video',
-                        'progress': 1.0,
-                        'message': "完成! 已生成合并视频"
-                    })
+                    self.report_progress('video', 1.0, "完成! 已生成合并视频")
                     
-                    # 使用root.after确保在UI线程中更新界面
-                    self.root.after(0, lambda: self.progress.configure(value=1.0))
-                    self.root.after(0, lambda: self.status_label.configure(text=f"完成! 已生成合并视频"))
+                    success = True
                     
                     # 弹出成功消息
                     completed_msg = f"已成功生成合并视频!\n保存位置: {output_file}"
@@ -1549,36 +2020,388 @@ class MusicVideoGenerator:
             self.root.after(0, lambda: self.status_label.configure(text=f"发生错误: {error_msg}"))
             self.root.after(0, lambda: messagebox.showerror("错误", f"生成视频时出错: {error_msg}"))
         finally:
-            # 标记处理结束
-            self.processing = False
-            self.timer_running = False
+            # 标记当前任务结束
+            with self.job_lock:
+                self.job_start_times.pop(job.index, None)
             
             # 计算当前视频的耗时
-            if self.start_time > 0:
-                video_time = time.time() - self.start_time
-                video_time_str = self.format_elapsed_time(video_time)
-                
-                # 更新当前视频耗时显示
-                self.root.after(0, lambda t=video_time_str: self.current_time_label.configure(text=f"当前耗时: {t}"))
-                
-                # 如果在批量处理模式下，更新总耗时
-                if hasattr(self, 'total_start_time'):
-                    total_elapsed = time.time() - self.total_start_time
-                    total_elapsed_str = self.format_elapsed_time(total_elapsed)
-                    self.root.after(0, lambda t=total_elapsed_str: self.total_time_label.configure(text=f"总耗时: {t}"))
-            
-            # 如果是单独生成视频模式，恢复生成按钮状态
-            if callback is None:
-                self.root.after(0, lambda: self.generate_btn.config(text="生成视频", state=tk.NORMAL, bg="#4CAF50"))
-            else:
-                # 调用回调函数处理下一个视频
-                self.root.after(100, callback)
+            video_time = time.time() - job_start_time
+            video_time_str = self.format_elapsed_time(video_time)
+            
+            # 更新当前视频耗时显示
+            self.root.after(0, lambda t=video_time_str: self.current_time_label.configure(text=f"当前耗时: {t}"))
+            
+            # 如果在批量处理模式下，更新总耗时
+            if hasattr(self, 'total_start_time'):
+                total_elapsed = time.time() - self.total_start_time
+                total_elapsed_str = self.format_elapsed_time(total_elapsed)
+                self.root.after(0, lambda t=total_elapsed_str: self.total_time_label.configure(text=f"总耗时: {t}"))
+        
+        return success
+    
+    def get_partial_output_path(self, output_file):
+        """获取与最终输出文件同目录的临时文件路径，保证发布时可以原子重命名"""
+        output_dir, output_name = os.path.split(output_file)
+        stem = os.path.splitext(output_name)[0]
+        return os.path.join(output_dir, f".{stem}.{uuid.uuid4().hex[:8]}.part.mp4")
+    
+    def get_output_muxer_args(self):
+        """获取MP4封装参数"""
+        if self.faststart_var.get():
+            # 将moov移到文件头，便于网络播放时边下边播
+            return ['-movflags', '+faststart']
+        return []
+    
+    def get_audio_mode(self):
+        """获取音频合并方式，自动模式下批量导出使用分段缓存，单个视频使用单次编码"""
+        audio_mode = self.audio_mode_var.get()
+        if audio_mode == 'auto':
+            if getattr(self, 'total_video_count', 1) > 1:
+                return 'segments'
+            return 'single_pass'
+        return audio_mode
+    
+    def get_audio_codec_args(self, audio_file):
+        """获取最终视频的音频编码参数，已经是AAC的合并音频直接复制音频流"""
+        if os.path.splitext(audio_file)[1].lower() == '.m4a':
+            return ['-c:a', 'copy']
+        return ['-c:a', 'aac', '-b:a', '192k']
+    
+    def get_video_codec_args(self, still_image=False):
+        """获取视频编码参数，still_image为True时针对静态画面调优"""
+        if self.gpu_acceleration_var.get() and self.use_gpu:
+            return ['-c:v', 'h264_nvenc', '-preset', 'p7', '-crf', '23', '-pix_fmt', 'yuv420p']
+        
+        codec_args = ['-c:v', 'libx264', '-preset', 'medium', '-crf', '23', '-pix_fmt', 'yuv420p']
+        if still_image:
+            codec_args.extend(['-tune', 'stillimage'])
+        codec_args.extend(self.get_encoder_thread_args())
+        return codec_args
+    
+    def get_encoder_thread_args(self):
+        """多个视频任务同时运行时，限制每个CPU编码器的线程数"""
+        if self.encoder_threads > 0 and not (self.gpu_acceleration_var.get() and self.use_gpu):
+            return ['-threads', str(self.encoder_threads)]
+        return []
+    
+    def create_static_video(self, image_path, audio_path, output_path, total_duration, temp_dir):
+        """静态画面快速编码：只编码一个短GOP片段，然后循环拷贝该片段并混入音频"""
+        segment_file = os.path.join(temp_dir, "still_segment.mp4")
+        gop_size = STILL_FRAME_RATE * STILL_SEGMENT_SECONDS
+        
+        # 1. 编码静态画面片段（整个片段为一个GOP，循环拼接时每段都从关键帧开始）
+        segment_command = [
+            'ffmpeg',
+            '-loop', '1',
+            '-framerate', str(STILL_FRAME_RATE),
+            '-i', image_path,
+            '-t', str(STILL_SEGMENT_SECONDS),
+        ]
+        segment_command.extend(self.get_video_codec_args(still_image=True))
+        segment_command.extend([
+            '-g', str(gop_size),
+            '-an',
+            '-y',
+            segment_file
+        ])
+        
+        print(f"执行编码静态画面片段命令: {' '.join(segment_command)}")
+        
+        process = subprocess.Popen(
+            segment_command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        self.register_process(process)
+        try:
+            _, stderr = process.communicate()
+        finally:
+            self.unregister_process(process)
+        
+        if process.returncode != 0:
+            print(f"编码静态画面片段错误: {stderr.decode('utf-8', errors='ignore')}")
+            return process.returncode
+        
+        # 2. 循环拷贝片段覆盖整个音频时长，视频流不再重新编码
+        loop_count = max(0, int(math.ceil(total_duration / STILL_SEGMENT_SECONDS)) - 1)
+        mux_command = [
+            'ffmpeg',
+            '-stream_loop', str(loop_count),
+            '-i', segment_file,
+            '-i', audio_path,
+            '-map', '0:v:0',
+            '-map', '1:a:0',
+            '-c:v', 'copy',
+        ]
+        mux_command.extend(self.get_audio_codec_args(audio_path))
+        mux_command.append('-shortest')
+        mux_command.extend(self.get_output_muxer_args())
+        mux_command.extend(['-y', output_path])
+        
+        print(f"执行静态画面快速合成命令: {' '.join(mux_command)}")
+        
+        return self.run_ffmpeg_with_progress(
+            mux_command, 
+            'video', 
+            total_duration, 
+            "步骤4/4: 快速生成静态视频"
+        )
+    
+    def get_keyframe_interval(self):
+        """获取可变帧率输出的最大关键帧间隔（秒），0表示不限制"""
+        try:
+            return max(0, int(self.keyframe_interval_var.get()))
+        except (tk.TclError, ValueError):
+            return 0
+    
+    def get_page_frames(self, playlist_pages, total_duration):
+        """将歌单页面转换为concat分离器使用的[(图片路径, 显示时长秒), ...]"""
+        total_ms = int(round(total_duration * 1000))
+        ends = [start_ms for _, start_ms in playlist_pages[1:]] + [total_ms]
+        return [
+            (page_path, max(0, end_ms - start_ms) / 1000)
+            for (page_path, start_ms), end_ms in zip(playlist_pages, ends)
+        ]
+    
+    def create_prerendered_lyrics_video(self, playlist_pages, audio_path, output_path, music_info, total_duration, temp_dir, with_lyrics=True):
+        """预渲染歌词图层：每句不同的歌词只绘制一次画面底部的透明图层，与歌单页面分别通过concat分离器
+        按显示时长提供给编码器，由overlay滤镜叠加
+        
+        playlist_pages为[(歌单图片路径, 开始显示时间毫秒), ...]，不显示歌词时只按页面切换背景
+        """
+        total_ms = int(round(total_duration * 1000))
+        if with_lyrics:
+            timeline = build_lyric_timeline(self.iter_subtitle_blocks(music_info), total_ms)
+        else:
+            timeline = build_lyric_timeline([], total_ms)
+        
+        # 在歌单翻页处拆分时间段，每段只使用一页背景
+        page_starts = [start_ms for _, start_ms in playlist_pages]
+        timeline = split_timeline_at(timeline, page_starts[1:])
+        
+        # 可变帧率时画面很稀疏，需要限制关键帧间隔时每个间隔内至少输出一帧
+        variable_frame_rate = self.vfr_var.get()
+        keyframe_interval = self.get_keyframe_interval() if variable_frame_rate else 0
+        if keyframe_interval > 0:
+            timeline = split_timeline(timeline, keyframe_interval * 1000)
+        
+        # 背景和歌词图层使用相同的时间段，两路画面的时间戳一致，overlay滤镜在每个时间段输出一帧
+        page_frames = []
+        for start_ms, end_ms, _ in timeline:
+            page_index = bisect.bisect_right(page_starts, start_ms) - 1
+            page_frames.append((playlist_pages[page_index][0], (end_ms - start_ms) / 1000))
+        
+        page_list = os.path.join(temp_dir, "page_frames.txt")
+        write_frame_concat_list(page_frames, page_list)
+        
+        video_command = [
+            'ffmpeg',
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', page_list,
+        ]
+        
+        if with_lyrics:
+            overlay_list = self.render_lyric_overlays(timeline, temp_dir)
+            if not overlay_list:
+                return 1
+            
+            video_command.extend([
+                '-f', 'concat',
+                '-safe', '0',
+                '-i', overlay_list,
+                '-i', audio_path,
+                '-filter_complex', "[0:v][1:v]overlay=(main_w-overlay_w)/2:main_h-overlay_h[v]",
+                '-map', '[v]',
+                '-map', '2:a:0',
+            ])
+        else:
+            video_command.extend([
+                '-i', audio_path,
+                '-map', '0:v:0',
+                '-map', '1:a:0',
+            ])
+        
+        video_command.extend(self.get_video_codec_args(still_image=True))
+        if variable_frame_rate:
+            # 保留concat分离器给出的时间戳，只在画面变化时输出帧
+            video_command.extend(['-fps_mode', 'vfr'])
+            if keyframe_interval > 0:
+                video_command.extend(['-force_key_frames', f"expr:gte(t,n_forced*{keyframe_interval})"])
+        else:
+            video_command.extend(['-r', str(STILL_FRAME_RATE)])
+        video_command.extend(self.get_audio_codec_args(audio_path))
+        video_command.append('-shortest')
+        video_command.extend(self.get_output_muxer_args())
+        video_command.extend(['-y', output_path])
+        
+        print(f"执行预渲染歌词视频命令: {' '.join(video_command)}")
+        
+        return self.run_ffmpeg_with_progress(
+            video_command, 
+            'video', 
+            total_duration, 
+            "步骤4/4: 生成带歌词的视频"
+        )
+    
+    def render_lyric_overlays(self, timeline, temp_dir):
+        """为时间线中每句不同的歌词绘制一个透明图层，写入concat分离器文件列表并返回其路径
+        
+        停止或临时目录剩余空间不足时返回None
+        """
+        # 字体大小、描边和边距与ASS字幕一样按画面高度缩放
+        scale = VIDEO_SIZE[1] / ASS_PLAY_RES_Y
+        font = self.load_font(int(round(self.lyrics_font_size.get() * scale)))
+        stroke_width = max(1, int(round(ASS_OUTLINE * scale)))
+        margin_bottom = int(round(ASS_MARGIN_V * scale))
+        band_size = (VIDEO_SIZE[0], min(VIDEO_SIZE[1], lyric_band_height(font, margin_bottom, stroke_width)))
+        
+        frames_dir = os.path.join(temp_dir, "lyric_frames")
+        os.makedirs(frames_dir, exist_ok=True)
+        
+        rendered = {}
+        frames = []
+        for start_ms, end_ms, text in timeline:
+            if not self.is_generating:
+                return None
+            
+            if text not in rendered:
+                # 定期检查临时目录的剩余空间，空间不足时回退为逐帧烧录字幕
+                if len(rendered) % PRERENDER_SPACE_CHECK_INTERVAL == 0:
+                    free_bytes = shutil.disk_usage(frames_dir).free
+                    if free_bytes < PRERENDER_MIN_FREE_BYTES:
+                        print(f"临时目录剩余空间不足 ({free_bytes // (1024 * 1024)} MB)，停止预渲染歌词图层")
+                        return None
+                
+                rendered[text] = render_lyric_overlay(
+                    text, 
+                    font, 
+                    band_size, 
+                    os.path.join(frames_dir, f"lyric_{len(rendered):05d}.png"), 
+                    margin_bottom, 
+                    stroke_width
+                )
+            frames.append((rendered[text], (end_ms - start_ms) / 1000))
+        
+        print(f"预渲染歌词图层: {len(rendered)} 张 ({band_size[0]}x{band_size[1]})，时间线 {len(frames)} 段")
+        
+        overlay_list = os.path.join(temp_dir, "lyric_frames.txt")
+        write_frame_concat_list(frames, overlay_list)
+        return overlay_list
+    
+    def find_lyrics_file(self, music_file, title=None, artist=None):
+        """查找音乐文件对应的歌词文件，返回路径，没有找到时返回None
+        
+        文件名精确匹配失败时，使用音频标签中的歌曲名和艺术家模糊匹配
+        """
+        lyrics_path = self.lyrics_resolver.resolve(music_file, self.lyrics_folder)
+        if lyrics_path:
+            return lyrics_path
+        
+        if title is None:
+            title, artist, _ = self.extract_audio_info(music_file)
+        return self.lyrics_resolver.resolve_fuzzy(music_file, self.lyrics_folder, title, artist or "")
+    
+    def probe_music_file(self, music_file):
+        """探测单个音乐文件的元数据和歌词位置"""
+        info = self.get_audio_metadata(music_file)
+        try:
+            lyrics_path = self.find_lyrics_file(music_file, info['title'], info['artist'])
+        except Exception as e:
+            print(f"检查歌词时出错: {str(e)}")
+            lyrics_path = None
+        info['lyrics_path'] = lyrics_path
+        info['has_lyrics'] = lyrics_path is not None
+        return info
+    
+    def iter_music_metadata(self, music_files):
+        """使用线程池批量探测音乐文件，按完成顺序逐个返回(音乐文件, 元数据)
+        
+        元数据包含title、artist、duration、codec、lyrics_path和has_lyrics
+        """
+        music_files = list(music_files)
+        if not music_files:
+            return
+        
+        # 读取文件头主要是I/O等待，线程数可以多于CPU核心数
+        workers = max(1, min(len(music_files), METADATA_PROBE_WORKERS))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = dict(
+                (executor.submit(self.probe_music_file, music_file), music_file)
+                for music_file in music_files
+            )
+            for future in concurrent.futures.as_completed(futures):
+                yield futures[future], future.result()
+    
+    def build_music_info(self, music_files, probed_files):
+        """根据探测到的元数据计算每首歌的开始时间和显示名称，返回(歌曲信息列表, 总时长秒)"""
+        music_info = []
+        current_time = 0
+        
+        for music_file, probed in zip(music_files, probed_files):
+            title, artist, duration = probed['title'], probed['artist'], probed['duration']
+            
+            # 使用更好的显示名称（标题+艺术家）
+            display_name = title
+            if artist:
+                display_name = f"{artist} - {title}"
+            
+            # 确保display_name不包含文件扩展名
+            display_name = os.path.splitext(display_name)[0]
+            
+            music_info.append({
+                'file': music_file,
+                'title': title,
+                'artist': artist,
+                'duration': duration,
+                'start_time': current_time,
+                'start_time_fmt': self.format_time(current_time),
+                'display_name': display_name,
+                'has_lyrics': probed['has_lyrics'],
+                'lyrics_path': probed['lyrics_path']
+            })
+            
+            current_time += duration
+        
+        return music_info, current_time
+    
+    def probe_music_files(self, music_files):
+        """批量探测音乐文件，返回按输入顺序排列的元数据列表"""
+        results = dict(self.iter_music_metadata(music_files))
+        return [results[music_file] for music_file in music_files]
     
     def extract_audio_info(self, audio_file):
-        """提取音频文件的元数据"""
+        """提取音频文件的元数据，返回(标题, 艺术家, 时长)"""
+        info = self.get_audio_metadata(audio_file)
+        return info['title'], info['artist'], info['duration']
+    
+    def get_audio_metadata(self, audio_file):
+        """获取音频文件的元数据字典，优先使用元数据缓存"""
+        if self.metadata_cache:
+            info = self.metadata_cache.get(audio_file)
+            if info:
+                return info
+        
+        info = self.read_audio_metadata(audio_file)
+        if info['probe_method'] != PROBE_MUTAGEN:
+            print(f"探测音频信息: {os.path.basename(audio_file)} (方式: {info['probe_method']})")
+        
+        # 没有读取到时长时不缓存，下次重新读取
+        if self.metadata_cache and info['duration'] > 0:
+            self.metadata_cache.put(audio_file, info)
+        
+        return info
+    
+    def read_audio_metadata(self, audio_file):
+        """读取音频文件的元数据（标题、艺术家、时长和编码信息）"""
         title = os.path.basename(audio_file)
         artist = ""
         duration = 0
+        codec = ""
+        sample_rate = 0
+        channels = 0
+        probe_method = PROBE_MUTAGEN
+        audio = None
         
         try:
             # 根据文件扩展名选择不同的处理方法
@@ -1600,6 +2423,7 @@ class MusicVideoGenerator:
                 
                 # 获取持续时间（秒）
                 duration = audio.info.length
+                codec = 'mp3'
                 
             elif ext == '.flac':
                 # 处理FLAC文件
@@ -1616,6 +2440,7 @@ class MusicVideoGenerator:
                 
                 # 获取持续时间（秒）
                 duration = audio.info.length
+                codec = 'flac'
                 
             elif ext == '.wav':
                 # 处理WAV文件
@@ -1625,6 +2450,7 @@ class MusicVideoGenerator:
                 # WAV文件可能没有元数据，直接使用文件名作为标题
                 # 获取持续时间（秒）
                 duration = audio.info.length
+                codec = 'pcm'
             
             elif ext == '.wma':
                 # 处理WMA文件
@@ -1641,6 +2467,7 @@ class MusicVideoGenerator:
                 
                 # 获取持续时间（秒）
                 duration = audio.info.length
+                codec = 'wma'
                 
             elif ext in ['.m4a', '.aac']:
                 # 处理M4A/AAC文件
@@ -1657,31 +2484,24 @@ class MusicVideoGenerator:
                 
                 # 获取持续时间（秒）
                 duration = audio.info.length
+                codec = getattr(audio.info, 'codec', '') or 'aac'
                 
             else:
-                # 对于不支持的格式，使用FFmpeg获取时长
-                import subprocess
-                command = [
-                    'ffmpeg', 
-                    '-i', audio_file,
-                    '-f', 'null',
-                    '-'
-                ]
-                
-                process = subprocess.Popen(
-                    command,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    universal_newlines=True
-                )
-                
-                _, stderr = process.communicate()
-                
-                # 从输出中解析持续时间
-                duration_match = re.search(r"Duration: (\d+):(\d+):(\d+)\.(\d+)", stderr)
-                if duration_match:
-                    hours, minutes, seconds, centiseconds = map(int, duration_match.groups())
-                    duration = hours * 3600 + minutes * 60 + seconds + centiseconds / 100
+                # 对于其他格式，只读取文件头获取时长，文件头中没有时长时才完整解码
+                probed = probe_audio(audio_file)
+                probe_method = probed['probe_method']
+                duration = probed['duration']
+                codec = probed['codec']
+                sample_rate = probed['sample_rate']
+                channels = probed['channels']
+                if probed['title']:
+                    title = probed['title']
+                artist = probed['artist']
+            
+            # 读取采样率和声道数
+            if audio is not None:
+                sample_rate = getattr(audio.info, 'sample_rate', 0) or 0
+                channels = getattr(audio.info, 'channels', 0) or 0
             
             # 如果没有提取到标题，使用文件名（不包含扩展名）
             if not title or title == "None":
@@ -1699,35 +2519,27 @@ class MusicVideoGenerator:
             # 如果出错，使用文件名（不包含扩展名）作为标题
             title = os.path.splitext(os.path.basename(audio_file))[0]
             
-            # 尝试使用FFmpeg获取时长
+            # 只读取文件头获取时长，必要时才完整解码
             try:
-                import subprocess
-                command = [
-                    'ffmpeg', 
-                    '-i', audio_file,
-                    '-f', 'null',
-                    '-'
-                ]
-                
-                process = subprocess.Popen(
-                    command,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    universal_newlines=True
-                )
-                
-                _, stderr = process.communicate()
-                
-                # 从输出中解析持续时间
-                duration_match = re.search(r"Duration: (\d+):(\d+):(\d+)\.(\d+)", stderr)
-                if duration_match:
-                    hours, minutes, seconds, centiseconds = map(int, duration_match.groups())
-                    duration = hours * 3600 + minutes * 60 + seconds + centiseconds / 100
-            except:
+                probed = probe_audio(audio_file)
+                probe_method = probed['probe_method']
+                duration = probed['duration']
+                codec = probed['codec']
+                sample_rate = probed['sample_rate']
+                channels = probed['channels']
+            except Exception:
                 # 如果FFmpeg也失败，使用默认值
                 duration = 0
         
-        return title, artist, duration
+        return {
+            'title': title,
+            'artist': artist,
+            'duration': duration,
+            'codec': codec,
+            'sample_rate': sample_rate,
+            'channels': channels,
+            'probe_method': probe_method
+        }
     
     def format_time(self, seconds):
         """将秒数格式化为时:分:秒格式"""
@@ -1740,272 +2552,244 @@ class MusicVideoGenerator:
         else:
             return f"{minutes:02d}:{seconds:02d}"
     
-    def create_image_with_playlist(self, music_info, output_path):
+    def get_font_path(self):
+        """获取绘制图片使用的字体文件路径，优先使用自定义字体"""
+        if self.custom_font_path and os.path.exists(self.custom_font_path):
+            # 使用用户指定的字体
+            return self.custom_font_path
+        
+        # 使用系统默认字体
+        if os.name == 'nt':  # Windows
+            return "C:\\Windows\\Fonts\\simhei.ttf"  # 黑体
+        return "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"  # Linux/Mac
+    
+    def load_font(self, font_size):
+        """加载指定大小的字体，字体文件不存在时使用默认字体"""
+        font_path = self.get_font_path()
         try:
-            # 打开原始图片
-            img = Image.open(self.image_file)
-            
-            # 确保图片是1080p (1920x1080)
-            if img.size != (1920, 1080):
-                img = img.resize((1920, 1080), Image.LANCZOS)
-            
-            # 如果有叠加图片，处理叠加效果
-            if self.overlay_image and os.path.exists(self.overlay_image):
-                try:
-                    # 打开叠加图片
-                    overlay = Image.open(self.overlay_image)
-                    # 将叠加图片调整为相同大小
-                    overlay = overlay.resize((1920, 1080), Image.LANCZOS)
-                    
-                    # 确保叠加图片有Alpha通道，如果没有则添加
-                    if overlay.mode != 'RGBA':
-                        overlay = overlay.convert('RGBA')
-                    
-                    # 如果背景图片没有Alpha通道，添加一个
-                    if img.mode != 'RGBA':
-                        img = img.convert('RGBA')
-                    
-                    # 叠加图片
-                    img = Image.alpha_composite(img, overlay)
-                    
-                    # 转回RGB模式，因为有些处理需要RGB模式
-                    img = img.convert('RGB')
-                except Exception as e:
-                    print(f"处理叠加图片时出错: {str(e)}")
-                    # 如果叠加过程出错，继续使用原始图片
-            
-            # 创建绘图对象
-            draw = ImageDraw.Draw(img)
-            
-            # 左侧区域的宽度和位置
-            panel_width = 1800  # 增加到接近视频宽度(1920)，留出一些边距
-            x_start = 20  # 从左侧开始
-            
-            # 加载字体
+            if os.path.exists(font_path):
+                if self.font_registry:
+                    return self.font_registry.get_font(font_path, font_size)
+                return ImageFont.truetype(font_path, font_size)
+        except Exception as e:
+            print(f"加载字体时出错: {str(e)}")
+        return ImageFont.load_default()
+    
+    def get_background_overlay(self):
+        """获取当前的叠加图片路径，未选择或文件不存在时返回None"""
+        return self.overlay_image if self.overlay_image and os.path.exists(self.overlay_image) else None
+    
+    def get_background_layer(self, image_file, size=VIDEO_SIZE):
+        """获取缩放到指定尺寸（默认为视频尺寸）并叠加好叠加图片的背景图层（RGB），相同的源图片只处理一次
+        
+        返回的图片在多次绘制之间共享，使用前需要复制
+        """
+        overlay_file = self.get_background_overlay()
+        return self.layer_cache.load(
+            [image_file, overlay_file], 
+            size, 
+            lambda: self.compose_background_layer(image_file, overlay_file, size)
+        )
+    
+    def compose_background_layer(self, image_file, overlay_file, size=VIDEO_SIZE):
+        """缩放背景图片并叠加叠加图片，返回RGB图片"""
+        img = Image.open(image_file)
+        
+        # 确保图片是1080p (1920x1080)，预览时直接缩放到预览尺寸
+        if img.size != size:
+            img = img.resize(size, Image.LANCZOS)
+        
+        # 如果有叠加图片，处理叠加效果
+        if overlay_file:
             try:
-                # 优先使用自定义字体
-                if self.custom_font_path and os.path.exists(self.custom_font_path):
-                    # 使用用户指定的字体
-                    title_font_path = self.custom_font_path
-                    time_font_path = self.custom_font_path
-                else:
-                    # 使用系统默认字体
-                    if os.name == 'nt':  # Windows
-                        title_font_path = "C:\\Windows\\Fonts\\simhei.ttf"  # 黑体
-                        time_font_path = "C:\\Windows\\Fonts\\simhei.ttf"   # 黑体
-                    else:  # Linux/Mac
-                        title_font_path = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
-                        time_font_path = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
-                
-                # 加载字体
-                if os.path.exists(title_font_path) and os.path.exists(time_font_path):
-                    # 使用用户设置的字体大小
-                    title_font_size = self.title_font_size.get()
-                    playlist_font_size = self.playlist_font_size.get()
-                    
-                    title_font = ImageFont.truetype(title_font_path, title_font_size)
-                    playlist_font = ImageFont.truetype(time_font_path, playlist_font_size)
-                else:
-                    title_font = ImageFont.load_default()
-                    playlist_font = ImageFont.load_default()
-            except Exception as e:
-                print(f"加载字体时出错: {str(e)}")
-                title_font = ImageFont.load_default()
-                playlist_font = ImageFont.load_default()
-            
-            # 为文本添加阴影效果以增强可读性
-            shadow_offset = 2
-            shadow_color = "black"
-            
-            # 调整标题位置，根据字体大小调整
-            title_font_size = self.title_font_size.get()
-            title_y = 30
-            divider_y = title_y + title_font_size + 20  # 分隔线位置随标题字体大小调整
-            
-            # 添加标题
-            title_text = "歌曲列表"
-            # 添加阴影效果
-            draw.text((x_start + shadow_offset, title_y + shadow_offset), title_text, 
-                    fill=shadow_color, font=title_font)
-            # 添加主文本
-            draw.text((x_start, title_y), title_text, fill="white", font=title_font)
-            
-            # 绘制分隔线 (带阴影)
-            draw.line([(x_start + shadow_offset, divider_y + shadow_offset), (x_start + panel_width + shadow_offset, divider_y + shadow_offset)], 
-                    fill=shadow_color, width=2)
-            draw.line([(x_start, divider_y), (x_start + panel_width, divider_y)], fill="white", width=2)
-            
-            # 添加歌曲列表，起始位置也随字体大小调整
-            y_position = divider_y + 40
-            
-            # 计算动态间距，根据字体大小调整
-            font_size = self.playlist_font_size.get()
-            number_width = 40 * (font_size / 24)  # 序号宽度根据字体大小调整
-            time_width = 100 * (font_size / 24)   # 时间宽度根据字体大小调整
-            line_height = max(40, font_size * 1.6)  # 减小行高，但保持最小高度为40像素
-            
-            for i, info in enumerate(music_info):
-                # 歌曲序号 (带阴影)
-                number_text = f"{i+1}."
-                draw.text((x_start + shadow_offset, y_position + shadow_offset), number_text, 
-                       fill=shadow_color, font=playlist_font)
-                draw.text((x_start, y_position), number_text, fill="white", font=playlist_font)
-                
-                # 歌曲开始时间 (带阴影)
-                time_x = x_start + number_width
-                time_text = info['start_time_fmt']
-                draw.text((time_x + shadow_offset, y_position + shadow_offset), time_text, 
-                       fill=shadow_color, font=playlist_font)
-                draw.text((time_x, y_position), time_text, 
-                       fill="#00FFFF", font=playlist_font)  # 青色显示时间
-                
-                # 歌曲名称
-                name_x = x_start + number_width + time_width
-                # 如果歌曲名称过长，进行裁剪
-                display_name = info['display_name']
-                
-                # 确保歌曲名称不包含文件扩展名
-                display_name = os.path.splitext(display_name)[0]
-                
-                max_width = panel_width - (number_width + time_width + 20)  # 动态计算最大宽度
+                # 打开叠加图片
+                overlay = Image.open(overlay_file)
+                # 将叠加图片调整为相同大小
+                overlay = overlay.resize(size, Image.LANCZOS)
                 
-                if draw.textlength(display_name, font=playlist_font) > max_width:
-                    # 裁剪歌曲名称使其适应区域宽度
-                    while draw.textlength(display_name + "...", font=playlist_font) > max_width and len(display_name) > 1:
-                        display_name = display_name[:-1]
-                    display_name += "..."
+                # 确保叠加图片有Alpha通道，如果没有则添加
+                if overlay.mode != 'RGBA':
+                    overlay = overlay.convert('RGBA')
                 
-                # 添加文字阴影效果
-                draw.text((name_x + shadow_offset, y_position + shadow_offset), display_name, 
-                       fill=shadow_color, font=playlist_font)
-                # 添加主文本
-                draw.text((name_x, y_position), display_name, 
-                       fill="white", font=playlist_font)
+                # 如果背景图片没有Alpha通道，添加一个
+                if img.mode != 'RGBA':
+                    img = img.convert('RGBA')
                 
-                y_position += line_height
+                # 叠加图片
+                img = Image.alpha_composite(img, overlay)
+            except Exception as e:
+                print(f"处理叠加图片时出错: {str(e)}")
+                # 如果叠加过程出错，继续使用原始图片
+        
+        # 转回RGB模式，因为有些处理需要RGB模式
+        return img.convert('RGB')
+    
+    def compute_playlist_layout(self, music_info, playlist_font):
+        """根据序号和时间文字的实际宽度计算歌单布局（多列/多页）"""
+        fitter = get_text_fitter(playlist_font)
+        
+        # 标题和分隔线的位置随标题字体大小调整，歌曲列表从分隔线下方开始
+        title_font_size = self.title_font_size.get()
+        divider_y = PLAYLIST_TITLE_Y + title_font_size + 20
+        
+        # 序号和时间列的宽度取所有歌曲中最宽的文字，再留出间距
+        font_size = self.playlist_font_size.get()
+        spacing = 16 * (font_size / 24)
+        number_width = fitter.text_width(f"{len(music_info)}.") + spacing
+        time_width = max([fitter.text_width(info['start_time_fmt']) for info in music_info] or [0]) + spacing
+        line_height = max(40, font_size * 1.6)  # 减小行高，但保持最小高度为40像素
+        
+        try:
+            max_columns = max(1, int(self.playlist_columns_var.get()))
+        except (tk.TclError, ValueError):
+            max_columns = 1
+        
+        return compute_playlist_layout(
+            len(music_info), 
+            PLAYLIST_X, 
+            PLAYLIST_PANEL_WIDTH, 
+            divider_y + 40, 
+            VIDEO_SIZE[1] - PLAYLIST_BOTTOM_MARGIN, 
+            number_width, 
+            time_width, 
+            line_height, 
+            max_columns=max_columns, 
+            min_name_width=font_size * PLAYLIST_MIN_NAME_CHARS
+        )
+    
+    def render_playlist_page(self, music_info, layout, page_index, image_file=None):
+        """在视频尺寸的背景图层上绘制一页歌单，返回图片（预览时绘制后再缩小，与导出的画面一致）"""
+        # 从缓存的背景图层开始绘制（未指定时使用当前选择的背景图片）
+        img = self.get_background_layer(image_file or self.image_file).copy()
+        
+        # 创建绘图对象
+        draw = ImageDraw.Draw(img)
+        
+        # 左侧区域的宽度和位置
+        panel_width = PLAYLIST_PANEL_WIDTH
+        x_start = PLAYLIST_X
+        
+        # 加载字体（使用用户设置的字体大小，同一字体和字号只加载一次）
+        title_font = self.load_font(self.title_font_size.get())
+        playlist_font = self.load_font(self.playlist_font_size.get())
+        
+        # 为文本添加阴影效果以增强可读性
+        shadow_offset = 2
+        shadow_color = "black"
+        line_width = 2
+        
+        # 调整标题位置，根据字体大小调整
+        title_font_size = self.title_font_size.get()
+        title_y = PLAYLIST_TITLE_Y
+        divider_y = PLAYLIST_TITLE_Y + title_font_size + 20  # 分隔线位置随标题字体大小调整
+        
+        # 添加标题，多页时显示页码
+        title_text = "歌曲列表"
+        if len(layout.pages) > 1:
+            title_text += f" ({page_index + 1}/{len(layout.pages)})"
+        # 添加阴影效果
+        draw.text((x_start + shadow_offset, title_y + shadow_offset), title_text, 
+                fill=shadow_color, font=title_font)
+        # 添加主文本
+        draw.text((x_start, title_y), title_text, fill="white", font=title_font)
+        
+        # 绘制分隔线 (带阴影)
+        draw.line([(x_start + shadow_offset, divider_y + shadow_offset), (x_start + panel_width + shadow_offset, divider_y + shadow_offset)], 
+                fill=shadow_color, width=line_width)
+        draw.line([(x_start, divider_y), (x_start + panel_width, divider_y)], fill="white", width=line_width)
+        
+        # 过长歌曲名称的裁剪方式
+        name_fitter = get_text_fitter(playlist_font)
+        ellipsis_mode = self.ellipsis_mode_var.get()
+        
+        for item in layout.pages[page_index].items:
+            info = music_info[item.index]
+            x, y = item.x, item.y
+            time_x, name_x = item.time_x, item.name_x
+            
+            # 歌曲序号 (带阴影)
+            number_text = f"{item.index + 1}."
+            draw.text((x + shadow_offset, y + shadow_offset), number_text, 
+                   fill=shadow_color, font=playlist_font)
+            draw.text((x, y), number_text, fill="white", font=playlist_font)
+            
+            # 歌曲开始时间 (带阴影)
+            time_text = info['start_time_fmt']
+            draw.text((time_x + shadow_offset, y + shadow_offset), time_text, 
+                   fill=shadow_color, font=playlist_font)
+            draw.text((time_x, y), time_text, 
+                   fill="#00FFFF", font=playlist_font)  # 青色显示时间
+            
+            # 确保歌曲名称不包含文件扩展名
+            display_name = os.path.splitext(info['display_name'])[0]
+            
+            # 裁剪歌曲名称使其适应所在列的宽度（二分查找，字符宽度按字体缓存）
+            display_name = name_fitter.truncate(display_name, item.name_width, ellipsis_mode)
+            
+            # 添加文字阴影效果
+            draw.text((name_x + shadow_offset, y + shadow_offset), display_name, 
+                   fill=shadow_color, font=playlist_font)
+            # 添加主文本
+            draw.text((name_x, y), display_name, 
+                   fill="white", font=playlist_font)
+        
+        return img
+    
+    def create_playlist_pages(self, music_info, temp_dir, image_file=None):
+        """生成歌单的所有页面，返回[(图片路径, 开始显示时间毫秒), ...]，歌曲较多时在歌曲切换处翻页"""
+        try:
+            layout = self.compute_playlist_layout(music_info, self.load_font(self.playlist_font_size.get()))
+            start_times = page_start_times(
+                layout, 
+                [int(round(info['start_time'] * 1000)) for info in music_info]
+            )
             
-            # 保存处理后的图片
-            img.save(output_path)
+            pages = []
+            for page_index, start_ms in enumerate(start_times):
+                img = self.render_playlist_page(music_info, layout, page_index, image_file)
+                page_path = os.path.join(temp_dir, f"background_with_playlist_{page_index + 1}.png")
+                img.save(page_path)
+                pages.append((page_path, start_ms))
+            
+            if len(pages) > 1:
+                print(f"歌单布局: {len(music_info)} 首, {len(pages)} 页, 每页 {layout.columns} 列 x {layout.rows} 行")
+            return pages
             
         except Exception as e:
             raise Exception(f"处理图片时出错: {str(e)}")
     
-    def check_lyrics_exist(self, audio_file):
-        """检查音频文件是否包含歌词"""
+    def check_lyrics_exist(self, audio_file, log=print):
+        """检查音频文件是否包含歌词，检查过程通过log输出
+        
+        歌词索引还没有读取文件头标签时，模糊查找需要读取歌词文件夹中每个文件的开头，
+        因此不要在UI线程中调用
+        """
         try:
-            print(f"\n开始检查歌词: {os.path.basename(audio_file)}")
+            log(f"开始检查歌词: {os.path.basename(audio_file)}")
             
-            # 1. 检查是否有同名的.lrc文件
-            base_name = os.path.splitext(audio_file)[0]
-            lrc_file = base_name + '.lrc'
-            if os.path.exists(lrc_file):
-                print(f"找到外部LRC文件: {lrc_file}")
+            lrc_path = self.find_lyrics_file(audio_file)
+            if lrc_path:
+                log(f"找到对应歌词: {lrc_path}")
+                log(f"歌词行数: {len(self.load_lyrics(lrc_path))}")
                 return True
             
-            # 2. 检查歌词文件夹中是否有对应的歌词文件
-            if self.lyrics_folder and os.path.exists(self.lyrics_folder):
-                # 获取音频文件名（不含路径和扩展名）
-                audio_filename = os.path.basename(audio_file)
-                filename_no_ext = os.path.splitext(audio_filename)[0]
-                
-                # 检查歌词文件夹中可能的歌词文件名
-                possible_names = [
-                    f"{filename_no_ext}.lrc",
-                    f"{filename_no_ext}.LRC"
-                ]
-                
-                # 如果文件名包含艺术家和歌曲名信息（如"艺术家-歌曲名"格式）
-                if '-' in filename_no_ext:
-                    artist, title = filename_no_ext.split('-', 1)
-                    artist = artist.strip()
-                    title = title.strip()
-                    
-                    possible_names.extend([
-                        f"{artist} - {title}.lrc",
-                        f"{title}.lrc",
-                        f"{artist}-{title}.lrc"
-                    ])
-                
-                # 检查所有可能的文件名
-                for lrc_name in possible_names:
-                    lrc_path = os.path.join(self.lyrics_folder, lrc_name)
-                    if os.path.exists(lrc_path):
-                        print(f"在歌词文件夹中找到对应歌词: {lrc_path}")
-                        return True
-            
-            print(f"没有找到歌词: {audio_file}")
+            log(f"没有找到歌词: {audio_file}")
             return False
         except Exception as e:
-            print(f"检查歌词时出错: {str(e)}")
+            log(f"检查歌词时出错: {str(e)}")
             return False
          
 
-    def parse_lrc_content(self, lrc_content):
-        """解析LRC格式的歌词内容"""
-        lyrics = []
-        
-        if not lrc_content or len(lrc_content.strip()) < 10:  # 太短的内容可能不是歌词
-            return None
-        
-        try:
-            # 解析各种可能的时间标记格式
-            # 标准LRC: [mm:ss.xx]
-            time_pattern1 = r'\[(\d+):(\d+)\.(\d+)\](.*)'
-            # 简化格式: [mm:ss]
-            time_pattern2 = r'\[(\d+):(\d+)\](.*)'
-            # 其他可能的格式: (mm:ss)
-            time_pattern3 = r'\((\d+):(\d+)\)(.*)'
-            
-            lines_with_time = 0  # 计数包含时间标记的行数
-            
-            for line in lrc_content.split('\n'):
-                match1 = re.search(time_pattern1, line)
-                match2 = re.search(time_pattern2, line)
-                match3 = re.search(time_pattern3, line)
-                
-                if match1:
-                    minutes = int(match1.group(1))
-                    seconds = int(match1.group(2))
-                    centiseconds = int(match1.group(3))
-                    text = match1.group(4).strip()
-                    
-                    time_in_seconds = minutes * 60 + seconds + centiseconds / 100
-                    lines_with_time += 1
-                elif match2:
-                    minutes = int(match2.group(1))
-                    seconds = int(match2.group(2))
-                    text = match2.group(3).strip()
-                    
-                    time_in_seconds = minutes * 60 + seconds
-                    lines_with_time += 1
-                elif match3:
-                    minutes = int(match3.group(1))
-                    seconds = int(match3.group(2))
-                    text = match3.group(3).strip()
-                    
-                    time_in_seconds = minutes * 60 + seconds
-                    lines_with_time += 1
-                else:
-                    continue  # 跳过没有时间标记的行
-                
-                if text:  # 只添加有内容的歌词
-                    lyrics.append({
-                        'time': time_in_seconds,
-                        'text': text
-                    })
-            
-            # 如果大部分行都有时间标记，说明这是歌词
-            if lines_with_time > 5 or (lines_with_time > 0 and lines_with_time / len(lrc_content.split('\n')) > 0.3):
-                return sorted(lyrics, key=lambda x: x['time'])  # 按时间排序
-        
-        except Exception as e:
-            print(f"解析歌词内容时出错: {str(e)}")
+    def load_lyrics(self, lrc_file):
+        """读取解析后的歌词，返回按时间排序的[(时间毫秒, 歌词文本), ...]，优先使用歌词缓存"""
+        if self.lyrics_cache:
+            lyrics, _ = self.lyrics_cache.load(lrc_file)
+            return lyrics
         
-        # 如果未找到足够的歌词行，返回None
-        return lyrics if lyrics else None
+        return parse_lrc_file(lrc_file)
 
     def check_selected_lyrics(self):
-        """检查选中歌曲的歌词并显示调试信息"""
+        """在后台线程中检查选中歌曲的歌词，完成后显示调试信息"""
         try:
             selection = self.music_list.curselection()
             if not selection:
@@ -2015,70 +2799,108 @@ class MusicVideoGenerator:
             index = selection[0]
             music_file = self.music_files[index]
             
-            # 创建日志捕获器
-            class LogCapture:
-                def __init__(self):
-                    self.log = []
-                    
-                def write(self, message):
-                    self.log.append(message)
-                    
-                def flush(self):
-                    pass
-                    
-                def get_log(self):
-                    return ''.join(self.log)
-            
-            # 捕获日志输出
-            old_stdout = sys.stdout
-            log_capture = LogCapture()
-            sys.stdout = log_capture
-            
-            try:
+            def check_worker():
+                log = []
                 # 运行检查
-                has_lyrics = self.check_lyrics_exist(music_file)
+                has_lyrics = self.check_lyrics_exist(music_file, log.append)
                 
                 # 添加检查结果
                 if has_lyrics:
-                    log_capture.log.append("\n\n结果: 文件包含歌词")
+                    log.append("\n结果: 文件包含歌词")
                 else:
-                    log_capture.log.append("\n\n结果: 文件不包含歌词")
-                    
-                # 创建一个带滚动条的文本查看窗口
-                result_window = tk.Toplevel(self.root)
-                result_window.title(f"歌词检查结果: {os.path.basename(music_file)}")
-                result_window.geometry("800x600")
-                
-                frame = tk.Frame(result_window)
-                frame.pack(fill=tk.BOTH, expand=True)
+                    log.append("\n结果: 文件不包含歌词")
                 
-                scrollbar = tk.Scrollbar(frame)
-                scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-                
-                text_area = tk.Text(frame, wrap=tk.WORD, yscrollcommand=scrollbar.set)
-                text_area.pack(fill=tk.BOTH, expand=True)
-                
-                scrollbar.config(command=text_area.yview)
-                
-                # 插入日志内容
-                text_area.insert(tk.END, log_capture.get_log())
-                text_area.config(state=tk.DISABLED)  # 设置为只读
-                
-                # 添加关闭按钮
-                close_btn = tk.Button(result_window, text="关闭", command=result_window.destroy, 
-                                    bg="#f44336", fg="white", font=("Arial", 10), width=15)
-                close_btn.pack(pady=10)
-                
-            finally:
-                # 恢复标准输出
-                sys.stdout = old_stdout
+                text = "\n".join(log)
+                self.root.after(0, lambda: self.show_lyrics_check_log(music_file, text))
+            
+            threading.Thread(target=check_worker, daemon=True).start()
                 
         except Exception as e:
             messagebox.showerror("错误", f"检查歌词时出错: {str(e)}")
-            # 确保标准输出被恢复
-            if 'old_stdout' in locals():
-                sys.stdout = old_stdout
+    
+    def show_lyrics_check_log(self, music_file, text):
+        """在带滚动条的文本窗口中显示歌词检查的调试信息（在UI线程中调用）"""
+        result_window = tk.Toplevel(self.root)
+        result_window.title(f"歌词检查结果: {os.path.basename(music_file)}")
+        result_window.geometry("800x600")
+        
+        frame = tk.Frame(result_window)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        scrollbar = tk.Scrollbar(frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        text_area = tk.Text(frame, wrap=tk.WORD, yscrollcommand=scrollbar.set)
+        text_area.pack(fill=tk.BOTH, expand=True)
+        
+        scrollbar.config(command=text_area.yview)
+        
+        # 插入日志内容
+        text_area.insert(tk.END, text)
+        text_area.config(state=tk.DISABLED)  # 设置为只读
+        
+        # 添加关闭按钮
+        close_btn = tk.Button(result_window, text="关闭", command=result_window.destroy, 
+                            bg="#f44336", fg="white", font=("Arial", 10), width=15)
+        close_btn.pack(pady=10)
 
+    def check_all_lyrics(self):
+        """在后台批量检查列表中所有歌曲的歌词时间轴，未修改的歌词直接使用缓存的结果"""
+        if not self.music_files:
+            messagebox.showinfo("提示", "请先添加音乐文件")
+            return
+        
+        music_files = list(self.music_files)
+        self.status_label.configure(text="正在检查歌词时间轴...")
+        
+        def worker():
+            try:
+                # 并行读取时长和歌词位置，再并行检查歌词
+                items = []
+                missing = []
+                for music_file, info in self.iter_music_metadata(music_files):
+                    if info['lyrics_path']:
+                        items.append((info['lyrics_path'], info['duration']))
+                    else:
+                        missing.append(os.path.basename(music_file))
+                
+                report = format_report(check_lyrics_files(items, self.lyrics_check_cache))
+                if missing:
+                    report += f"\n\n没有找到歌词的歌曲 ({len(missing)} 首):\n" + "\n".join(sorted(missing))
+                
+                self.root.after(0, lambda: self.status_label.configure(text="歌词检查完成"))
+                self.root.after(0, lambda: self.show_text_window("歌词时间轴检查结果", report))
+            except Exception as e:
+                error_msg = str(e)
+                self.root.after(0, lambda: self.status_label.configure(text="就绪"))
+                self.root.after(0, lambda: messagebox.showerror("错误", f"检查歌词时出错: {error_msg}"))
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def show_text_window(self, title, text):
+        """在带滚动条的只读窗口中显示文本"""
+        result_window = tk.Toplevel(self.root)
+        result_window.title(title)
+        result_window.geometry("800x600")
+        
+        frame = tk.Frame(result_window)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        scrollbar = tk.Scrollbar(frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        text_area = tk.Text(frame, wrap=tk.WORD, yscrollcommand=scrollbar.set)
+        text_area.pack(fill=tk.BOTH, expand=True)
+        
+        scrollbar.config(command=text_area.yview)
+        
+        text_area.insert(tk.END, text)
+        text_area.config(state=tk.DISABLED)  # 设置为只读
+        
+        close_btn = tk.Button(result_window, text="关闭", command=result_window.destroy, 
+                            bg="#f44336", fg="white", font=("Arial", 10), width=15)
+        close_btn.pack(pady=10)
+    
     def add_lyrics_to_selected(self):
         """为选定的音乐添加LRC歌词文件"""
         try:
@@ -2155,6 +2977,7 @@ class MusicVideoGenerator:
                     # 复制歌词文件
                     import shutil
                     shutil.copy2(lrc_file, target_lrc)
+                    self.lyrics_resolver.invalidate(os.path.dirname(target_lrc))
                     
                     # 更新UI
                     self.update_music_list_ui()
@@ -2171,139 +2994,119 @@ class MusicVideoGenerator:
         except Exception as e:
             messagebox.showerror("错误", f"添加歌词时出错: {str(e)}")
     
-    def has_lyrics(self, music_file):
-        """检查音乐文件是否有歌词，支持同名lrc文件和歌词文件夹中的歌词"""
+    def convert_lrc_to_subtitle(self, music_info, output_file):
+        """将LRC歌词文件转换为字幕文件，扩展名为.ass时写入ASS字幕，否则写入SRT字幕
+        
+        每首歌的字幕只构建一次，不同排列顺序只需按歌曲开始时间平移后写出；
+        逐首歌生成并写出，内存占用只与最长的一首歌有关
+        """
         try:
-            # 1. 检查是否有同名的.lrc文件
-            base_name = os.path.splitext(music_file)[0]
-            lrc_file = base_name + '.lrc'
-            if os.path.exists(lrc_file):
-                return True
+            blocks = self.iter_subtitle_blocks(music_info)
             
-            # 2. 检查歌词文件夹中是否有对应的歌词文件
-            if self.lyrics_folder and os.path.exists(self.lyrics_folder):
-                # 获取音频文件名（不含路径和扩展名）
-                audio_filename = os.path.basename(music_file)
-                filename_no_ext = os.path.splitext(audio_filename)[0]
-                
-                # 检查歌词文件夹中是否存在对应的歌词文件
-                lrc_path = os.path.join(self.lyrics_folder, filename_no_ext + ".lrc")
-                if os.path.exists(lrc_path):
-                    return True
-                
-                # 如果文件名包含艺术家和歌曲名信息（如"艺术家-歌曲名"格式）
-                if '-' in filename_no_ext:
-                    artist, title = filename_no_ext.split('-', 1)
-                    artist = artist.strip()
-                    title = title.strip()
-                    
-                    # 检查可能的歌词文件名格式
-                    possible_names = [
-                        f"{artist} - {title}.lrc",
-                        f"{title}.lrc",
-                        f"{artist}-{title}.lrc"
-                    ]
-                    
-                    for lrc_name in possible_names:
-                        lrc_path = os.path.join(self.lyrics_folder, lrc_name)
-                        if os.path.exists(lrc_path):
-                            return True
-            
-            return False
-        except Exception as e:
-            print(f"检查歌词存在性时出错: {str(e)}")
-            return False
-
-    def convert_lrc_to_subtitle(self, music_info, output_srt):
-        """将LRC歌词文件转换为SRT字幕文件"""
-        try:
-            with open(output_srt, 'w', encoding='utf-8') as srt_file:
-                subtitle_index = 1
-                
-                # 添加字体大小设置
-                srt_file.write("1\n")
-                srt_file.write("00:00:00,000 --> 00:00:00,000\n")
-                srt_file.write(f"<font size=\"{self.lyrics_font_size.get()}\">\n\n")
-                
-                for info in music_info:
-                    if not info['has_lyrics'] or not info['lyrics_path']:
-                        continue
-                    
-                    # 读取LRC文件
-                    lrc_content = ""
-                    try:
-                        # 尝试不同的编码读取LRC文件
-                        encodings = ['utf-8', 'gbk', 'big5', 'latin1']
-                        for encoding in encodings:
-                            try:
-                                with open(info['lyrics_path'], 'r', encoding=encoding) as f:
-                                    lrc_content = f.read()
-                                    break
-                            except UnicodeDecodeError:
-                                continue
-                    except Exception as e:
-                        print(f"读取歌词文件出错: {str(e)}")
-                        continue
-                    
-                    if not lrc_content:
-                        continue
-                    
-                    # 解析LRC内容
-                    lyrics_data = self.parse_lrc_content(lrc_content)
-                    if not lyrics_data:
-                        continue
-                    
-                    # 歌曲起始时间（秒）
-                    song_start_time = info['start_time']
-                    
-                    # 将LRC转换为SRT格式
-                    for i in range(len(lyrics_data)):
-                        lyric = lyrics_data[i]
-                        
-                        # 计算字幕开始和结束时间
-                        start_time = song_start_time + lyric['time']
-                        
-                        # 确定字幕结束时间（使用下一句歌词的开始时间，或者使用当前歌词开始时间加上默认显示时间）
-                        if i < len(lyrics_data) - 1:
-                            end_time = song_start_time + lyrics_data[i+1]['time']
-                        else:
-                            # 如果是当前歌曲的最后一句歌词，结束时间为当前时间+5秒
-                            end_time = start_time + 5
-                        
-                        # 确保字幕结束时间不超过歌曲结束时间
-                        song_end_time = song_start_time + info['duration']
-                        if end_time > song_end_time:
-                            end_time = song_end_time
-                        
-                        # 格式化时间为SRT格式：00:00:00,000
-                        start_time_str = self.format_time_srt(start_time)
-                        end_time_str = self.format_time_srt(end_time)
-                        
-                        # 如果歌词为空，则跳过
-                        if not lyric['text'].strip():
-                            continue
-                        
-                        # 写入SRT条目，添加字体大小标签
-                        srt_file.write(f"{subtitle_index}\n")
-                        srt_file.write(f"{start_time_str} --> {end_time_str}\n")
-                        srt_file.write(f"{lyric['text']}\n\n")
-                        
-                        subtitle_index += 1
+            with open(output_file, 'w', encoding='utf-8', buffering=SUBTITLE_WRITE_BUFFER) as subtitle_file:
+                if os.path.splitext(output_file)[1].lower() == '.ass':
+                    # 字体和字体大小写在样式中，烧录时不需要force_style
+                    write_ass_header(subtitle_file, self.get_subtitle_font_name(), self.lyrics_font_size.get())
+                    write_ass_cues(subtitle_file, blocks)
+                else:
+                    # 添加字体大小设置
+                    subtitle_file.write("1\n")
+                    subtitle_file.write("00:00:00,000 --> 00:00:00,000\n")
+                    subtitle_file.write(f"<font size=\"{self.lyrics_font_size.get()}\">\n\n")
+                    write_srt_cues(subtitle_file, blocks)
             
             return True
         except Exception as e:
             print(f"转换歌词到字幕时出错: {str(e)}")
             return False
     
-    def format_time_srt(self, seconds):
-        """将秒数格式化为SRT时间格式 (HH:MM:SS,mmm)"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        seconds_part = int(seconds % 60)
-        milliseconds = int((seconds - int(seconds)) * 1000)
+    def get_subtitle_font_name(self):
+        """获取字幕使用的字体名称，没有自定义字体时返回None（使用默认字体）"""
+        if self.custom_font_path and os.path.exists(self.custom_font_path):
+            return self.get_font_name(self.custom_font_path)
+        return None
+    
+    def get_subtitle_fonts_dir(self):
+        """获取字幕使用的持久化字体目录，自定义字体只在修改后复制一次
         
-        return f"{hours:02d}:{minutes:02d}:{seconds_part:02d},{milliseconds:03d}"
-
+        目录中只放自定义字体，libass加载时不需要扫描整个系统字体目录
+        """
+        if not self.custom_font_path or not os.path.exists(self.custom_font_path):
+            return None
+        
+        fonts_dir = os.path.join(os.getcwd(), "cache", "fonts")
+        target_font = os.path.join(fonts_dir, os.path.basename(self.custom_font_path))
+        
+        with self.job_lock:
+            os.makedirs(fonts_dir, exist_ok=True)
+            source_stat = os.stat(self.custom_font_path)
+            try:
+                target_stat = os.stat(target_font)
+                up_to_date = (target_stat.st_size == source_stat.st_size and
+                              int(target_stat.st_mtime) == int(source_stat.st_mtime))
+            except OSError:
+                up_to_date = False
+            
+            if not up_to_date:
+                print(f"复制字体文件 {self.custom_font_path} 到字体目录")
+                shutil.copy2(self.custom_font_path, target_font)
+        
+        return fonts_dir
+    
+    def escape_filter_path(self, path):
+        """转义滤镜参数中的文件路径（Windows盘符中的冒号需要转义）"""
+        path = os.path.abspath(path).replace('\\', '/')
+        # 单引号内不能转义单引号，需要先结束引号再写入转义的单引号
+        return "'" + path.replace(':', '\\:').replace("'", "'\\''") + "'"
+    
+    def get_subtitle_filter(self, subtitle_file):
+        """获取烧录ASS字幕的滤镜参数"""
+        subtitle_filter = f"ass={self.escape_filter_path(subtitle_file)}"
+        
+        fonts_dir = self.get_subtitle_fonts_dir()
+        if fonts_dir:
+            subtitle_filter += f":fontsdir={self.escape_filter_path(fonts_dir)}"
+        
+        return subtitle_filter
+    
+    def iter_subtitle_blocks(self, music_info):
+        """逐首生成歌曲的字幕(歌曲开始时间毫秒, CueBlock)，没有歌词的歌曲会被跳过"""
+        for info in music_info:
+            if not info['has_lyrics'] or not info['lyrics_path']:
+                continue
+            
+            try:
+                block = self.get_cue_block(info['lyrics_path'], info['duration'])
+            except Exception as e:
+                print(f"读取歌词文件出错: {str(e)}")
+                continue
+            
+            # 歌曲起始时间（毫秒）
+            yield int(round(info['start_time'] * 1000)), block
+    
+    def get_cue_block(self, lyrics_path, duration):
+        """获取歌曲的字幕时间数组，同一歌词文件和歌曲时长只构建一次"""
+        stat = os.stat(lyrics_path)
+        key = (os.path.abspath(lyrics_path), stat.st_size, stat.st_mtime_ns, int(round(duration * 1000)))
+        
+        with self.job_lock:
+            block = self.cue_blocks.get(key)
+            if block is not None:
+                self.cue_blocks.move_to_end(key)
+                return block
+        
+        block = build_cue_block(self.load_lyrics(lyrics_path), key[3])
+        with self.job_lock:
+            if key not in self.cue_blocks:
+                self.cue_blocks[key] = block
+                self.cue_block_count += len(block.texts)
+            
+            # 超过上限时淘汰最久未使用的歌曲（至少保留刚加入的这首）
+            while self.cue_block_count > CUE_CACHE_MAX_CUES and len(self.cue_blocks) > 1:
+                _, old_block = self.cue_blocks.popitem(last=False)
+                self.cue_block_count -= len(old_block.texts)
+        return block
+    
     def format_elapsed_time(self, seconds):
         """格式化已用时间为 HH:MM:SS 格式"""
         hours = int(seconds // 3600)
@@ -2334,6 +3137,7 @@ class MusicVideoGenerator:
         
         # 更新UI状态
         self.status_label.config(text="已清空所有歌曲")
+        self.schedule_preview_update()
         
     def select_font(self):
         """选择自定义字体文件"""
@@ -2347,154 +3151,163 @@ class MusicVideoGenerator:
             font_name = os.path.basename(font_file)
             self.font_path_label.config(text=font_name)
             messagebox.showinfo("成功", f"已选择字体文件: {font_name}")
+            self.schedule_preview_update()
+            self.index_font_directory_async(os.path.dirname(font_file))
+    
+    def index_font_directory_async(self, folder):
+        """在后台线程中建立字体文件夹的字体名称索引，完成后更新字体名称下拉列表"""
+        if not self.font_registry:
+            return
+        
+        def index_worker():
+            try:
+                names = self.font_registry.index_directory(folder)
+            except Exception as e:
+                print(f"建立字体索引时出错: {str(e)}")
+                return
+            self.root.after(0, lambda: self.update_font_family_list(names))
+        
+        threading.Thread(target=index_worker, daemon=True).start()
+    
+    def update_font_family_list(self, names):
+        """更新字体名称下拉列表并选中当前使用的字体（在UI线程中调用）"""
+        self.font_directory_index = names
+        self.font_family_combo.configure(values=sorted(names))
+        
+        current_path = os.path.abspath(self.custom_font_path) if self.custom_font_path else ""
+        current_name = next((name for name, path in names.items() if os.path.abspath(path) == current_path), "")
+        self.font_family_var.set(current_name)
+    
+    def select_font_family(self, event=None):
+        """从下拉列表中按字体名称选择字体"""
+        font_file = self.font_directory_index.get(self.font_family_var.get())
+        if font_file:
+            self.custom_font_path = font_file
+            self.font_path_label.config(text=os.path.basename(font_file))
+            self.schedule_preview_update()
     
     def clear_font(self):
         """清除自定义字体设置"""
         self.custom_font_path = ""
         self.font_path_label.config(text="未选择")
+        self.font_directory_index = {}
+        self.font_family_combo.configure(values=[])
+        self.font_family_var.set("")
         messagebox.showinfo("提示", "已清除自定义字体设置，将使用系统默认字体")
+        self.schedule_preview_update()
         
     def preview_playlist_image(self):
-        """预览包含歌单的背景图片"""
-        try:
-            # 检查是否有选择背景图片
-            if not self.image_file:
-                messagebox.showwarning("警告", "请先选择背景图片文件夹")
-                return
-                
-            # 检查是否有添加音乐
-            if not self.music_files:
-                messagebox.showwarning("警告", "请先添加音乐文件")
-                return
-                
-            # 创建临时目录用于存储预览图片
-            temp_dir = tempfile.mkdtemp()
-            preview_image_path = os.path.join(temp_dir, "preview_playlist.png")
-            
-            # 分析音乐文件
-            music_info = []
-            current_time = 0
-            
-            for i, music_file in enumerate(self.music_files):
-                # 获取音频信息 - extract_audio_info返回(title, artist, duration)元组
-                title, artist, duration = self.extract_audio_info(music_file)
-                
-                # 检查是否存在歌词
-                has_lyrics = self.has_lyrics(music_file)
-                
-                # 格式化开始时间
-                start_time_fmt = self.format_time(current_time)
-                
-                # 获取显示名称
-                file_name = os.path.basename(music_file)
-                display_name = file_name
-                
-                # 使用更好的显示名称（标题+艺术家）
-                if artist:
-                    display_name = f"{artist} - {title}"
-                else:
-                    display_name = title
-                
-                # 确保display_name不包含文件扩展名
-                display_name = os.path.splitext(display_name)[0]
-                
-                # 获取歌词路径
-                lyrics_path = ""
-                if has_lyrics:
-                    base_name = os.path.splitext(music_file)[0]
-                    lrc_file = base_name + '.lrc'
-                    if os.path.exists(lrc_file):
-                        lyrics_path = lrc_file
-                    elif self.lyrics_folder and os.path.exists(self.lyrics_folder):
-                        # 在歌词文件夹中查找
-                        audio_filename = os.path.basename(music_file)
-                        filename_no_ext = os.path.splitext(audio_filename)[0]
-                        possible_names = [
-                            f"{filename_no_ext}.lrc",
-                            f"{filename_no_ext}.LRC"
-                        ]
-                        
-                        if '-' in filename_no_ext:
-                            artist_name, song_title = filename_no_ext.split('-', 1)
-                            artist_name = artist_name.strip()
-                            song_title = song_title.strip()
-                            possible_names.extend([
-                                f"{artist_name} - {song_title}.lrc",
-                                f"{song_title}.lrc",
-                                f"{artist_name}-{song_title}.lrc"
-                            ])
-                        
-                        for lrc_name in possible_names:
-                            lrc_path = os.path.join(self.lyrics_folder, lrc_name)
-                            if os.path.exists(lrc_path):
-                                lyrics_path = lrc_path
-                                break
-                
-                # 添加到音乐信息列表
-                music_info.append({
-                    'file': music_file,
-                    'title': title,
-                    'artist': artist,
-                    'duration': duration,
-                    'start_time': current_time,
-                    'start_time_fmt': start_time_fmt,
-                    'display_name': display_name,
-                    'has_lyrics': has_lyrics,
-                    'lyrics_path': lyrics_path
-                })
-                
-                current_time += duration
-            
-            # 创建并保存预览图片
-            self.create_image_with_playlist(music_info, preview_image_path)
-            
-            # 在UI中显示预览图片
-            img = Image.open(preview_image_path)
-            # 调整图片大小以适应UI
-            preview_width = 600
-            ratio = img.width / preview_width
-            preview_height = int(img.height / ratio)
-            img = img.resize((preview_width, preview_height), Image.LANCZOS)
-            
-            # 转换为Tkinter可用格式
-            photo = ImageTk.PhotoImage(img)
-            
-            # 更新标签显示图片
-            self.preview_image_label.config(image=photo)
-            self.preview_image_label.image = photo  # 保持引用，防止垃圾回收
-            
-            # 清理临时文件
-            shutil.rmtree(temp_dir, ignore_errors=True)
-            
-            # 显示成功消息
-            messagebox.showinfo("成功", "歌单背景预览生成完成")
+        """预览包含歌单的背景图片，之后歌单、字体或图片变化时自动更新"""
+        # 检查是否有选择背景图片
+        if not self.image_file:
+            messagebox.showwarning("警告", "请先选择背景图片文件夹")
+            return
             
-        except Exception as e:
-            error_message = f"预览生成失败: {str(e)}"
-            messagebox.showerror("错误", error_message)
-            print(error_message)
-            traceback.print_exc()
+        # 检查是否有添加音乐
+        if not self.music_files:
+            messagebox.showwarning("警告", "请先添加音乐文件")
+            return
+        
+        self.preview_enabled = True
+        self.preview_key = None
+        self.update_preview()
+    
+    def schedule_preview_update(self):
+        """稍后更新预览，连续多次修改（如连续移动歌曲）只绘制一次"""
+        if not self.preview_enabled:
+            return
+        if self.preview_after_id is not None:
+            self.root.after_cancel(self.preview_after_id)
+        self.preview_after_id = self.root.after(PREVIEW_UPDATE_DELAY_MS, self.update_preview)
+    
+    def get_preview_key(self):
+        """预览图片依赖的全部设置，没有变化时不需要重新绘制"""
+        font_path = self.get_font_path()
+        font_state = (font_path, os.stat(font_path).st_mtime_ns) if os.path.exists(font_path) else font_path
+        return (
+            tuple(self.music_files),
+            self.layer_cache.make_key([self.image_file, self.get_background_overlay()], VIDEO_SIZE),
+            font_state,
+            self.title_font_size.get(),
+            self.playlist_font_size.get(),
+            self.ellipsis_mode_var.get(),
+            self.playlist_columns_var.get()
+        )
+    
+    def update_preview(self):
+        """设置有变化时在后台线程中重新绘制预览（在UI线程中调用）"""
+        self.preview_after_id = None
+        if not self.image_file or not self.music_files:
+            # 歌单已清空时不再显示之前的预览，正在绘制的结果也会被丢弃
+            self.preview_key = None
+            self.preview_generation += 1
+            self.preview_image_label.config(image="", text="点击预览按钮生成歌单背景预览")
+            self.preview_image_label.image = None
+            return
+        
+        try:
+            key = self.get_preview_key()
+        except (OSError, tk.TclError, ValueError) as e:
+            # 图片文件不存在或字体大小输入未完成时暂不更新
+            print(f"更新预览时出错: {str(e)}")
+            return
+        if key == self.preview_key:
+            return
+        
+        self.preview_key = key
+        self.preview_generation += 1
+        generation = self.preview_generation
+        music_files = list(self.music_files)
+        self.preview_image_label.config(text="正在生成预览...")
+        
+        def render_worker():
+            try:
+                # 元数据和歌词位置使用缓存，只有新添加的文件才需要读取
+                music_info, _ = self.build_music_info(music_files, self.probe_music_files(music_files))
+                layout = self.compute_playlist_layout(music_info, self.load_font(self.playlist_font_size.get()))
+                
+                # 与导出时一样以视频尺寸绘制第一页（背景图层共用缓存），再缩小到预览尺寸，
+                # 文字裁剪和位置与导出的画面一致；不需要保存和重新读取图片
+                img = self.render_playlist_page(music_info, layout, 0).resize(PREVIEW_SIZE, Image.LANCZOS)
+                self.root.after(0, lambda: self.show_preview(generation, img))
+            except Exception as e:
+                error_message = f"预览生成失败: {str(e)}"
+                print(error_message)
+                traceback.print_exc()
+                self.root.after(0, lambda: self.show_preview_error(generation, error_message))
+        
+        threading.Thread(target=render_worker, daemon=True).start()
+    
+    def show_preview(self, generation, img):
+        """显示绘制好的预览图片，绘制期间设置又有变化时丢弃过期的结果"""
+        if generation != self.preview_generation:
+            return
+        
+        # 转换为Tkinter可用格式
+        photo = ImageTk.PhotoImage(img)
+        
+        # 更新标签显示图片
+        self.preview_image_label.config(image=photo, text="")
+        self.preview_image_label.image = photo  # 保持引用，防止垃圾回收
+    
+    def show_preview_error(self, generation, error_message):
+        """显示预览失败的原因，下次设置变化时重新尝试"""
+        if generation != self.preview_generation:
+            return
+        
+        self.preview_key = None
+        self.preview_image_label.config(image="", text=error_message)
+        self.preview_image_label.image = None
 
     def get_font_name(self, ttf_path):
         try:
-            font = TTFont(ttf_path)
-            name_table = font['name']
-
-            # 优先查找名称ID为4（完整字体名），平台为Windows（3），编码为Unicode（1）
-            for entry in name_table.names:
-                if entry.nameID == 4:
-                    # Windows平台（Unicode编码）
-                    if entry.platformID == 3 and entry.platEncID == 1:
-                        return entry.string.decode('utf-16be', errors='ignore')
-                    # Mac平台或其他情况
-                    elif entry.platformID == 1:
-                        return entry.string.decode('mac_roman', errors='ignore')
-
-            # 若未找到，返回第一个名称ID为4的条目
-            for entry in name_table.names:
-                if entry.nameID == 4:
-                    return entry.string.decode(errors='ignore')
-
+            # 字体名称保存在持久化缓存中，字体文件没有修改时不再解析
+            if self.font_registry:
+                font_name = self.font_registry.get_font_name(ttf_path)
+            else:
+                font_name = read_font_name(ttf_path)
+            if font_name:
+                return font_name
             return "未找到字体名称"
         except Exception as e:
             return f"读取字体文件出错：{e}"
@@ -0,0 +1,99 @@
+import os
+import json
+import sqlite3
+import threading
+
+
+class MetadataCache:
+    """
+    音频元数据缓存
+
+    以文件路径、大小和修改时间作为键，同时保存在内存和SQLite数据库中，
+    预览、重复导出和重新启动程序时都不需要重新读取未修改的文件。
+    table指定数据库中的表名，不同用途的缓存可以共用同一个数据库文件。
+    """
+    def __init__(self, db_path=None, table="audio_metadata"):
+        self.db_path = db_path
+        self.table = table
+        self.memory = {}
+        self.lock = threading.Lock()
+        self.connection = None
+
+        if self.db_path:
+            try:
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+                self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+                self.connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                    "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, info TEXT)"
+                )
+                self.connection.commit()
+            except sqlite3.Error as e:
+                print(f"打开元数据缓存数据库时出错: {str(e)}")
+                self.connection = None
+
+    def _file_state(self, path):
+        """
+        获取文件的绝对路径、大小和修改时间
+        """
+        abs_path = os.path.abspath(path)
+        stat = os.stat(abs_path)
+        return abs_path, stat.st_size, stat.st_mtime_ns
+
+    def get(self, path):
+        """
+        查找文件的元数据，文件被修改过或没有缓存时返回None
+        """
+        try:
+            abs_path, size, mtime_ns = self._file_state(path)
+        except OSError:
+            return None
+
+        with self.lock:
+            entry = self.memory.get(abs_path)
+            if entry and entry[0] == size and entry[1] == mtime_ns:
+                return dict(entry[2])
+
+            if not self.connection:
+                return None
+
+            try:
+                row = self.connection.execute(
+                    f"SELECT size, mtime_ns, info FROM {self.table} WHERE path = ?",
+                    (abs_path,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"读取元数据缓存时出错: {str(e)}")
+                return None
+
+            if not row or row[0] != size or row[1] != mtime_ns:
+                return None
+
+            info = json.loads(row[2])
+            self.memory[abs_path] = (size, mtime_ns, info)
+            return dict(info)
+
+    def put(self, path, info):
+        """
+        保存文件的元数据
+        """
+        try:
+            abs_path, size, mtime_ns = self._file_state(path)
+        except OSError:
+            return
+
+        info = dict(info)
+        with self.lock:
+            self.memory[abs_path] = (size, mtime_ns, info)
+
+            if not self.connection:
+                return
+
+            try:
+                self.connection.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (path, size, mtime_ns, info) VALUES (?, ?, ?, ?)",
+                    (abs_path, size, mtime_ns, json.dumps(info, ensure_ascii=False))
+                )
+                self.connection.commit()
+            except sqlite3.Error as e:
+                print(f"写入元数据缓存时出错: {str(e)}")
@@ -0,0 +1,71 @@
+import math
+import collections
+
+# 相邻两列之间的间距（像素）
+COLUMN_GAP = 40
+
+# 歌单底部留出的边距（像素）
+PLAYLIST_BOTTOM_MARGIN = 40
+
+# 一首歌在歌单图片中的位置：序号、时间和歌曲名称的起始x坐标，以及歌曲名称可用的宽度
+PlaylistItem = collections.namedtuple('PlaylistItem', ['index', 'x', 'y', 'time_x', 'name_x', 'name_width'])
+
+# 一页歌单：包含的歌曲为[first, last)
+PlaylistPage = collections.namedtuple('PlaylistPage', ['first', 'last', 'items'])
+
+# 整个歌单的布局
+PlaylistLayout = collections.namedtuple('PlaylistLayout', ['columns', 'rows', 'column_width', 'pages'])
+
+
+def compute_playlist_layout(count, panel_x, panel_width, top_y, bottom_y, number_width, time_width,
+                            line_height, max_columns=1, min_name_width=0, column_gap=COLUMN_GAP):
+    """
+    根据预先测量的文字尺寸计算歌单布局，一次遍历得到每首歌的位置
+
+    number_width和time_width为序号列和时间列的宽度（已包含与后一列的间距）。一列放不下时
+    先分为多列（不超过max_columns列，且每列歌曲名称至少有min_name_width宽），仍然放不下时
+    分为多页，每页的歌曲数尽量相同，各列按从上到下、从左到右的顺序排列
+    """
+    rows_per_column = max(1, int((bottom_y - top_y) // line_height))
+
+    # 在宽度允许的范围内最多能放几列
+    min_column_width = number_width + time_width + min_name_width
+    fit_columns = max(1, int((panel_width + column_gap) // (min_column_width + column_gap)))
+    columns = max(1, min(math.ceil(count / rows_per_column), max_columns, fit_columns))
+
+    # 分页，每页歌曲数尽量平均，避免最后一页只有几首歌
+    page_count = max(1, math.ceil(count / (rows_per_column * columns)))
+    page_size = math.ceil(count / page_count) if count else 0
+    rows = min(rows_per_column, max(1, math.ceil(page_size / columns)))
+
+    column_width = (panel_width - column_gap * (columns - 1)) / columns
+    name_width = column_width - number_width - time_width
+
+    pages = []
+    for first in range(0, count, page_size or 1):
+        last = min(first + page_size, count)
+        items = []
+        for index in range(first, last):
+            column, row = divmod(index - first, rows)
+            x = panel_x + column * (column_width + column_gap)
+            items.append(PlaylistItem(
+                index,
+                x,
+                top_y + row * line_height,
+                x + number_width,
+                x + number_width + time_width,
+                name_width
+            ))
+        pages.append(PlaylistPage(first, last, items))
+
+    if not pages:
+        pages.append(PlaylistPage(0, 0, []))
+
+    return PlaylistLayout(columns, rows, column_width, pages)
+
+
+def page_start_times(layout, start_times):
+    """
+    每页开始显示的时间：该页第一首歌的开始时间（第一页从0开始）
+    """
+    return [0] + [start_times[page.first] for page in layout.pages[1:]]
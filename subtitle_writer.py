@@ -0,0 +1,227 @@
+import os
+import sys
+import time
+import array
+import tempfile
+import tracemalloc
+import collections
+from lrc_parser import format_srt_time
+
+# 每首歌最后一句歌词默认显示的时间（毫秒）
+LAST_CUE_MS = 5000
+
+# 写入字幕文件时使用的缓冲区大小
+SUBTITLE_WRITE_BUFFER = 1024 * 1024
+
+# 一首歌的字幕：开始和结束时间（毫秒，相对歌曲开头）保存在整数数组中，文本单独保存
+CueBlock = collections.namedtuple('CueBlock', ['starts', 'ends', 'texts'])
+
+
+def build_cue_block(lyrics, duration_ms, last_cue_ms=LAST_CUE_MS):
+    """
+    根据按时间排序的[(时间毫秒, 歌词文本), ...]构建一首歌的字幕
+
+    每句歌词显示到下一句开始，最后一句显示last_cue_ms毫秒，都不超过歌曲结束时间；
+    在歌曲结束之后才开始的歌词会被丢弃
+    """
+    starts = array.array('q')
+    ends = array.array('q')
+    texts = []
+
+    for i, (time_ms, text) in enumerate(lyrics):
+        if duration_ms and time_ms >= duration_ms:
+            break
+
+        if i < len(lyrics) - 1:
+            end_ms = lyrics[i + 1][0]
+        else:
+            end_ms = time_ms + last_cue_ms
+        if duration_ms and end_ms > duration_ms:
+            end_ms = duration_ms
+
+        starts.append(time_ms)
+        ends.append(end_ms)
+        texts.append(text)
+
+    return CueBlock(starts, ends, texts)
+
+
+def iter_srt_chunks(blocks, first_index=1):
+    """
+    逐首歌生成SRT文本，每首歌生成一段
+
+    blocks为[(歌曲开始时间毫秒, CueBlock), ...]或逐首生成的迭代器，每首歌的时间在生成时
+    加上歌曲的开始时间，同一时间只保留一首歌的文本
+    """
+    index = first_index
+    for offset_ms, block in blocks:
+        parts = []
+        for start_ms, end_ms, text in zip(block.starts, block.ends, block.texts):
+            parts.append(
+                f"{index}\n"
+                f"{format_srt_time(start_ms + offset_ms)} --> {format_srt_time(end_ms + offset_ms)}\n"
+                f"{text}\n\n"
+            )
+            index += 1
+        yield ''.join(parts)
+
+
+def write_chunks(subtitle_file, chunks):
+    """
+    将逐段生成的字幕文本写入已打开的文件，返回写入的段数
+    """
+    count = 0
+    for chunk in chunks:
+        subtitle_file.write(chunk)
+        count += 1
+    return count
+
+
+def write_srt_cues(srt_file, blocks, first_index=1):
+    """
+    将多首歌的字幕写入已打开的SRT文件，返回写入的歌曲数
+    """
+    return write_chunks(srt_file, iter_srt_chunks(blocks, first_index))
+
+
+# ASS字幕的坐标分辨率、描边宽度和底部边距，与FFmpeg转换SRT时使用的默认值相同，
+# 字体大小的含义与之前保持一致（按视频高度/ASS_PLAY_RES_Y缩放）
+ASS_PLAY_RES_X = 384
+ASS_PLAY_RES_Y = 288
+ASS_OUTLINE = 1
+ASS_MARGIN_V = 10
+
+# ASS字幕文件头
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: {play_res_x}
+PlayResY: {play_res_y}
+ScaledBorderAndShadow: yes
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,{font_name},{font_size},&Hffffff,&Hffffff,&H0,&H0,0,0,0,0,100,100,0,0,1,{outline},0,2,10,10,{margin_v},0
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+# 默认字体，与FFmpeg转换SRT时使用的相同
+DEFAULT_ASS_FONT = "Arial"
+
+
+def format_ass_time(ms):
+    """
+    将毫秒转换为ASS时间格式 (H:MM:SS.cc)
+    """
+    cs = int(ms) // 10
+    hours = cs // 360000
+    cs %= 360000
+    minutes = cs // 6000
+    cs %= 6000
+    seconds = cs // 100
+    cs %= 100
+
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}.{cs:02d}"
+
+
+def escape_ass_text(text):
+    """
+    转义歌词中会被当作ASS样式代码的花括号
+    """
+    return text.replace('{', '\\{').replace('}', '\\}')
+
+
+def write_ass_header(ass_file, font_name, font_size):
+    """
+    写入ASS文件头，字体和字体大小只在样式中设置一次
+    """
+    # 样式行以逗号分隔字段，字体名称中不能包含逗号
+    font_name = (font_name or DEFAULT_ASS_FONT).replace(',', ' ')
+    ass_file.write(ASS_HEADER.format(
+        play_res_x=ASS_PLAY_RES_X,
+        play_res_y=ASS_PLAY_RES_Y,
+        font_name=font_name,
+        font_size=font_size,
+        outline=ASS_OUTLINE,
+        margin_v=ASS_MARGIN_V
+    ))
+
+
+def iter_ass_chunks(blocks):
+    """
+    逐首歌生成ASS字幕事件文本，每首歌生成一段，参数与iter_srt_chunks相同
+    """
+    for offset_ms, block in blocks:
+        parts = []
+        for start_ms, end_ms, text in zip(block.starts, block.ends, block.texts):
+            parts.append(
+                f"Dialogue: 0,{format_ass_time(start_ms + offset_ms)},{format_ass_time(end_ms + offset_ms)},"
+                f"Default,,0,0,0,,{escape_ass_text(text)}\n"
+            )
+        yield ''.join(parts)
+
+
+def write_ass_cues(ass_file, blocks):
+    """
+    将多首歌的字幕写入已打开的ASS文件，返回写入的歌曲数
+    """
+    return write_chunks(ass_file, iter_ass_chunks(blocks))
+
+
+def iter_benchmark_blocks(song_count, cues_per_song, song_ms=240000):
+    """
+    逐首生成用于性能测试的歌曲字幕，不会同时保存整个歌单
+    """
+    step = song_ms // (cues_per_song + 1)
+    for song_index in range(song_count):
+        lyrics = [
+            (i * step, f"第{song_index}首 第{i}句歌词 Lyric line {i}")
+            for i in range(cues_per_song)
+        ]
+        yield song_index * song_ms, build_cue_block(lyrics, song_ms)
+
+
+def write_benchmark_file(output_file, song_count, cues_per_song):
+    """
+    为合成的歌单写入一个字幕文件
+    """
+    blocks = iter_benchmark_blocks(song_count, cues_per_song)
+    with open(output_file, 'w', encoding='utf-8', buffering=SUBTITLE_WRITE_BUFFER) as f:
+        if output_file.endswith('.ass'):
+            write_ass_header(f, None, 24)
+            write_ass_cues(f, blocks)
+        else:
+            write_srt_cues(f, blocks)
+
+
+def benchmark(song_count=2000, cues_per_song=50):
+    """
+    字幕写入性能测试：为合成的歌单（默认2000首、共10万句）写入SRT和ASS字幕，
+    输出耗时和内存峰值（内存单独测量，避免跟踪内存影响耗时）
+    """
+    print(f"歌单: {song_count} 首, {song_count * cues_per_song} 句歌词")
+
+    temp_dir = tempfile.mkdtemp()
+    for name, extension in (("SRT", ".srt"), ("ASS", ".ass")):
+        output_file = os.path.join(temp_dir, "benchmark" + extension)
+
+        start = time.perf_counter()
+        write_benchmark_file(output_file, song_count, cues_per_song)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        write_benchmark_file(output_file, song_count, cues_per_song)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        size = os.path.getsize(output_file)
+        os.remove(output_file)
+        print(f"{name}: {elapsed * 1000:.1f} ms, 文件 {size / 1024 / 1024:.1f} MB, 内存峰值 {peak / 1024 / 1024:.1f} MB")
+
+    os.rmdir(temp_dir)
+
+
+if __name__ == "__main__":
+    # 用法: python subtitle_writer.py [歌曲数] [每首歌的歌词句数]
+    benchmark(*[int(arg) for arg in sys.argv[1:3]])
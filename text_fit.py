@@ -0,0 +1,251 @@
+import sys
+import time
+import random
+import bisect
+import threading
+import itertools
+
+# 省略号，与之前截断歌曲名称时使用的相同
+ELLIPSIS = "..."
+
+# 省略方式
+ELLIPSIS_END = "end"  # 保留开头，在末尾省略
+ELLIPSIS_MIDDLE = "middle"  # 保留开头和结尾，在中间省略
+
+
+def search_max_fit(count, fits):
+    """
+    二分查找满足fits(k)的最大k（0 <= k <= count），要求fits对k单调（k越大越难满足）
+    """
+    low, high = 0, count
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fits(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class TextFitter:
+    """
+    按显示宽度裁剪和折行文本
+
+    每个字符的前进宽度只测量一次并缓存，裁剪时先用前缀宽度之和二分查找估计保留的字符数，
+    再用一次实际排版验证（字距调整或组合字符使估计偏大时，改为对实际宽度二分查找）。
+    每个标题的排版调用次数为O(1)到O(log n)，而不是逐字符缩短时的O(n)。
+    """
+    def __init__(self, font):
+        self.font = font
+        self.advances = {}
+        self.lock = threading.Lock()
+        self.ellipsis_width = self.text_width(ELLIPSIS)
+
+    def text_width(self, text):
+        """
+        实际排版后的文本宽度
+        """
+        return self.font.getlength(text)
+
+    def char_advance(self, char):
+        """
+        单个字符的前进宽度（缓存）
+        """
+        advance = self.advances.get(char)
+        if advance is None:
+            advance = self.font.getlength(char)
+            with self.lock:
+                self.advances[char] = advance
+        return advance
+
+    def prefix_widths(self, text):
+        """
+        估计的前缀宽度：prefix_widths(text)[k]为text[:k]的宽度
+        """
+        return [0] + list(itertools.accumulate(self.char_advance(char) for char in text))
+
+    def fit_prefix(self, text, max_width, widths=None):
+        """
+        返回text中宽度不超过max_width的最长前缀的长度
+        """
+        if widths is None:
+            widths = self.prefix_widths(text)
+        estimate = bisect.bisect_right(widths, max_width) - 1
+        if estimate <= 0 or self.text_width(text[:estimate]) <= max_width:
+            return estimate
+        return search_max_fit(estimate - 1, lambda k: self.text_width(text[:k]) <= max_width)
+
+    def truncate(self, text, max_width, mode=ELLIPSIS_END):
+        """
+        文本超过max_width时裁剪并加上省略号，mode为ELLIPSIS_END或ELLIPSIS_MIDDLE；
+        至少保留一个字符
+        """
+        if self.text_width(text) <= max_width:
+            return text
+        if mode == ELLIPSIS_MIDDLE:
+            return self.truncate_middle(text, max_width)
+
+        available = max_width - self.ellipsis_width
+        widths = self.prefix_widths(text)
+        estimate = bisect.bisect_right(widths, available) - 1
+
+        def fits(k):
+            return self.text_width(text[:k] + ELLIPSIS) <= max_width
+
+        if estimate > 1 and not fits(estimate):
+            estimate = search_max_fit(estimate - 1, fits)
+        return text[:max(estimate, 1)] + ELLIPSIS
+
+    def truncate_middle(self, text, max_width):
+        """
+        保留文本的开头和结尾，在中间加上省略号（适合以乐章、版本等信息结尾的长标题）
+        """
+        available = max_width - self.ellipsis_width
+        widths = self.prefix_widths(text)
+        total = widths[-1]
+
+        def split(k):
+            # 保留k个字符，开头比结尾多保留一个
+            head = (k + 1) // 2
+            return head, k - head
+
+        def estimated_fits(k):
+            head, tail = split(k)
+            return widths[head] + (total - widths[len(text) - tail]) <= available
+
+        def fits(k):
+            head, tail = split(k)
+            return self.text_width(text[:head] + ELLIPSIS + text[len(text) - tail:]) <= max_width
+
+        estimate = search_max_fit(len(text) - 1, estimated_fits)
+        if estimate > 1 and not fits(estimate):
+            estimate = search_max_fit(estimate - 1, fits)
+
+        head, tail = split(max(estimate, 1))
+        return text[:head].rstrip() + ELLIPSIS + text[len(text) - tail:].lstrip()
+
+    def wrap(self, text, max_width, max_lines=2, mode=ELLIPSIS_END):
+        """
+        将文本按显示宽度折行，最多max_lines行，最后一行放不下时用省略号裁剪；
+        有空格时在单词之间折行，否则按字符折行
+        """
+        lines = []
+        while text and len(lines) < max_lines - 1:
+            if self.text_width(text) <= max_width:
+                break
+            length = max(self.fit_prefix(text, max_width), 1)
+            if ' ' in text:
+                # 回退到最后一个空格处折行，单词本身比一行还宽时按字符折行
+                space = text.rfind(' ', 0, length + 1)
+                if space > 0:
+                    length = space
+            lines.append(text[:length].rstrip())
+            text = text[length:].lstrip()
+
+        if text:
+            lines.append(self.truncate(text, max_width, mode))
+        return lines
+
+
+def get_text_fitter(font):
+    """
+    获取字体对应的TextFitter，字体对象由FontRegistry缓存，同一字体和字号的字符宽度只测量一次
+
+    TextFitter保存在字体对象上，随字体对象一起释放
+    """
+    fitter = getattr(font, 'text_fitter', None)
+    if fitter is None:
+        fitter = TextFitter(font)
+        font.text_fitter = fitter
+    return fitter
+
+
+def legacy_truncate(font, text, max_width):
+    """
+    之前的裁剪方式：逐个字符缩短，每次都重新排版（用于性能对比）
+    """
+    if font.getlength(text) > max_width:
+        while font.getlength(text + ELLIPSIS) > max_width and len(text) > 1:
+            text = text[:-1]
+        text += ELLIPSIS
+    return text
+
+
+def make_benchmark_titles(count=10000, seed=0):
+    """
+    生成用于性能测试的长歌曲名称：古典乐长标题、中文标题和中英混合标题
+    """
+    rng = random.Random(seed)
+    composers = ["Beethoven", "Mozart", "Tchaikovsky", "Rachmaninoff", "Shostakovich", "Mahler"]
+    cjk = "春夏秋冬风花雪月山水云天星海梦想远方故乡时光回忆青春爱情离别相逢夜晚清晨"
+
+    titles = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            titles.append(
+                f"{rng.choice(composers)} - Symphony No. {rng.randint(1, 15)} in {rng.choice('CDEFGAB')} minor, "
+                f"Op. {rng.randint(1, 140)} - {rng.choice(['I', 'II', 'III', 'IV'])}. "
+                f"{rng.choice(['Allegro con brio', 'Adagio molto e cantabile', 'Scherzo: Allegro vivace'])} "
+                f"(Live at Berliner Philharmonie, {rng.randint(1960, 2020)} Remastered Version)"
+            )
+        elif kind == 1:
+            titles.append(''.join(rng.choice(cjk) for _ in range(rng.randint(20, 80))))
+        else:
+            titles.append(
+                ''.join(rng.choice(cjk) for _ in range(rng.randint(6, 20))) +
+                f" (feat. {rng.choice(composers)} Orchestra) [Extended Mix {rng.randint(1, 9)}]"
+            )
+    return titles
+
+
+def benchmark(font_path=None, font_size=24, max_width=700, count=10000):
+    """
+    裁剪性能测试：对比逐字符缩短、二分查找（字符宽度缓存已预热）两种方式，
+    并检查两者结果的宽度都不超过max_width
+    """
+    from PIL import ImageFont
+
+    font = ImageFont.truetype(font_path, font_size) if font_path else ImageFont.load_default()
+    titles = make_benchmark_titles(count)
+    print(f"标题: {len(titles)} 个, 最大宽度 {max_width}px")
+
+    start = time.perf_counter()
+    legacy = [legacy_truncate(font, title, max_width) for title in titles]
+    legacy_elapsed = time.perf_counter() - start
+
+    fitter = TextFitter(font)
+    for title in titles:
+        fitter.prefix_widths(title)
+
+    results = {}
+    for mode in (ELLIPSIS_END, ELLIPSIS_MIDDLE):
+        start = time.perf_counter()
+        results[mode] = [fitter.truncate(title, max_width, mode) for title in titles]
+        results[mode + "_elapsed"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    wrapped = [fitter.wrap(title, max_width, 2) for title in titles]
+    wrap_elapsed = time.perf_counter() - start
+
+    print(f"逐字符缩短: {legacy_elapsed * 1000:.1f} ms")
+    print(f"二分查找（末尾省略）: {results[ELLIPSIS_END + '_elapsed'] * 1000:.1f} ms, "
+          f"与之前结果相同 {sum(a == b for a, b in zip(legacy, results[ELLIPSIS_END]))}/{len(titles)}")
+    print(f"二分查找（中间省略）: {results[ELLIPSIS_MIDDLE + '_elapsed'] * 1000:.1f} ms")
+    print(f"两行折行: {wrap_elapsed * 1000:.1f} ms")
+
+    overflow = sum(
+        1 for text in results[ELLIPSIS_END] + results[ELLIPSIS_MIDDLE] + [line for lines in wrapped for line in lines]
+        if font.getlength(text) > max_width and len(text) > len(ELLIPSIS) + 1
+    )
+    print(f"超出宽度的结果: {overflow}")
+
+
+if __name__ == "__main__":
+    # 用法: python text_fit.py [字体文件] [字体大小] [最大宽度]
+    args = sys.argv[1:]
+    benchmark(
+        args[0] if len(args) > 0 else None,
+        int(args[1]) if len(args) > 1 else 24,
+        int(args[2]) if len(args) > 2 else 700
+    )
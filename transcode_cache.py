@@ -0,0 +1,149 @@
+import os
+import hashlib
+import threading
+import uuid
+import contextlib
+
+# 默认缓存上限：2GB
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+class TranscodeCache:
+    """
+    转码音频的持久化缓存
+
+    以源文件路径、大小、修改时间和转码参数作为键，同一首歌在多个视频、
+    多次运行之间只需要转码一次。超过容量上限时按最近使用时间淘汰。
+    """
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, extension='.mp3'):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self.lock = threading.Lock()
+        self.key_locks = {}  # 缓存键 -> [锁, 正在使用该锁的线程数]
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, source_file, params):
+        """
+        根据源文件状态和转码参数生成缓存键
+        """
+        source_path = os.path.abspath(source_file)
+        stat = os.stat(source_path)
+        key_source = "\0".join([
+            source_path,
+            str(stat.st_size),
+            str(stat.st_mtime_ns),
+            " ".join(str(param) for param in params)
+        ])
+        return hashlib.sha1(key_source.encode('utf-8')).hexdigest()
+
+    @contextlib.contextmanager
+    def key_lock(self, key):
+        """
+        持有缓存键对应的锁，避免同时运行的任务重复转码同一个文件
+
+        没有线程再使用某个键的锁时将其删除，锁的数量不会随转码过的文件数增长
+        """
+        with self.lock:
+            entry = self.key_locks.get(key)
+            if entry is None:
+                entry = self.key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self.key_locks[key]
+
+    def path_for(self, key):
+        """
+        获取缓存键对应的缓存文件路径
+        """
+        return os.path.join(self.cache_dir, key + self.extension)
+
+    def temp_path_for(self, key):
+        """
+        获取写入缓存时使用的临时文件路径（与缓存文件同目录，便于原子重命名）
+        """
+        return os.path.join(self.cache_dir, f"{key}.{uuid.uuid4().hex[:8]}.part{self.extension}")
+
+    def get(self, key):
+        """
+        查找缓存文件，命中时更新其使用时间并返回路径，未命中返回None
+        """
+        cached_file = self.path_for(key)
+        try:
+            # 使用文件修改时间记录最近使用时间，用于LRU淘汰
+            os.utime(cached_file, None)
+            return cached_file
+        except OSError:
+            return None
+
+    def put(self, key, produced_file):
+        """
+        将转码完成的文件移入缓存并返回缓存路径
+        """
+        cached_file = self.path_for(key)
+        try:
+            os.replace(produced_file, cached_file)
+        except OSError:
+            # 其他进程已经写入了相同的缓存文件（Windows下被占用的文件无法替换）
+            if not os.path.exists(cached_file):
+                raise
+            self.discard(produced_file)
+        return cached_file
+
+    def discard(self, path):
+        """
+        删除未完成或无效的缓存文件
+        """
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self, keep=()):
+        """
+        缓存超过容量上限时，按最近使用时间从旧到新删除缓存文件
+
+        keep中的文件正在被当前任务使用，不会被删除
+        """
+        keep = set(os.path.abspath(path) for path in keep)
+
+        with self.lock:
+            entries = []
+            total_size = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.is_file() or not entry.name.endswith(self.extension):
+                    continue
+                # 跳过其他任务正在写入的临时文件
+                if '.part' in entry.name:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+
+            if total_size <= self.max_bytes:
+                return 0
+
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total_size <= self.max_bytes:
+                    break
+                if os.path.abspath(path) in keep:
+                    continue
+                try:
+                    os.remove(path)
+                    total_size -= size
+                    removed += 1
+                except OSError as e:
+                    print(f"清理转码缓存时出错: {str(e)}")
+
+            return removed